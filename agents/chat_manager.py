@@ -1,30 +1,276 @@
 # In-memory session management for TutorChat instances
 
-from typing import Dict
-from .chatter import TutorChat
+import asyncio
+import os
+import resource
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
 
-# This will store active chat sessions in memory.
-# In a production environment, you might replace this with a more robust
-# solution like Redis or a database-backed session store.
-_active_sessions: Dict[str, TutorChat] = {}
+from database.db_mcp import MCP_MODE
+from .chatter import TutorChat, TutorClient, TUTOR_SYSTEM_PROMPT
+from .client_pool import CLIENT_POOL_ENABLED, ClientPool
+from .session_backend import SESSION_STATE_TTL, create_session_backend
 
-def get_session(session_id: str) -> TutorChat | None:
-    """Retrieve a chat session by its ID."""
-    return _active_sessions.get(session_id)
 
-def create_session(session_id: str, student_data: dict, question_answer: str) -> TutorChat:
-    """Create a new chat session and store it."""
-    if session_id in _active_sessions:
+MAX_SESSIONS = int(os.getenv("EIGEN_MAX_SESSIONS", "1000"))
+SESSION_IDLE_TTL = float(os.getenv("EIGEN_SESSION_IDLE_TTL", "1800"))
+SESSION_REAP_INTERVAL = float(os.getenv("EIGEN_SESSION_REAP_INTERVAL", "60"))
+
+
+class SessionStore:
+    """LRU-ordered registry of live sessions with a size cap and idle TTL.
+
+    The store itself never awaits: operations that push sessions out return
+    them, and the caller is responsible for closing their clients.
+    """
+
+    def __init__(self, max_sessions: int = MAX_SESSIONS, idle_ttl: float = SESSION_IDLE_TTL) -> None:
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self._sessions: "OrderedDict[str, Tuple[TutorChat, float]]" = OrderedDict()
+        self.evicted = 0
+        self.expired = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def get(self, session_id: str) -> Optional[TutorChat]:
+        """Return a session and mark it as most recently used."""
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+        self._sessions[session_id] = (entry[0], time.monotonic())
+        self._sessions.move_to_end(session_id)
+        return entry[0]
+
+    def put(self, session_id: str, session: TutorChat) -> List[TutorChat]:
+        """Store a session, returning any least recently used ones evicted for room."""
+        self._sessions[session_id] = (session, time.monotonic())
+        self._sessions.move_to_end(session_id)
+
+        evicted = []
+        while len(self._sessions) > self.max_sessions:
+            _, (old_session, _) = self._sessions.popitem(last=False)
+            evicted.append(old_session)
+        self.evicted += len(evicted)
+        return evicted
+
+    def pop(self, session_id: str) -> Optional[TutorChat]:
+        """Remove a session and return it."""
+        entry = self._sessions.pop(session_id, None)
+        return entry[0] if entry else None
+
+    def pop_expired(self) -> List[TutorChat]:
+        """Remove and return every session idle for longer than the TTL."""
+        cutoff = time.monotonic() - self.idle_ttl
+        expired = []
+        # Oldest entries come first, so stop at the first fresh one
+        for session_id, (session, last_used) in list(self._sessions.items()):
+            if last_used > cutoff:
+                break
+            del self._sessions[session_id]
+            expired.append(session)
+        self.expired += len(expired)
+        return expired
+
+    def pop_all(self) -> List[TutorChat]:
+        """Remove and return every session."""
+        sessions = [session for session, _ in self._sessions.values()]
+        self._sessions.clear()
+        return sessions
+
+
+# Live chat sessions for this worker, bounded by size and idle time.
+_active_sessions = SessionStore()
+
+# Pre-connected clients for new sessions. They share a generic system prompt;
+# TutorChat sends the per-session student context with the first message and
+# binds the client's tools to its student. A subprocess MCP server fixes its
+# student when it starts, before a pooled client has one, so that mode
+# connects every client cold.
+tutor_client_pool = ClientPool(
+    client_factory=lambda: TutorClient(TUTOR_SYSTEM_PROMPT),
+    enabled=CLIENT_POOL_ENABLED and MCP_MODE == "inprocess",
+)
+
+# Serialized session state shared between workers (EIGEN_SESSION_BACKEND)
+session_backend = create_session_backend()
+
+_reaper_task: Optional[asyncio.Task] = None
+# Keeps background close tasks referenced until they finish
+_closing: Set[asyncio.Task] = set()
+_closed_sessions = 0
+
+
+async def _close_session(session: TutorChat) -> None:
+    global _closed_sessions
+    try:
+        await session.close()
+    except Exception as exc:
+        print(f"[SessionStore] Error closing session: {exc}")
+    _closed_sessions += 1
+
+
+def _close_in_background(sessions: List[TutorChat]) -> None:
+    for session in sessions:
+        task = asyncio.create_task(_close_session(session))
+        _closing.add(task)
+        task.add_done_callback(_closing.discard)
+
+
+async def _lease_client():
+    return await tutor_client_pool.lease() if tutor_client_pool.enabled else None
+
+
+async def _store_session(session_id: str, session: TutorChat) -> TutorChat:
+    """Register a freshly built session unless a concurrent request beat us to it."""
+    existing = _active_sessions.get(session_id)
+    if existing and existing.version >= session.version:
+        await _close_session(session)
+        return existing
+    if existing:
+        _close_in_background([_active_sessions.pop(session_id)])
+    _close_in_background(_active_sessions.put(session_id, session))
+    return session
+
+
+async def _rehydrate(session_id: str, state: dict) -> TutorChat:
+    session = TutorChat.from_state(state, client=await _lease_client())
+    return await _store_session(session_id, session)
+
+
+async def get_session(session_id: str) -> TutorChat | None:
+    """Retrieve a chat session by its ID, rehydrating it from the backend if needed."""
+    session = _active_sessions.get(session_id)
+
+    if session and session_backend.shared:
+        # Another worker may have advanced this conversation since we last saw it
+        stored_version = await session_backend.version(session_id)
+        if stored_version is not None and stored_version > session.version:
+            state = await session_backend.load(session_id)
+            if state:
+                return await _rehydrate(session_id, state)
+
+    if session:
+        return session
+
+    state = await session_backend.load(session_id)
+    if not state:
+        return None
+    return await _rehydrate(session_id, state)
+
+
+async def create_session(session_id: str, student_data: dict, question_answer: str) -> TutorChat:
+    """Create a new chat session, leasing a warm client when the pool is enabled."""
+    existing = _active_sessions.get(session_id)
+    if existing:
         # This case should ideally be handled by the API layer
         # to prevent overwriting an active session unintentionally.
-        return _active_sessions[session_id]
-    
-    session = TutorChat(student_data=student_data, question_answer=question_answer)
-    _active_sessions[session_id] = session
+        return existing
+
+    session = TutorChat(student_data=student_data, question_answer=question_answer, client=await _lease_client())
+    session = await _store_session(session_id, session)
+    await save_session(session_id, session)
     return session
 
-def end_session(session_id: str) -> None:
-    """Remove a chat session from memory."""
-    if session_id in _active_sessions:
-        # Here you could also add cleanup logic for the TutorChat instance if needed
-        del _active_sessions[session_id]
+
+async def save_session(session_id: str, session: TutorChat) -> None:
+    """Persist the session's state so any worker can pick the conversation up."""
+    session.version += 1
+    await session_backend.save(session_id, session.to_state())
+
+
+async def peek_session(session_id: str) -> Optional[TutorChat]:
+    """Return a session's newest state without rehydrating its client.
+
+    Uses the live session when this worker holds the newest copy, otherwise
+    rebuilds a client-less copy from the stored state; enough to read its
+    student and transcript. Returns None for an unknown session.
+    """
+    session = _active_sessions.get(session_id)
+    if session and session_backend.shared:
+        stored_version = await session_backend.version(session_id)
+        if stored_version is not None and stored_version > session.version:
+            session = None
+    if session:
+        return session
+
+    state = await session_backend.load(session_id)
+    if not state:
+        return None
+    return TutorChat.from_state(state)
+
+
+async def end_session(session_id: str) -> None:
+    """Remove a chat session and its stored state, disconnecting its client."""
+    session = _active_sessions.pop(session_id)
+    if session:
+        await _close_session(session)
+    await session_backend.delete(session_id)
+
+
+async def _reap_forever() -> None:
+    while True:
+        await asyncio.sleep(SESSION_REAP_INTERVAL)
+        # Expired sessions keep their stored state so they can be rehydrated later
+        expired = _active_sessions.pop_expired()
+        if expired:
+            print(f"[SessionStore] Reaping {len(expired)} idle session(s)")
+            await asyncio.gather(*(_close_session(session) for session in expired))
+        try:
+            await session_backend.purge_expired(SESSION_STATE_TTL)
+        except Exception as exc:
+            print(f"[SessionStore] Error purging stored session state: {exc}")
+
+
+async def start_session_reaper() -> None:
+    """Start the background task that closes idle sessions."""
+    global _reaper_task
+    if _reaper_task is None:
+        _reaper_task = asyncio.create_task(_reap_forever())
+
+
+async def close_all_sessions() -> None:
+    """Stop the reaper and close every live session."""
+    global _reaper_task
+    if _reaper_task is not None:
+        _reaper_task.cancel()
+        try:
+            await _reaper_task
+        except asyncio.CancelledError:
+            pass
+        _reaper_task = None
+    await asyncio.gather(
+        *(_close_session(session) for session in _active_sessions.pop_all()),
+        *list(_closing),
+    )
+
+
+def _resident_memory_bytes() -> int:
+    try:
+        with open("/proc/self/statm", "r", encoding="utf-8") as handle:
+            return int(handle.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # No procfs: fall back to peak RSS, reported in bytes on macOS and KiB elsewhere
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def session_stats() -> Dict[str, Any]:
+    """Return gauges for live sessions and process memory."""
+    return {
+        "live_sessions": len(_active_sessions),
+        "max_sessions": _active_sessions.max_sessions,
+        "idle_ttl_seconds": _active_sessions.idle_ttl,
+        "evicted_lru": _active_sessions.evicted,
+        "expired_idle": _active_sessions.expired,
+        "closed": _closed_sessions,
+        "closing": len(_closing),
+        "process_rss_bytes": _resident_memory_bytes(),
+        "backend": type(session_backend).__name__,
+    }
@@ -3,157 +3,348 @@
 # It will never give the user the answer. Always guide the user through.
 # It will tell user once they get it right.
 
-import base64
-import json
-from pathlib import Path
-from claude_agent_sdk import ClaudeSDKClient, AssistantMessage, TextBlock, ClaudeAgentOptions
+import asyncio
+import os
+from collections import deque
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+
+import anyio
+from claude_agent_sdk import ClaudeSDKClient, AssistantMessage, TextBlock, ClaudeAgentOptions, StreamEvent
+
+from database.db_mcp import StudentBinding, get_mcp_servers
+from image_store import load_image_block
+from tracing import span, start_span
+from .response_stream import ResponseFieldExtractor
+
+
+# The transcript is a ring buffer: only the newest messages are kept, each
+# truncated, so long sessions stay cheap to store, replay and finalize.
+TRANSCRIPT_MAX_MESSAGES = int(os.getenv("EIGEN_TRANSCRIPT_MAX_MESSAGES", "200"))
+TRANSCRIPT_MAX_CHARS = int(os.getenv("EIGEN_TRANSCRIPT_MAX_CHARS", "2000"))
+# Seconds to wait for an interrupted reply to wind down before the client is dropped
+INTERRUPT_DRAIN_TIMEOUT = float(os.getenv("EIGEN_INTERRUPT_DRAIN_TIMEOUT", "10"))
+
+
+TUTOR_GUIDELINES = """Guidelines:
+
+1. Guide the student through understanding WITHOUT giving away the answer
+2. Ask clarifying questions to help them think deeper
+3. If they provide an answer, validate it appropriately
+4. Never directly give the answer - help them discover it
+5. Encourage progress and celebrate correct understanding. Help with adjacent concepts too.
+6. When the student shares useful learning information (learning style, strengths, weaknesses, interests), call the add_memory_entry tool to save it. The database tools always act for the student in the session context.
+7. Limit your responses to 150 words or less.
+8. Always include the correct_status in your response.
+
+YOU ALWAYS RESPOND in FORMAT:
+{""response": [advice and guidance, in string, not JSON], "correct_status": [true/false]}
+No matter what, do not write outside the json format.
+"""
+
+# Session-independent system prompt used by pre-warmed clients. The student
+# context is not known when those clients connect, so it is sent as a
+# preamble on the first message of the session instead.
+TUTOR_SYSTEM_PROMPT = f"""You are a helpful tutor guiding a student through exam preparation.
+The first message of every session starts with a "Student Context" block describing the student and the answer to the question being discussed. Use it for the rest of the session.
+
+{TUTOR_GUIDELINES}"""
+
+
+async def _user_message(content: List[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+    """Wrap content blocks (text plus images) as a single streamed user message."""
+    yield {
+        "type": "user",
+        "message": {"role": "user", "content": content},
+        "parent_tool_use_id": None,
+    }
+
+
+def build_tutor_options(system_prompt: str, binding: StudentBinding) -> ClaudeAgentOptions:
+    """Build the agent options shared by cold and pre-warmed tutor clients."""
+    return ClaudeAgentOptions(
+        model="haiku",
+        system_prompt=system_prompt,
+        permission_mode="acceptEdits",
+        mcp_servers=get_mcp_servers(binding),
+        # Emit text deltas so replies can be streamed to the student
+        include_partial_messages=True,
+    )
+
+
+class TutorClient(ClaudeSDKClient):
+    """Tutor client with its own database tools, bound to one student.
+
+    Pre-warmed clients connect before their student is known; the session
+    that leases one binds it, and the tools then refuse any other student.
+    """
+
+    def __init__(self, system_prompt: str, student_id: Optional[int] = None, **kwargs: Any) -> None:
+        self.student = StudentBinding(student_id)
+        super().__init__(options=build_tutor_options(system_prompt, self.student), **kwargs)
 
 
 class TutorChat:
     """Stateful chat client that guides a student through a tutoring session."""
 
-    def __init__(self, student_data: dict, question_answer: str) -> None:
-        """Set up the tutor agent for a new conversation session."""
+    def __init__(
+        self,
+        student_data: dict,
+        question_answer: str,
+        client: Optional[TutorClient] = None,
+    ) -> None:
+        """Set up the tutor agent for a new conversation session.
+
+        Args:
+            student_data: Student name, exam and memory entries
+            question_answer: Answer to the question being discussed
+            client: Optional pre-connected client leased from the client pool.
+                    Its system prompt is generic, so the student context is
+                    sent ahead of the first message instead, and its tools
+                    are bound to this session's student here.
+        """
         self.student_data = student_data
+        self.student_id: Optional[int] = student_data.get("student_id")
         self.question_answer = question_answer
-        self.client = None
-        self._is_connected = False
+        self.client = client
+        if client is not None and self.student_id is not None:
+            client.student.bind(self.student_id)
+        self._is_connected = client is not None
+        self._needs_session_context = client is not None
+        self._reply_pending = False  # A query was sent and its reply not fully read
         self.correct_status = False  # Track if the student has answered correctly
+        self.transcript: Deque[Dict[str, str]] = deque(maxlen=TRANSCRIPT_MAX_MESSAGES)
+        self.transcript_dropped = 0  # Messages pushed out of the ring buffer
+        self.version = 0  # Bumped on every save so workers can spot stale copies
+        self._resumed = False
 
-    def _build_system_prompt(self) -> str:
-        """Construct the initial system prompt that encodes student context."""
+    def to_state(self) -> Dict[str, Any]:
+        """Serialize everything needed to rebuild this session on another worker."""
+        return {
+            "student_data": self.student_data,
+            "question_answer": self.question_answer,
+            "transcript": list(self.transcript),
+            "transcript_dropped": self.transcript_dropped,
+            "correct_status": self.correct_status,
+            "version": self.version,
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any], client: Optional[TutorClient] = None) -> "TutorChat":
+        """Rebuild a session from ``to_state`` output.
+
+        The Claude conversation itself is not transferable, so the stored
+        transcript is replayed as part of the session context instead.
+        """
+        session = cls(
+            student_data=state.get("student_data", {}),
+            question_answer=state.get("question_answer", ""),
+            client=client,
+        )
+        for turn in state.get("transcript", []):
+            session.record_turn(turn.get("role", "unknown"), turn.get("content", ""))
+        session.transcript_dropped += state.get("transcript_dropped", 0)
+        session.correct_status = state.get("correct_status", False)
+        session.version = state.get("version", 0)
+        session._resumed = bool(session.transcript)
+        return session
+
+    def record_turn(self, role: str, content: str) -> None:
+        """Append a message to the transcript, evicting the oldest when full."""
+        if len(self.transcript) == self.transcript.maxlen:
+            self.transcript_dropped += 1
+        if len(content) > TRANSCRIPT_MAX_CHARS:
+            content = content[:TRANSCRIPT_MAX_CHARS] + " [truncated]"
+        self.transcript.append({"role": role, "content": content})
+
+    def transcript_messages(self) -> List[Dict[str, str]]:
+        """Return the transcript, noting how many earlier messages were dropped."""
+        messages = list(self.transcript)
+        if self.transcript_dropped:
+            messages.insert(0, {
+                "role": "system",
+                "content": f"{self.transcript_dropped} earlier message(s) omitted",
+            })
+        return messages
+
+    def _build_session_context(self) -> str:
+        """Describe the student and the question being discussed."""
         memory_items = self.student_data.get("memory", [])
         memory_context = "\n".join(f"- {item}" for item in memory_items) if memory_items else "- No prior context available"
         student_name = self.student_data.get("student_name", "Student")
         exam_name = self.student_data.get("exam_name", "Exam")
 
-        return f"""You are a helpful tutor guiding {student_name} through {exam_name}.
-
-Student Context:
+        context = f"""Student Context:
+- Student ID: {self.student_id}
 - Name: {student_name}
 - Exam: {exam_name}
 - Question Answer: {self.question_answer}
 - Prior knowledge:
 {memory_context}
+"""
+        if self._resumed:
+            turns = "\n".join(f"[{turn['role']}]: {turn['content']}" for turn in self.transcript_messages())
+            context += f"\nConversation so far (continue from here):\n{turns}\n"
+        return context
 
-Guidelines:
+    def _build_system_prompt(self) -> str:
+        """Construct the initial system prompt that encodes student context."""
+        student_name = self.student_data.get("student_name", "Student")
+        exam_name = self.student_data.get("exam_name", "Exam")
 
-1. Guide the student through understanding WITHOUT giving away the answer
-2. Ask clarifying questions to help them think deeper
-3. If they provide an answer, validate it appropriately
-4. Never directly give the answer - help them discover it
-5. Encourage progress and celebrate correct understanding. Help with adjacent concepts too.
-6. When the student shares useful learning information (learning style, strengths, weaknesses, interests), call the add_memory_entry tool to save it.
-7. Limit your responses to 150 words or less.
-8. Always include the correct_status in your response.
+        return f"""You are a helpful tutor guiding {student_name} through {exam_name}.
 
-YOU ALWAYS RESPOND in FORMAT:
-{{""response": [advice and guidance, in string, not JSON], "correct_status": [true/false]}}
-No matter what, do not write outside the json format.
-"""
+{self._build_session_context()}
+{TUTOR_GUIDELINES}"""
+
+    def _with_session_context(self, user_message: str) -> str:
+        """Prefix the student context onto the first message of a leased client."""
+        if not self._needs_session_context:
+            return user_message
+        return f"{self._build_session_context()}\n{user_message}"
 
     async def _connect(self):
         """Initializes and connects the ClaudeSDKClient."""
         if not self.client:
-            options = ClaudeAgentOptions(
-                model="haiku",
-                system_prompt=self._build_system_prompt(),
-                permission_mode="acceptEdits",
-                mcp_servers={
-                    "database": {
-                        "command": "-m",
-                        "args": ["database.db_mcp"],
-                    }
-                },
-            )
-            self.client = ClaudeSDKClient(options=options)
-            await self.client.connect() # Manually connect
+            self.client = TutorClient(self._build_system_prompt(), self.student_id)
+            with span("llm_connect", "tutor"):
+                await self.client.connect() # Manually connect
             self._is_connected = True
 
-    def _read_image_as_base64(self, image_path: str) -> str:
-        """Read an image file and convert it to base64 string."""
+    async def _send_query(self, user_message: str, image_id: Optional[str] = None) -> None:
+        """Connect if needed and send the user's message (and image) to Claude."""
+        if not self._is_connected:
+            await self._connect()
+
+        text = self._with_session_context(user_message)
+        if image_id:
+            # Cached base64 block; a miss reads the file, so keep it off the loop
+            image_block = await asyncio.to_thread(load_image_block, image_id)
+            await self.client.query(_user_message([{"type": "text", "text": text}, image_block]))
+        else:
+            await self.client.query(text)
+        self._needs_session_context = False
+        self._reply_pending = True
+
+    async def _stream_text(self, user_message: str, image_id: Optional[str] = None) -> AsyncIterator[str]:
+        """Yield the reply text as it arrives, using partial-message deltas when available."""
+        await self._send_query(user_message, image_id)
+
+        # Not a ``with span`` block: a generator may be closed from another context
+        completion = start_span("llm_completion", "tutor")
+        error: Optional[BaseException] = None
+        streamed_current_message = False
         try:
-            path = Path(image_path)
-            if not path.exists():
-                raise FileNotFoundError(f"Image file not found: {image_path}")
-            
-            with open(path, "rb") as image_file:
-                return base64.standard_b64encode(image_file.read()).decode("utf-8")
-        except Exception as e:
-            print(f"Error reading image: {e}")
+            async for message in self.client.receive_response():
+                if isinstance(message, StreamEvent):
+                    event = message.event
+                    delta = event.get("delta", {})
+                    if event.get("type") == "content_block_delta" and delta.get("type") == "text_delta":
+                        streamed_current_message = True
+                        completion.mark("llm_first_token")
+                        yield delta.get("text", "")
+                elif isinstance(message, AssistantMessage):
+                    # The complete message repeats text already sent as deltas
+                    if not streamed_current_message:
+                        for block in message.content:
+                            if isinstance(block, TextBlock):
+                                completion.mark("llm_first_token")
+                                yield block.text
+                    streamed_current_message = False
+            self._reply_pending = False
+        except Exception as exc:
+            error = exc
+            raise
+        finally:
+            completion.finish(error)
+
+    async def stream(self, user_message: str, image_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Send a message and yield the tutor's reply incrementally.
+
+        Yields ``{"type": "delta", "text": ...}`` events with the decoded
+        ``response`` field as it streams, a ``{"type": "correct_status",
+        "value": ...}`` event as soon as the flag is parsed, and finally
+        ``{"type": "done", "response": ..., "correct_status": ...}`` carrying
+        the same payload ``chat`` returns.
+        """
+        extractor = ResponseFieldExtractor()
+        try:
+            async with aclosing(self._stream_text(user_message, image_id)) as chunks:
+                async for chunk in chunks:
+                    for event in extractor.feed(chunk):
+                        yield event
+            for event in extractor.finish():
+                yield event
+        except Exception:
+            self._is_connected = False # Mark as disconnected on error
             raise
 
-    def _get_image_media_type(self, image_path: str) -> str:
-        """Determine the media type based on file extension."""
-        suffix = Path(image_path).suffix.lower()
-        media_types = {
-            ".jpg": "image/jpeg",
-            ".jpeg": "image/jpeg",
-            ".png": "image/png",
-            ".gif": "image/gif",
-            ".webp": "image/webp",
+        if extractor.correct_status is not None:
+            self.correct_status = extractor.correct_status
+
+        # Remove "```json" and all newline characters
+        response_text = extractor.text.replace("```json", "").replace("\n", "").replace("```", "")
+        response_text = response_text or "I'm here to help! What would you like to discuss?"
+        self.record_turn("student", f"{user_message} [image attached]" if image_id else user_message)
+        self.record_turn("tutor", extractor.response or response_text)
+        yield {
+            "type": "done",
+            "response": response_text,
+            "correct_status": self.correct_status,
         }
-        return media_types.get(suffix, "image/jpeg")
 
-    async def chat(self, user_message: str, contains_image: bool = False) -> str:
+    async def chat(self, user_message: str, image_id: Optional[str] = None) -> str:
         """Send a message to Claude and get the complete response.
         
         Args:
             user_message: The text message from the user
-            contains_image: Whether the message includes an image
-            image_path: Path to the image file in /tmp (required if contains_image is True)
+            image_id: Optional id of an image uploaded through /images
         """
         try:
-            image_path = "/Users/joe/repostories/calhacks/backend/tmp/image.jpeg"
-            if not self._is_connected:
-                await self._connect()
-
-            # Build the query with image support if applicable
-            print(contains_image, image_path)
-            if contains_image and image_path:
-                # Read image and convert to base64
-                image_base64 = self._read_image_as_base64(image_path)
-                media_type = self._get_image_media_type(image_path)
-                
-                # Create a message with both text and image
-                # Claude SDK will handle the image in the context of the query
-                query_message = f"{user_message}\n\n[Image attached: {image_path}]"
-                
-                # Add the image as context for Claude to read
-                await self.client.query(
-                    query_message,
-                    image_data={
-                        "base64": image_base64,
-                        "media_type": media_type,
-                        "source": image_path
-                    }
-                )
-            else:
-                await self.client.query(user_message)
-
             response_text = ""
-            async for message in self.client.receive_response():
-                if isinstance(message, AssistantMessage):
-                    for block in message.content:
-                        if isinstance(block, TextBlock):
-                            response_text += block.text
-            
-            # Parse the nested JSON response and extract the actual data
-            try:
-                # Remove "```json" and all newline characters
-                response_text = response_text.replace("```json", "").replace("\n", "").replace("```", "")
-                return response_text
-            except json.JSONDecodeError:
-                return response_text or "I'm here to help! What would you like to discuss?"
+            async with aclosing(self.stream(user_message, image_id)) as events:
+                async for event in events:
+                    if event["type"] == "done":
+                        response_text = event["response"]
+            return response_text
 
         except Exception as exc:
             print(f"Error in chat: {exc}")
-            self._is_connected = False # Mark as disconnected on error
-            return "I encountered an error. Please try again."
+            raise
+
+    async def interrupt(self) -> None:
+        """Stop a reply nobody is reading any more, e.g. after a client disconnect.
+
+        The rest of the reply is drained so the session's next message does
+        not read it. If that fails the client is dropped, and the next
+        message reconnects with the transcript replayed.
+        """
+        if not self.client or not self._reply_pending:
+            return
+        # Shielded: this runs on the cancellation path of a disconnected request
+        with anyio.CancelScope(shield=True):
+            try:
+                with anyio.fail_after(INTERRUPT_DRAIN_TIMEOUT):
+                    await self.client.interrupt()
+                    async for _ in self.client.receive_response():
+                        pass
+                self._reply_pending = False
+                return
+            except Exception as exc:
+                print(f"[TutorChat] Could not drain interrupted reply: {exc}")
+            try:
+                await self.close()
+            except Exception as exc:
+                print(f"[TutorChat] Error disconnecting interrupted client: {exc}")
+            self._reply_pending = False
+            self._needs_session_context = False
+            self._resumed = bool(self.transcript)
 
     async def close(self):
-        """Disconnects the client if it is connected."""
-        if self.client and self._is_connected:
-            await self.client.disconnect()
-            self._is_connected = False
-            self.client = None
\ No newline at end of file
+        """Disconnects the client, even if an earlier error marked it disconnected."""
+        if self.client:
+            try:
+                await self.client.disconnect()
+            finally:
+                self._is_connected = False
+                self.client = None
@@ -0,0 +1,223 @@
+# Pool of pre-connected ClaudeSDKClient instances for new tutoring sessions.
+# A cold connect spawns the CLI and its MCP servers, which dominates the latency
+# of the first message in a session. The pool keeps a few clients connected in
+# the background so create_session can lease one instead.
+#
+# A pooled client is connected by the pool's background task but queried and
+# disconnected by request tasks. That relies on claude-agent-sdk running its
+# reader as a detached task rather than inside an anyio task group entered by
+# connect() (older releases did, and had to be used from one task only), so
+# requirements.txt pins a release with detached readers and
+# tests/test_client_pool.py checks cross-task use against a fake transport.
+
+import asyncio
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Optional
+
+from claude_agent_sdk import ClaudeSDKClient
+
+from tracing import span
+
+
+CLIENT_POOL_ENABLED = os.getenv("EIGEN_CLIENT_POOL_ENABLED", "1") == "1"
+CLIENT_POOL_MIN_SIZE = int(os.getenv("EIGEN_CLIENT_POOL_MIN_SIZE", "1"))
+CLIENT_POOL_MAX_SIZE = int(os.getenv("EIGEN_CLIENT_POOL_MAX_SIZE", "4"))
+CLIENT_POOL_IDLE_TIMEOUT = float(os.getenv("EIGEN_CLIENT_POOL_IDLE_TIMEOUT", "300"))
+CLIENT_POOL_HEALTH_INTERVAL = float(os.getenv("EIGEN_CLIENT_POOL_HEALTH_INTERVAL", "30"))
+
+
+@dataclass
+class _IdleClient:
+    client: ClaudeSDKClient
+    idle_since: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class _Timing:
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count * 1000, 2) if self.count else 0.0,
+            "max_ms": round(self.max * 1000, 2),
+        }
+
+
+class ClientPool:
+    """Keeps between ``min_size`` and ``max_size`` idle, connected clients.
+
+    Leased clients are never returned: their conversation state belongs to
+    one session, so they are disconnected when the session closes and the
+    pool connects a fresh one in the background. The warm target grows by
+    one (up to ``max_size``) every time a lease finds the pool empty and
+    shrinks back towards ``min_size`` as surplus clients sit idle past
+    ``idle_timeout``.
+    """
+
+    def __init__(
+        self,
+        client_factory: Callable[[], ClaudeSDKClient],
+        min_size: int = CLIENT_POOL_MIN_SIZE,
+        max_size: int = CLIENT_POOL_MAX_SIZE,
+        idle_timeout: float = CLIENT_POOL_IDLE_TIMEOUT,
+        health_check_interval: float = CLIENT_POOL_HEALTH_INTERVAL,
+        enabled: bool = CLIENT_POOL_ENABLED,
+    ) -> None:
+        self.client_factory = client_factory
+        self.min_size = min(min_size, max_size)
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.enabled = enabled and max_size > 0
+
+        self._idle: Deque[_IdleClient] = deque()
+        self._target = self.min_size
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._closed = False
+
+        self._lease_wait = _Timing()
+        self._cold_connect = _Timing()
+        self._warm_connect = _Timing()
+        self._misses = 0
+        self._health_failures = 0
+        self._connect_failures = 0
+
+    async def start(self) -> None:
+        """Start the background task that keeps the pool filled."""
+        if not self.enabled or self._worker is not None:
+            return
+        self._closed = False
+        self._wakeup = asyncio.Event()
+        self._worker = asyncio.create_task(self._maintain())
+
+    async def lease(self) -> ClaudeSDKClient:
+        """Return a connected client, preferring a warm one from the pool."""
+        started = time.perf_counter()
+        while self._idle:
+            entry = self._idle.pop()
+            if await self._is_healthy(entry.client):
+                self._lease_wait.record(time.perf_counter() - started)
+                self._notify()
+                return entry.client
+            self._health_failures += 1
+            await self._disconnect(entry.client)
+
+        # Pool miss: connect on the caller's time and warm more next time.
+        self._misses += 1
+        self._target = min(self._target + 1, self.max_size)
+        self._notify()
+
+        connect_started = time.perf_counter()
+        with span("llm_connect", "tutor_pool_miss"):
+            client = await self._connect()
+        self._cold_connect.record(time.perf_counter() - connect_started)
+        self._lease_wait.record(time.perf_counter() - started)
+        return client
+
+    async def close(self) -> None:
+        """Stop refilling and disconnect every idle client."""
+        self._closed = True
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        while self._idle:
+            await self._disconnect(self._idle.pop().client)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return pool gauges and lease/connect timings."""
+        return {
+            "enabled": self.enabled,
+            "idle": len(self._idle),
+            "target": self._target,
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "misses": self._misses,
+            "health_check_failures": self._health_failures,
+            "connect_failures": self._connect_failures,
+            "lease_wait": self._lease_wait.as_dict(),
+            "cold_connect": self._cold_connect.as_dict(),
+            "background_connect": self._warm_connect.as_dict(),
+        }
+
+    def _notify(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _connect(self) -> ClaudeSDKClient:
+        client = self.client_factory()
+        await client.connect()
+        return client
+
+    async def _disconnect(self, client: ClaudeSDKClient) -> None:
+        try:
+            await client.disconnect()
+        except Exception as exc:
+            print(f"[ClientPool] Error disconnecting client: {exc}")
+
+    async def _is_healthy(self, client: ClaudeSDKClient) -> bool:
+        transport = getattr(client, "_transport", None)
+        if transport is None or not transport.is_ready():
+            return False
+        try:
+            return await client.get_server_info() is not None
+        except Exception:
+            return False
+
+    async def _evict(self) -> None:
+        """Drop unhealthy clients and shrink surplus idle ones past their timeout."""
+        now = time.monotonic()
+        # Probe one client at a time, oldest first. Only the client being
+        # probed is detached, so concurrent leases keep finding the others.
+        for _ in range(len(self._idle)):
+            if not self._idle or self._closed:
+                return
+            entry = self._idle.popleft()
+            if (
+                now - entry.idle_since > self.idle_timeout
+                and len(self._idle) >= self.min_size
+                and self._target > self.min_size
+            ):
+                self._target -= 1
+                await self._disconnect(entry.client)
+            elif not await self._is_healthy(entry.client):
+                self._health_failures += 1
+                await self._disconnect(entry.client)
+            else:
+                self._idle.append(entry)
+
+    async def _maintain(self) -> None:
+        while not self._closed:
+            await self._evict()
+
+            while len(self._idle) < self._target and not self._closed:
+                started = time.perf_counter()
+                try:
+                    client = await self._connect()
+                except Exception as exc:
+                    self._connect_failures += 1
+                    print(f"[ClientPool] Background connect failed: {exc}")
+                    break
+                self._warm_connect.record(time.perf_counter() - started)
+                self._idle.append(_IdleClient(client))
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.health_check_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
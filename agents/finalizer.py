@@ -8,34 +8,9 @@ from claude_agent_sdk import (
     ClaudeSDKClient,
     TextBlock,
 )
-from database.db_helpers import get_skill_levels, set_skill_level
-
-
-def get_unique_topics_helper():
-    """Helper to get unique topics from question bank."""
-    from database.db import DatabaseManager
-    
-    try:
-        conn = DatabaseManager.get_connection()
-        cursor = conn.cursor()
-        
-        query_sql = """
-            SELECT DISTINCT topic_tag1 FROM questions 
-            UNION 
-            SELECT DISTINCT topic_tag2 FROM questions
-            UNION
-            SELECT DISTINCT topic_tag3 FROM questions
-            WHERE topic_tag3 IS NOT NULL
-        """
-        cursor.execute(query_sql)
-        results = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
-        
-        return [(row[0], 0) for row in results if row[0]]
-    except Exception:
-        return []
+from database.db_async import load_topic_vocabulary
+from database.db_mcp import StudentBinding, get_mcp_servers
+from tracing import span
 
 
 def _parse_conversation_string(conversation_str: str) -> str:
@@ -54,10 +29,11 @@ def _parse_conversation_string(conversation_str: str) -> str:
     return ""
 
 
-async def finalizer_agent(student_data: dict, conversation_history):
+async def finalizer_agent(student_id: int, student_data: dict, conversation_history):
     """Analyze student performance and provide skill level scores.
     
     Args:
+        student_id: Student whose skill levels the scores are compared with
         student_data: Dictionary with student info (exam_name, student_name, memory)
         conversation_history: Either a string in format "[tutor]: 'msg' [student]: 'msg' ..." 
                             or a list of dicts with role/content keys
@@ -68,11 +44,10 @@ async def finalizer_agent(student_data: dict, conversation_history):
     student_name = student_data.get("student_name", "default")
     exam_name = student_data.get("exam_name", "default")
     
-    # Get current skill levels and available topics
-    skill_levels = get_skill_levels()
-    current_skills = {t: l for t, l in skill_levels}
-    topics = get_unique_topics_helper()
-    topics_list = ", ".join([t[0] if isinstance(t, tuple) else t for t in topics if not isinstance(topics, str)]) if topics and not isinstance(topics, str) else "general"
+    # Topics and skill levels come pre-formatted from the in-process cache
+    vocabulary = await load_topic_vocabulary(student_id)
+    topics_list = vocabulary.topics_text
+    skills_context = vocabulary.skills_text
     
     # Build context strings
     # Handle both string format and list format for conversation history
@@ -83,12 +58,11 @@ async def finalizer_agent(student_data: dict, conversation_history):
     else:
         conversation_text = str(conversation_history)
     
-    skills_context = "\n".join([f"- {t}: {l}" for t, l in current_skills.items()]) or "- No prior skills"
     memory_context = "\n".join(f"- {item}" for item in student_data.get("memory", [])) or "- No prior context"
     
     prompt = f"""Analyze this tutoring session and score the student's performance:
 
-Student: {student_name}
+Student: {student_name} (Student ID: {student_id})
 Exam: {exam_name}
 
 Available Topics: {topics_list}
@@ -100,27 +74,33 @@ Session Conversation:
 
 Return ONLY valid JSON with topic names as keys and scores (0-100) as values. Example: {{"algebra": 45, "geometry": 75}}
 ONLY return topics that are relevant to the conversation above!
+Use topic names exactly as listed in Available Topics or Current Skills; scores for any other topic are discarded.
 """
 
     options = ClaudeAgentOptions(
         model="haiku",
         system_prompt="""You are a performance evaluator. Analyze conversation and estimate student scores (0-100 scale: 0-25=novice, 26-50=beginner, 51-75=intermediate, 76-100=advanced). Return ONLY valid JSON with format: {"topic": score, ...}. No other text.""",
         permission_mode='acceptEdits',
-        mcp_servers={
-            "database": {"command": "-m", "args": ["database.db_mcp"]}
-        }
+        mcp_servers=get_mcp_servers(StudentBinding(student_id))
     )
 
     result_text = ""
     try:
-        async with ClaudeSDKClient(options=options) as client:
-            await client.query(prompt=prompt)   
-
-            async for message in client.receive_response():
-                if isinstance(message, AssistantMessage):
-                    for block in message.content:
-                        if isinstance(block, TextBlock):
-                            result_text += block.text
+        client = ClaudeSDKClient(options=options)
+        with span("llm_connect", "finalizer"):
+            await client.connect()
+        try:
+            with span("llm_completion", "finalizer") as completion:
+                await client.query(prompt=prompt)
+
+                async for message in client.receive_response():
+                    if isinstance(message, AssistantMessage):
+                        for block in message.content:
+                            if isinstance(block, TextBlock):
+                                completion.mark("llm_first_token")
+                                result_text += block.text
+        finally:
+            await client.disconnect()
     except Exception as e:
         print(f"Error in finalizer query: {e}")
 
@@ -151,7 +131,5 @@ ONLY return topics that are relevant to the conversation above!
         print("Finalizer returned unexpected data type, falling back to default score")
         return None
 
-    # print(f"Finalizer cleaned text: {cleaned_text}")
-    # for topic, score in result.items():
-    #     set_skill_level(topic, score)
+    # Skill levels are written by the finalizer queue in one batched upsert
     return result
\ No newline at end of file
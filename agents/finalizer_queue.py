@@ -0,0 +1,252 @@
+# Background queue for session finalization.
+# Evaluating a session is a full LLM call, so /finalizer enqueues a job and
+# returns its id instead of holding the request open. A fixed number of
+# workers drain the queue, which caps concurrent finalizer LLM calls however
+# many sessions end at once, and each job's scores are written to
+# skill_levels with one batched upsert. Only topics the question bank or the
+# student's skill levels already know are written; the model may not add
+# topics of its own.
+
+import asyncio
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+from agents.finalizer import finalizer_agent
+from database.db_async import load_topic_vocabulary, set_skill_levels
+from tracing import span
+
+
+FINALIZER_WORKERS = int(os.getenv("EIGEN_FINALIZER_WORKERS", "2"))
+FINALIZER_MAX_QUEUE = int(os.getenv("EIGEN_FINALIZER_MAX_QUEUE", "100"))
+FINALIZER_JOB_TTL = float(os.getenv("EIGEN_FINALIZER_JOB_TTL", "3600"))
+
+MIN_SKILL_LEVEL = 0
+MAX_SKILL_LEVEL = 100
+# skill_levels.topic is VARCHAR(255)
+MAX_TOPIC_CHARS = 255
+
+
+class FinalizerQueueFull(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+@dataclass
+class FinalizerJob:
+    """One session evaluation, from submission to applied skill levels."""
+
+    student_id: int
+    student_data: Dict[str, Any]
+    conversation_history: Any
+    job_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = "queued"  # queued -> running -> done | failed
+    score_deltas: Optional[Dict[str, int]] = None
+    skills_updated: int = 0
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    _done: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    async def wait(self, timeout: Optional[float] = None) -> "FinalizerJob":
+        """Wait until the job has finished (or ``timeout`` seconds pass)."""
+        try:
+            await asyncio.wait_for(self._done.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "student_id": self.student_id,
+            "status": self.status,
+            "score_deltas": self.score_deltas,
+            "skills_updated": self.skills_updated,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+def clean_scores(result: Any, known_topics: Iterable[str]) -> Dict[str, int]:
+    """Keep numeric scores for known topics, clamped to the skill range.
+
+    Topics are matched case-insensitively and stored under their known
+    spelling. Anything else the model returned is logged and dropped.
+    """
+    if not isinstance(result, dict):
+        return {}
+    vocabulary = {topic.lower(): topic for topic in known_topics if topic and len(topic) <= MAX_TOPIC_CHARS}
+    scores = {}
+    for topic, score in result.items():
+        topic = str(topic).strip()
+        known = vocabulary.get(topic.lower())
+        if known is None:
+            print(f"[FinalizerQueue] Ignoring score for unknown topic {topic[:MAX_TOPIC_CHARS]!r}")
+            continue
+        try:
+            level = int(round(float(score)))
+        except (TypeError, ValueError):
+            print(f"[FinalizerQueue] Ignoring non-numeric score for {known!r}: {score!r}")
+            continue
+        scores[known] = min(max(level, MIN_SKILL_LEVEL), MAX_SKILL_LEVEL)
+    return scores
+
+
+class FinalizerQueue:
+    """Bounded job queue drained by ``workers`` background tasks."""
+
+    def __init__(
+        self,
+        workers: int = FINALIZER_WORKERS,
+        max_queue: int = FINALIZER_MAX_QUEUE,
+        job_ttl: float = FINALIZER_JOB_TTL,
+    ) -> None:
+        self.workers = max(1, workers)
+        self.max_queue = max(1, max_queue)
+        self.job_ttl = job_ttl
+
+        self._jobs: Dict[str, FinalizerJob] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+        self._started = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._run_time = 0.0
+        self._queue_time = 0.0
+
+    async def start(self) -> None:
+        """Start the worker tasks."""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._tasks = [
+            asyncio.create_task(self._work(), name=f"finalizer-worker-{index}")
+            for index in range(self.workers)
+        ]
+
+    async def close(self) -> None:
+        """Stop the workers; queued and running jobs are marked failed."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for job in self._jobs.values():
+            if not job.finished:
+                self._finish(job, error="Server shut down before the job finished")
+
+    async def submit(
+        self, student_id: int, student_data: Dict[str, Any], conversation_history: Any
+    ) -> FinalizerJob:
+        """Enqueue a finalization job.
+
+        Raises:
+            FinalizerQueueFull: if ``max_queue`` jobs are already waiting
+        """
+        if self._queue is None:
+            await self.start()
+        self._prune()
+        job = FinalizerJob(
+            student_id=student_id,
+            student_data=student_data,
+            conversation_history=conversation_history,
+        )
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self._rejected += 1
+            raise FinalizerQueueFull(f"Finalizer queue is full ({self.max_queue} jobs waiting)")
+        self._jobs[job.job_id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[FinalizerJob]:
+        return self._jobs.get(job_id)
+
+    async def _work(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: FinalizerJob) -> None:
+        job.status = "running"
+        job.started_at = time.time()
+        self._started += 1
+        self._queue_time += job.started_at - job.created_at
+        try:
+            with span("finalizer_job", "finalizer"):
+                result = await finalizer_agent(job.student_id, job.student_data, job.conversation_history)
+                if result is None:
+                    raise ValueError("Finalizer returned no usable scores")
+                # Served from the cache the finalizer prompt was built from;
+                # skill topics are cached in lowercase, so the bank's spelling goes last and wins
+                vocabulary = await load_topic_vocabulary(job.student_id)
+                job.score_deltas = clean_scores(result, [*vocabulary.skills, *vocabulary.topics])
+                # One multi-row upsert for every topic in the evaluation
+                job.skills_updated = await set_skill_levels(job.student_id, job.score_deltas)
+        except asyncio.CancelledError:
+            self._finish(job, error="Cancelled")
+            raise
+        except Exception as exc:
+            print(f"[FinalizerQueue] Job {job.job_id} failed: {exc}")
+            self._finish(job, error=str(exc))
+        else:
+            print(
+                f"[FinalizerQueue] Job {job.job_id} updated {job.skills_updated} skill level(s) "
+                f"for student {job.student_id}"
+            )
+            self._finish(job)
+
+    def _finish(self, job: FinalizerJob, error: Optional[str] = None) -> None:
+        job.status = "failed" if error else "done"
+        job.error = error
+        job.finished_at = time.time()
+        if job.started_at is not None:
+            self._run_time += job.finished_at - job.started_at
+        if error:
+            self._failed += 1
+        else:
+            self._completed += 1
+        job._done.set()
+
+    def _prune(self) -> None:
+        """Forget finished jobs older than ``job_ttl``."""
+        cutoff = time.time() - self.job_ttl
+        expired = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.finished and job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth, worker usage and job timings."""
+        finished = self._completed + self._failed
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "running": sum(1 for job in self._jobs.values() if job.status == "running"),
+            "completed": self._completed,
+            "failed": self._failed,
+            "rejected": self._rejected,
+            "tracked_jobs": len(self._jobs),
+            "avg_run_ms": round(self._run_time / finished * 1000, 2) if finished else 0.0,
+            "avg_queue_wait_ms": round(self._queue_time / self._started * 1000, 2) if self._started else 0.0,
+        }
+
+
+finalizer_queue = FinalizerQueue()
@@ -1,6 +1,6 @@
-"""Initializer agent for setting up the single student's study session."""
+"""Initializer agent for setting up a student's study session."""
 
-from database.db_helpers import (
+from database.db_async import (
     get_calendar_entry,
     set_calendar_entry,
 )
@@ -11,7 +11,7 @@ async def initializer_agent(student_data: dict, date: str) -> dict:
     Initialize a student session by setting up the calendar entry.
     
     Args:
-        student_data: Dictionary with student_name, exam_name, memory
+        student_data: Dictionary with student_id, student_name, exam_name, memory
         date: Date for the session in YYYY-MM-DD format
         
     Returns:
@@ -22,7 +22,7 @@ async def initializer_agent(student_data: dict, date: str) -> dict:
     #     exam_name = student_data.get("exam_name", "default")
 
     #     # Check if entry already exists
-    #     entry = get_calendar_entry(date)
+    #     entry = await get_calendar_entry(student_data["student_id"], date)
 
     #     if entry:
     #         return entry
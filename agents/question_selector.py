@@ -0,0 +1,260 @@
+"""Deterministic question selection for the questioner fast path."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# Numeric position of the textual difficulty labels used in the question bank
+DIFFICULTY_LEVELS = {
+    "easy": 1.0,
+    "beginner": 1.0,
+    "medium": 2.0,
+    "intermediate": 2.0,
+    "hard": 3.0,
+    "advanced": 3.0,
+}
+
+# Skill level (0-100) upper bound -> target difficulty, following the README
+# bands: novice gets easy questions, advanced students get hard ones.
+SKILL_BANDS: List[Tuple[int, float]] = [
+    (25, 1.0),   # Novice
+    (50, 1.5),   # Beginner
+    (75, 2.5),   # Intermediate
+    (100, 3.0),  # Advanced
+]
+DEFAULT_TARGET_DIFFICULTY = 2.0
+# Distance charged to questions whose difficulty cannot be parsed
+UNKNOWN_DIFFICULTY_PENALTY = 1.0
+
+# Prompt pruning for the model-driven path
+PROMPT_TOP_K = int(os.getenv("EIGEN_QUESTIONER_TOP_K", "5"))
+PROMPT_TOKEN_BUDGET = int(os.getenv("EIGEN_QUESTIONER_TOKEN_BUDGET", "3000"))
+SUMMARY_CHARS = 160
+# Rough characters-per-token ratio for JSON prompt payloads
+CHARS_PER_TOKEN = 4
+
+
+def normalize_topic(topic: str) -> str:
+    """Normalize a topic name so calendar, skill and question tags compare equal."""
+    return topic.strip().lower().replace(" ", "_")
+
+
+def difficulty_value(difficulty: Any) -> Optional[float]:
+    """Map a stored difficulty (label or number) onto the 1-3 scale."""
+    if difficulty is None:
+        return None
+    label = str(difficulty).strip().lower()
+    if label in DIFFICULTY_LEVELS:
+        return DIFFICULTY_LEVELS[label]
+    try:
+        value = float(label)
+    except ValueError:
+        return None
+    # Accept 1-3, 1-10 and 0-100 numeric scales
+    if value <= 3:
+        return max(value, 1.0)
+    if value <= 10:
+        return 1.0 + (value - 1.0) * 2.0 / 9.0
+    return 1.0 + min(value, 100.0) * 2.0 / 100.0
+
+
+def target_difficulty(skill_level: Optional[int]) -> float:
+    """Return the difficulty that best fits a 0-100 skill level."""
+    if skill_level is None:
+        return DEFAULT_TARGET_DIFFICULTY
+    for upper_bound, difficulty in SKILL_BANDS:
+        if skill_level <= upper_bound:
+            return difficulty
+    return SKILL_BANDS[-1][1]
+
+
+def lookup_skill_level(skill_levels: Dict[str, int], topic: str) -> Optional[int]:
+    """Find a topic's skill level regardless of case or spacing."""
+    if topic in skill_levels:
+        return skill_levels[topic]
+    normalized = {normalize_topic(name): level for name, level in skill_levels.items()}
+    return normalized.get(normalize_topic(topic))
+
+
+def _question_key(question: Dict[str, Any]) -> str:
+    question_id = question.get("question_id")
+    return str(question_id) if question_id is not None else str(question.get("question_prompt", ""))
+
+
+def _tiebreak(seed: str, topic: str, question: Dict[str, Any]) -> str:
+    # Stable across processes (unlike hash()), but rotates with the seed
+    material = f"{seed}|{normalize_topic(topic)}|{_question_key(question)}"
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def rank_candidates(
+    topic: str,
+    candidates: List[Dict[str, Any]],
+    skill_level: Optional[int],
+    seed: str = "",
+) -> List[Dict[str, Any]]:
+    """Order candidates best first.
+
+    Unasked questions come before asked ones, then questions closest to the
+    difficulty band for the student's skill level. Remaining ties are broken
+    by a hash of ``seed``, topic and question, so a given seed (e.g. the
+    date) always produces the same order.
+    """
+    target = target_difficulty(skill_level)
+
+    def sort_key(question: Dict[str, Any]) -> Tuple[int, float, str]:
+        value = difficulty_value(question.get("difficulty"))
+        distance = abs(value - target) if value is not None else UNKNOWN_DIFFICULTY_PENALTY
+        asked = 1 if question.get("has_been_asked") else 0
+        return asked, distance, _tiebreak(seed, topic, question)
+
+    return sorted(candidates, key=sort_key)
+
+
+def select_questions(
+    topics: List[str],
+    questions_by_topic: Dict[str, List[Dict[str, Any]]],
+    skill_levels: Dict[str, int],
+    seed: str = "",
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Pick at most one question per topic without calling the model.
+
+    Returns:
+        Tuple of (selected questions, topics that had no candidates)
+    """
+    selected: List[Dict[str, Any]] = []
+    missing: List[str] = []
+    used: set = set()
+
+    for topic in topics:
+        skill_level = lookup_skill_level(skill_levels, topic)
+        ranked = [
+            question
+            for question in rank_candidates(topic, questions_by_topic.get(topic, []), skill_level, seed)
+            # A question tagged with several scheduled topics is only served once
+            if _question_key(question) not in used
+        ]
+        if not ranked:
+            missing.append(topic)
+            continue
+
+        choice = dict(ranked[0])
+        used.add(_question_key(choice))
+        choice.setdefault("source_topic", topic)
+        level = skill_level if skill_level is not None else "unknown"
+        novelty = "not yet asked" if not choice.get("has_been_asked") else "previously asked"
+        choice["selection_reason"] = f"Best difficulty fit for skill level {level} ({novelty})"
+        selected.append(choice)
+
+    return selected, missing
+
+
+@dataclass
+class PruneReport:
+    """How much of the candidate payload was kept for the model prompt."""
+
+    candidates_before: int
+    candidates_after: int
+    tokens_before: int
+    tokens_after: int
+    token_budget: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+    def __str__(self) -> str:
+        return (
+            f"{self.candidates_after}/{self.candidates_before} candidates, "
+            f"~{self.tokens_after} tokens (saved ~{self.tokens_saved}, budget {self.token_budget})"
+        )
+
+
+def estimate_tokens(payload: Any) -> int:
+    """Approximate the prompt tokens a JSON payload will cost."""
+    return len(json.dumps(payload, ensure_ascii=False)) // CHARS_PER_TOKEN + 1
+
+
+def summarize_candidate(question: Dict[str, Any]) -> Dict[str, Any]:
+    """Reduce a candidate to what the model needs to choose it: ID and a short summary."""
+    prompt = str(question.get("question_prompt") or "")
+    if len(prompt) > SUMMARY_CHARS:
+        prompt = prompt[:SUMMARY_CHARS].rstrip() + "..."
+    return {
+        "question_id": question.get("question_id"),
+        "summary": prompt,
+        "difficulty": question.get("difficulty"),
+        "has_been_asked": question.get("has_been_asked"),
+    }
+
+
+def prune_candidates(
+    questions_by_topic: Dict[str, List[Dict[str, Any]]],
+    skill_levels: Dict[str, int],
+    top_k: int = PROMPT_TOP_K,
+    token_budget: int = PROMPT_TOKEN_BUDGET,
+    seed: str = "",
+) -> Tuple[Dict[str, List[Dict[str, Any]]], PruneReport]:
+    """Shrink the candidate payload sent to the model.
+
+    Keeps the ``top_k`` best candidates per topic (by ``rank_candidates``),
+    strips them to ``summarize_candidate`` output, then drops the weakest
+    remaining candidate of the largest topic until the payload fits
+    ``token_budget``. Every topic keeps at least one candidate.
+    """
+    pruned: Dict[str, List[Dict[str, Any]]] = {}
+    for topic, candidates in questions_by_topic.items():
+        ranked = rank_candidates(topic, candidates, lookup_skill_level(skill_levels, topic), seed)
+        pruned[topic] = [summarize_candidate(question) for question in ranked[:top_k]]
+
+    while estimate_tokens(pruned) > token_budget:
+        topic = max(pruned, key=lambda name: len(pruned[name]), default=None)
+        if topic is None or len(pruned[topic]) <= 1:
+            break
+        pruned[topic].pop()
+
+    report = PruneReport(
+        candidates_before=sum(len(candidates) for candidates in questions_by_topic.values()),
+        candidates_after=sum(len(candidates) for candidates in pruned.values()),
+        tokens_before=estimate_tokens(questions_by_topic),
+        tokens_after=estimate_tokens(pruned),
+        token_budget=token_budget,
+    )
+    return pruned, report
+
+
+def reattach_questions(
+    selected: List[Dict[str, Any]],
+    questions_by_topic: Dict[str, List[Dict[str, Any]]],
+) -> List[Dict[str, Any]]:
+    """Replace model picks that reference a ``question_id`` with the full stored row.
+
+    The model's ``source_topic`` and ``selection_reason`` are kept; questions
+    the model wrote itself (no known ID) pass through unchanged.
+    """
+    full_rows = {
+        str(question["question_id"]): question
+        for candidates in questions_by_topic.values()
+        for question in candidates
+        if question.get("question_id") is not None
+    }
+
+    reattached = []
+    for choice in selected:
+        if not isinstance(choice, dict):
+            continue
+        row = full_rows.get(str(choice.get("question_id")))
+        if row is None:
+            reattached.append(choice)
+            continue
+        question = dict(row)
+        for key in ("source_topic", "selection_reason"):
+            if choice.get(key):
+                question[key] = choice[key]
+        reattached.append(question)
+    return reattached
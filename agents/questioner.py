@@ -3,8 +3,9 @@
 from __future__ import annotations
 
 import json
+import os
 from datetime import datetime
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 from claude_agent_sdk import (
     AssistantMessage,
@@ -13,48 +14,32 @@ from claude_agent_sdk import (
     TextBlock,
 )
 
-from database.db_helpers import get_calendar_entry, get_questions_by_topic, get_skill_levels
+from agents.question_selector import prune_candidates, reattach_questions, select_questions
+from database.db_async import (
+    get_calendar_entry,
+    get_questions_by_topics,
+    get_skill_levels,
+    get_topic_stats,
+    session as db_session,
+)
+from tracing import span
 
 
-async def question_agent(current_date) -> List[Dict[str, Any]]:
-    """Select questions tailored to the student's scheduled topics and skill levels."""
-    print(f"Running question_agent for date: {current_date}")
-    calendar_entry = get_calendar_entry(current_date)
-    print(f"Calendar entry for {current_date}: {calendar_entry}")
-    topics: List[str] = calendar_entry.get("topics", []) if calendar_entry else []
-    if not topics:
-        print(f"No topics found for date {current_date}")
-        return []
+# "local" picks from the bank deterministically and only asks the model to write
+# questions for topics without candidates; "llm" lets the model choose everything.
+QUESTION_SELECTION_MODE = os.getenv("EIGEN_QUESTION_SELECTION", "local")
 
-    print(f"Found topics: {topics}")
-    skill_pairs = get_skill_levels()
-    skill_levels = {topic: level for topic, level in skill_pairs}
-    print(f"Student skill levels: {skill_levels}")
 
-    questions_by_topic: Dict[str, List[Dict[str, Any]]] = {}
-    for topic in topics:
-        topic_questions = get_questions_by_topic(topic)
-        print(f"Found {len(topic_questions)} questions for topic: {topic}")
-        if topic_questions:
-            questions_by_topic[topic] = [
-                {
-                    "question_prompt": question.get("question_prompt"),
-                    "topic_tag1": question.get("topic_tag1"),
-                    "topic_tag2": question.get("topic_tag2"),
-                    "topic_tag3": question.get("topic_tag3"),
-                    "answer": question.get("answer"),
-                    "explanation": question.get("explanation"),
-                    "difficulty": question.get("difficulty"),
-                    "has_been_asked": question.get("has_been_asked"),
-                    "source_topic": topic,
-                }
-                for question in topic_questions
-            ]
-
-    if not questions_by_topic:
-        print("No questions available for any topic")
-        return []
+async def _llm_select_questions(
+    topics: List[str],
+    skill_levels: Dict[str, int],
+    questions_by_topic: Dict[str, List[Dict[str, Any]]],
+) -> Optional[List[Dict[str, Any]]]:
+    """Ask Claude to select (or write) one question per topic.
 
+    Returns:
+        The selected questions, or None if the model reply was unusable
+    """
     print(f"Querying Claude agent for question selection")
     payload = {
         "scheduled_topics": topics,
@@ -80,7 +65,8 @@ async def question_agent(current_date) -> List[Dict[str, Any]]:
         "If you are creating your own questions, make sure you fill in all fields, including explanation, answer, difficulty, and has_been_asked (which should be false for newly created questions)."
         "\n\nRules:\n"
         "- Return a JSON array.\n"
-        "- Each element must include the keys: question_prompt, topic_tag1, topic_tag2, topic_tag3, answer, explanation, difficulty, has_been_asked, source_topic, selection_reason.\n"
+        "- Candidates are summarized. To pick one, return only its question_id, source_topic and selection_reason; the full question is filled in afterwards.\n"
+        "- Each new question you create must include the keys: question_prompt, topic_tag1, topic_tag2, topic_tag3, answer, explanation, difficulty, has_been_asked, source_topic, selection_reason.\n"
         "- Only include topics present in scheduled_topics.\n"
         "- Do not include any additional text outside the JSON array.\n\n"
         f"Data payload:\n{json.dumps(payload, ensure_ascii=False)}"
@@ -89,23 +75,30 @@ async def question_agent(current_date) -> List[Dict[str, Any]]:
     response_text = ""
     try:
         print("Making request to Claude agent")
-        async with ClaudeSDKClient(options=options) as client:
-            await client.query(prompt=prompt)
-
-            async for message in client.receive_response():
-                if isinstance(message, AssistantMessage):
-                    for block in message.content:
-                        if isinstance(block, TextBlock):
-                            response_text += block.text
+        client = ClaudeSDKClient(options=options)
+        with span("llm_connect", "questioner"):
+            await client.connect()
+        try:
+            with span("llm_completion", "questioner") as completion:
+                await client.query(prompt=prompt)
+
+                async for message in client.receive_response():
+                    if isinstance(message, AssistantMessage):
+                        for block in message.content:
+                            if isinstance(block, TextBlock):
+                                completion.mark("llm_first_token")
+                                response_text += block.text
+        finally:
+            await client.disconnect()
 
     except Exception as exc:
         print(f"Error in question_agent: {exc}")
-        return []
+        return None
 
     response_text = response_text.strip()
     if not response_text:
         print("Claude agent returned empty response")
-        return []
+        return None
 
     try:
         print("Parsing Claude agent response")
@@ -114,17 +107,85 @@ async def question_agent(current_date) -> List[Dict[str, Any]]:
             print(f"Successfully selected {len(selected_questions)} questions")
             return selected_questions
     except json.JSONDecodeError:
-        print("Question agent returned invalid JSON payload; falling back to deterministic selection")
-
-    fallback: List[Dict[str, Any]] = []
-    for topic in topics:
-        candidates = questions_by_topic.get(topic)
-        if candidates:
-            fallback_question = dict(candidates[0])
-            fallback_question.setdefault("source_topic", topic)
-            fallback_question["selection_reason"] = "Default selection due to invalid model response"
-            fallback.append(fallback_question)
-            print(f"Using fallback question for topic: {topic}")
-
-    print(f"Returning {len(fallback)} fallback questions")
-    return fallback
+        print("Question agent returned invalid JSON payload")
+
+    return None
+
+
+async def question_agent(student_id: int, current_date) -> List[Dict[str, Any]]:
+    """Select questions tailored to the student's scheduled topics and skill levels."""
+    print(f"Running question_agent for student {student_id} on {current_date}")
+    # All lookups for this request share one connection checkout
+    async with db_session() as session:
+        calendar_entry = await get_calendar_entry(student_id, current_date, session=session)
+        print(f"Calendar entry for {current_date}: {calendar_entry}")
+        topics: List[str] = calendar_entry.get("topics", []) if calendar_entry else []
+        if not topics:
+            print(f"No topics found for date {current_date}")
+            return []
+
+        print(f"Found topics: {topics}")
+        skill_pairs = await get_skill_levels(student_id, session=session)
+        skill_levels = {topic: level for topic, level in skill_pairs}
+        print(f"Student skill levels: {skill_levels}")
+
+        # One indexed read tells us which topics have any questions to fetch
+        # (keys lowercased to match the case-insensitive column collation)
+        question_counts = {
+            row["topic"].lower(): row["question_count"]
+            for row in await get_topic_stats(topics, session=session)
+        }
+        stocked_topics = [topic for topic in topics if question_counts.get(topic.lower())]
+        for topic in topics:
+            if topic not in stocked_topics:
+                print(f"No questions in the bank for topic: {topic}")
+        # Every stocked topic in a single IN (...) query
+        fetched = await get_questions_by_topics(stocked_topics, session=session) if stocked_topics else {}
+
+    questions_by_topic: Dict[str, List[Dict[str, Any]]] = {}
+    for topic, topic_questions in fetched.items():
+        print(f"Found {len(topic_questions)} questions for topic: {topic}")
+        if topic_questions:
+            questions_by_topic[topic] = [
+                {
+                    "question_id": question.get("id"),
+                    "question_prompt": question.get("question_prompt"),
+                    "topic_tag1": question.get("topic_tag1"),
+                    "topic_tag2": question.get("topic_tag2"),
+                    "topic_tag3": question.get("topic_tag3"),
+                    "answer": question.get("answer"),
+                    "explanation": question.get("explanation"),
+                    "difficulty": question.get("difficulty"),
+                    "has_been_asked": question.get("has_been_asked"),
+                    "source_topic": topic,
+                }
+                for question in topic_questions
+            ]
+
+    # The student and date seed tie-breaking so repeated calls on one day agree
+    seed = f"{student_id}:{current_date}"
+    selected, missing_topics = select_questions(topics, questions_by_topic, skill_levels, seed=seed)
+
+    if QUESTION_SELECTION_MODE != "llm":
+        print(f"Selected {len(selected)} questions locally; no candidates for: {missing_topics}")
+        if not missing_topics:
+            return selected
+        generated = await _llm_select_questions(missing_topics, skill_levels, {})
+        return selected + (generated or [])
+
+    if not questions_by_topic:
+        print("No questions available for any topic")
+        return []
+
+    # Send ranked, summarized candidates instead of the whole bank
+    pruned_candidates, prune_report = prune_candidates(questions_by_topic, skill_levels, seed=seed)
+    print(f"Pruned questioner prompt: {prune_report}")
+
+    llm_selected = await _llm_select_questions(topics, skill_levels, pruned_candidates)
+    if llm_selected is not None:
+        return reattach_questions(llm_selected, questions_by_topic)
+
+    print(f"Falling back to {len(selected)} deterministic selections")
+    for question in selected:
+        question["selection_reason"] = "Default selection due to invalid model response"
+    return selected
@@ -0,0 +1,169 @@
+# Incremental extraction of the tutor's JSON reply while it is still streaming.
+# The tutor answers with {"response": "...", "correct_status": true/false}; this
+# pulls the decoded "response" text out chunk by chunk and reports
+# correct_status as soon as it appears, so clients never wait for the closing brace.
+
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+
+_RESPONSE_KEY = re.compile(r'"response"\s*:\s*"')
+_CORRECT_STATUS = re.compile(r'"correct_status"\s*:\s*(true|false)', re.IGNORECASE)
+# Second half of a \uXXXX surrogate pair, and any prefix of one still arriving
+_LOW_SURROGATE = re.compile(r"\\u([dD][c-fC-F][0-9a-fA-F]{2})")
+_LOW_SURROGATE_PREFIX = re.compile(r"(\\(u([dD]([c-fC-F][0-9a-fA-F]?)?)?)?)?")
+_FENCE_PREFIXES = ("```json", "```")
+_SIMPLE_ESCAPES = {
+    '"': '"',
+    "\\": "\\",
+    "/": "/",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+}
+# Longest text the key patterns can span, kept when rescanning across chunks.
+_KEY_LOOKBEHIND = 64
+
+
+class ResponseFieldExtractor:
+    """Streams the ``response`` string and ``correct_status`` flag out of partial JSON.
+
+    Call ``feed`` with each text chunk and ``finish`` once the model is done.
+    Both return a list of events: ``{"type": "delta", "text": ...}`` for newly
+    decoded response text and ``{"type": "correct_status", "value": bool}``
+    once the flag has been parsed. Replies that are not JSON at all are
+    streamed through verbatim as response text.
+    """
+
+    def __init__(self) -> None:
+        self.text = ""
+        self.response = ""
+        self.correct_status: Optional[bool] = None
+        self._mode: Optional[str] = None  # "json" or "plain" once known
+        self._state = "seek"  # seek -> value -> closed
+        self._pos = 0
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Consume a chunk of model output and return any new events."""
+        self.text += chunk
+        events: List[Dict[str, Any]] = []
+
+        if self._mode is None:
+            self._mode = self._detect_mode()
+            if self._mode is None:
+                return events
+
+        if self._mode == "plain":
+            delta = self.text[self._pos:]
+            self._pos = len(self.text)
+            self._emit_delta(events, delta)
+            return events
+
+        if self._state == "seek":
+            match = _RESPONSE_KEY.search(self.text, self._pos)
+            if match:
+                self._state = "value"
+                self._pos = match.end()
+            else:
+                self._pos = max(self._pos, len(self.text) - _KEY_LOOKBEHIND)
+
+        if self._state == "value":
+            self._emit_delta(events, self._decode_value())
+
+        if self.correct_status is None:
+            match = _CORRECT_STATUS.search(self.text)
+            if match:
+                self.correct_status = match.group(1).lower() == "true"
+                events.append({"type": "correct_status", "value": self.correct_status})
+
+        return events
+
+    def finish(self) -> List[Dict[str, Any]]:
+        """Flush anything still buffered once the stream has ended."""
+        events: List[Dict[str, Any]] = []
+        if self._mode is None or (self._mode == "json" and self._state == "seek"):
+            # Never saw a response field: fall back to a full parse, then raw text.
+            try:
+                parsed = json.loads(self._strip_fences(self.text))
+            except (json.JSONDecodeError, ValueError):
+                parsed = None
+            if isinstance(parsed, dict) and isinstance(parsed.get("response"), str):
+                self._emit_delta(events, parsed["response"])
+                if self.correct_status is None and isinstance(parsed.get("correct_status"), bool):
+                    self.correct_status = parsed["correct_status"]
+                    events.append({"type": "correct_status", "value": self.correct_status})
+            else:
+                self._emit_delta(events, self.text.strip())
+        return events
+
+    def _emit_delta(self, events: List[Dict[str, Any]], delta: str) -> None:
+        if delta:
+            self.response += delta
+            events.append({"type": "delta", "text": delta})
+
+    @staticmethod
+    def _strip_fences(text: str) -> str:
+        return text.replace("```json", "").replace("```", "").strip()
+
+    def _detect_mode(self) -> Optional[str]:
+        stripped = self.text.lstrip()
+        for fence in _FENCE_PREFIXES:
+            if fence.startswith(stripped):
+                return None  # Could still be the start of a code fence
+            if stripped.startswith(fence):
+                stripped = stripped[len(fence):].lstrip()
+                break
+        if not stripped:
+            return None
+        return "json" if stripped[0] == "{" else "plain"
+
+    def _decode_value(self) -> str:
+        """Decode the response string from ``_pos`` up to what is available."""
+        decoded = []
+        text = self.text
+        pos = self._pos
+        while pos < len(text):
+            char = text[pos]
+            if char == '"':
+                self._state = "closed"
+                pos += 1
+                break
+            if char != "\\":
+                decoded.append(char)
+                pos += 1
+                continue
+
+            # Escape sequence: wait for the rest of it if it is split across chunks
+            if pos + 1 >= len(text):
+                break
+            code = text[pos + 1]
+            if code == "u":
+                if pos + 6 > len(text):
+                    break
+                try:
+                    code_point = int(text[pos + 2:pos + 6], 16)
+                except ValueError:
+                    decoded.append(text[pos:pos + 6])
+                    pos += 6
+                    continue
+                if 0xD800 <= code_point < 0xDC00:
+                    # High surrogate (e.g. an emoji): combine it with the low half
+                    rest = text[pos + 6:pos + 12]
+                    if len(rest) < 6 and _LOW_SURROGATE_PREFIX.fullmatch(rest):
+                        break
+                    low = _LOW_SURROGATE.match(text, pos + 6)
+                    if low:
+                        low_point = int(low.group(1), 16)
+                        code_point = 0x10000 + ((code_point - 0xD800) << 10) + (low_point - 0xDC00)
+                        pos += 6
+                decoded.append(chr(code_point))
+                pos += 6
+            else:
+                decoded.append(_SIMPLE_ESCAPES.get(code, code))
+                pos += 2
+
+        self._pos = pos
+        return "".join(decoded)
@@ -0,0 +1,162 @@
+# Pluggable storage for serialized TutorChat state.
+# Live sessions (with their connected Claude clients) stay in each worker's
+# SessionStore; the backend holds the serializable part so that any worker
+# can rehydrate a session whose follow-up message lands on it.
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from database import db_async
+
+
+SESSION_BACKEND = os.getenv("EIGEN_SESSION_BACKEND", "memory")
+SESSION_DIR = Path(os.getenv(
+    "EIGEN_SESSION_DIR",
+    str(Path(__file__).resolve().parent.parent / "tmp" / "sessions"),
+))
+# How long stored state survives without activity
+SESSION_STATE_TTL = int(os.getenv("EIGEN_SESSION_STATE_TTL", "86400"))
+
+
+class SessionBackend(ABC):
+    """Interface for session state stores. States are JSON-serializable dicts."""
+
+    # Whether other workers can see what this backend stores
+    shared = True
+
+    @abstractmethod
+    async def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Return the stored state, or None if there is none."""
+
+    async def version(self, session_id: str) -> Optional[int]:
+        """Return the stored state's version, or None if there is none."""
+        state = await self.load(session_id)
+        return state.get("version", 0) if state else None
+
+    @abstractmethod
+    async def save(self, session_id: str, state: Dict[str, Any]) -> None:
+        """Store the state, replacing any earlier one."""
+
+    @abstractmethod
+    async def delete(self, session_id: str) -> None:
+        """Forget the state; a missing one is not an error."""
+
+    async def purge_expired(self, max_age_seconds: int) -> int:
+        """Delete state untouched for longer than max_age_seconds."""
+        return 0
+
+
+class InMemorySessionBackend(SessionBackend):
+    """Process-local store; keeps single-worker deployments dependency free."""
+
+    shared = False
+
+    def __init__(self) -> None:
+        self._states: Dict[str, Dict[str, Any]] = {}
+        self._updated: Dict[str, float] = {}
+
+    async def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        return self._states.get(session_id)
+
+    async def save(self, session_id: str, state: Dict[str, Any]) -> None:
+        self._states[session_id] = state
+        self._updated[session_id] = time.time()
+
+    async def delete(self, session_id: str) -> None:
+        self._states.pop(session_id, None)
+        self._updated.pop(session_id, None)
+
+    async def purge_expired(self, max_age_seconds: int) -> int:
+        cutoff = time.time() - max_age_seconds
+        stale = [sid for sid, updated in self._updated.items() if updated < cutoff]
+        for session_id in stale:
+            await self.delete(session_id)
+        return len(stale)
+
+
+class FileSessionBackend(SessionBackend):
+    """One JSON file per session in a directory shared by the workers."""
+
+    def __init__(self, directory: Path = SESSION_DIR) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, session_id: str) -> Path:
+        # Session IDs come from clients, so never use them as file names directly
+        digest = hashlib.sha256(session_id.encode("utf-8")).hexdigest()
+        return self.directory / f"{digest}.json"
+
+    def _read(self, session_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(session_id), "r", encoding="utf-8") as handle:
+                return json.load(handle)
+        except FileNotFoundError:
+            return None
+
+    def _write(self, session_id: str, state: Dict[str, Any]) -> None:
+        path = self._path(session_id)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(state, handle, ensure_ascii=False)
+        # Atomic on POSIX, so readers never see a partial file
+        os.replace(tmp_path, path)
+
+    def _purge(self, max_age_seconds: int) -> int:
+        cutoff = time.time() - max_age_seconds
+        purged = 0
+        for path in self.directory.glob("*.json"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    purged += 1
+            except FileNotFoundError:
+                continue
+        return purged
+
+    async def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._read, session_id)
+
+    async def save(self, session_id: str, state: Dict[str, Any]) -> None:
+        await asyncio.to_thread(self._write, session_id, state)
+
+    async def delete(self, session_id: str) -> None:
+        await asyncio.to_thread(self._path(session_id).unlink, missing_ok=True)
+
+    async def purge_expired(self, max_age_seconds: int) -> int:
+        return await asyncio.to_thread(self._purge, max_age_seconds)
+
+
+class MySQLSessionBackend(SessionBackend):
+    """Stores state in the chat_sessions table."""
+
+    async def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        return await db_async.get_chat_session_state(session_id)
+
+    async def version(self, session_id: str) -> Optional[int]:
+        return await db_async.get_chat_session_version(session_id)
+
+    async def save(self, session_id: str, state: Dict[str, Any]) -> None:
+        await db_async.save_chat_session_state(session_id, state)
+
+    async def delete(self, session_id: str) -> None:
+        await db_async.delete_chat_session_state(session_id)
+
+    async def purge_expired(self, max_age_seconds: int) -> int:
+        return await db_async.purge_chat_session_states(max_age_seconds)
+
+
+def create_session_backend(kind: str = SESSION_BACKEND) -> SessionBackend:
+    """Build the backend selected by EIGEN_SESSION_BACKEND (memory, file or mysql)."""
+    if kind == "memory":
+        return InMemorySessionBackend()
+    if kind == "file":
+        return FileSessionBackend()
+    if kind == "mysql":
+        return MySQLSessionBackend()
+    raise ValueError(f"Unknown session backend: {kind}")
@@ -2,10 +2,12 @@
 FastAPI endpoints for the Eigen Coach tutoring system.
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, File, HTTPException, Response, UploadFile, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, ValidationError, model_validator
 from typing import Dict, Optional, List, Any, Union
+from contextlib import aclosing
 from datetime import datetime
 import asyncio
 import json
@@ -14,12 +16,27 @@ import json
 from agents.initializer import initializer_agent
 from agents.questioner import question_agent
 from agents.chatter import TutorChat
-from agents.chat_manager import get_session, create_session, end_session
-from agents.finalizer import finalizer_agent
+from agents.chat_manager import (
+    get_session,
+    peek_session,
+    create_session,
+    end_session,
+    save_session,
+    session_stats,
+    tutor_client_pool,
+)
+from agents.finalizer_queue import FinalizerJob, FinalizerQueueFull, finalizer_queue
 
 # Database
 from database.db import DatabaseManager
-from database.db_helpers import get_student_name, get_exam_name, get_student_memory
+from database.db_async import create_student, load_student_context
+from database.student_context import UnknownStudent, student_context_stats
+
+# Image attachments
+from image_store import ImageError, ImageTooLarge, describe_image, image_cache_stats, save_upload
+
+# Tracing
+from tracing import TracingMiddleware, render_metrics, span
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -37,20 +54,34 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
+# Time every request per endpoint and stage (see tracing.py)
+app.add_middleware(TracingMiddleware)
+
 # ============================================================================
 # Request/Response Models
 # ============================================================================
 
 class StudentData(BaseModel):
     """Student information."""
+    student_id: Optional[int] = None
     student_name: str
     exam_name: str
     memory: List[str] = []
 
 
+class StudentCreateRequest(BaseModel):
+    """Request to register a student."""
+    student_name: str
+    exam_name: str
+
+
+# Requests below take an optional student_id; without one they act on the
+# default student (EIGEN_DEFAULT_STUDENT_ID, or the lowest id).
+
 class InitializerRequest(BaseModel):
     """Request to initialize a student session."""
-    student_data: StudentData
+    student_id: Optional[int] = None
+    student_data: Optional[StudentData] = None
     date: Optional[str] = None
 
 
@@ -63,7 +94,8 @@ class InitializerResponse(BaseModel):
 
 class QuestionerRequest(BaseModel):
     """Request to select a question."""
-    date: Optional[str]
+    student_id: Optional[int] = None
+    date: Optional[str] = None
 
 
 class QuestionerResponse(BaseModel):
@@ -74,10 +106,13 @@ class QuestionerResponse(BaseModel):
 class ChatRequest(BaseModel):
     """Request for tutoring chat."""
     session_id: str
+    # Only used to start a session; later messages must not name another student
+    student_id: Optional[int] = None
     user_message: str
     # question_answer is only required for the first message in a session
     question_answer: Optional[str] = None
-    contains_image: Optional[bool] = False
+    # id returned by POST /images, for a message about an image
+    image_id: Optional[str] = None
 
 
 class ChatResponse(BaseModel):
@@ -86,14 +121,32 @@ class ChatResponse(BaseModel):
 
 
 class FinalizerRequest(BaseModel):
-    """Request for performance evaluation."""
-    student_data: StudentData
-    conversation_history: Union[str, List[Dict]]  # Accept both string format and list format
+    """Request for performance evaluation.
+
+    Send either ``session_id`` to evaluate the transcript recorded by
+    ``/chatter``, or the ``conversation_history`` itself. With a
+    ``session_id`` the student defaults to the session's.
+    """
+    student_id: Optional[int] = None
+    student_data: Optional[StudentData] = None
+    session_id: Optional[str] = None
+    conversation_history: Optional[Union[str, List[Dict]]] = None  # Accept both string format and list format
+
+    @model_validator(mode="after")
+    def check_conversation_source(self) -> "FinalizerRequest":
+        if self.session_id is None and self.conversation_history is None:
+            raise ValueError("Provide either 'session_id' or 'conversation_history'.")
+        return self
 
 
 class FinalizerResponse(BaseModel):
-    """Response from finalizer agent."""
-    score_deltas: Dict[str, int]
+    """Status of a finalization job; score_deltas is set once it is done."""
+    job_id: str
+    student_id: int
+    status: str
+    score_deltas: Optional[Dict[str, int]] = None
+    skills_updated: int = 0
+    error: Optional[str] = None
 
 
 # ============================================================================
@@ -106,17 +159,74 @@ def health():
     return {"status": "ok"}
 
 
+@app.get("/stats")
+def stats():
+    """Runtime gauges and timings for pooled resources."""
+    return {
+        "client_pool": tutor_client_pool.stats(),
+        "sessions": session_stats(),
+        "db_pool": DatabaseManager.pool_stats(),
+        "finalizer": finalizer_queue.stats(),
+        "student_context": student_context_stats(),
+        "images": image_cache_stats(),
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Per-endpoint, per-stage latency histograms in the Prometheus text format."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 # ============================================================================
 # Helper Functions
 # ============================================================================
 
-def get_student_data_from_db() -> Dict[str, Any]:
-    """Retrieve student data from database."""
-    return {
-        "student_name": get_student_name(),
-        "exam_name": get_exam_name(),
-        "memory": get_student_memory()
-    }
+async def get_student_data_from_db(student_id: Optional[int] = None) -> Dict[str, Any]:
+    """Retrieve a student's data from the cached student context.
+
+    Raises:
+        HTTPException: 404 if the student does not exist
+    """
+    try:
+        context = await load_student_context(student_id)
+    except UnknownStudent as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return context.to_student_data()
+
+
+def check_session_student(chat_session: TutorChat, student_id: Optional[int]) -> None:
+    """Reject a request that names a different student than the session's."""
+    if student_id is not None and chat_session.student_id not in (None, student_id):
+        raise HTTPException(
+            status_code=409,
+            detail=f"Chat session belongs to student {chat_session.student_id}, not {student_id}.",
+        )
+
+
+# ============================================================================
+# Student Endpoints
+# ============================================================================
+
+@app.post("/students", status_code=201)
+async def create_student_endpoint(request: StudentCreateRequest):
+    """
+    Register a student, or return the existing one with the same name and exam.
+    
+    Returns:
+        The student's id, name, exam and (windowed) memory
+    """
+    try:
+        student_id = await create_student(request.student_name, request.exam_name)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Student error: {str(e)}")
+    return await get_student_data_from_db(student_id)
+
+
+@app.get("/students/{student_id}")
+async def get_student_endpoint(student_id: int):
+    """Return a student's id, name, exam and (windowed) memory."""
+    return await get_student_data_from_db(student_id)
 
 
 # ============================================================================
@@ -136,7 +246,7 @@ async def initializer_endpoint(request: InitializerRequest):
     """
     try:
         date = request.date or datetime.now().strftime('%Y-%m-%d')
-        student_data = get_student_data_from_db()
+        student_data = await get_student_data_from_db(request.student_id)
         
         # Call initializer agent
         result = await initializer_agent(student_data, date)
@@ -146,6 +256,8 @@ async def initializer_endpoint(request: InitializerRequest):
             message=f"Session initialized for {student_data.get('student_name')}",
             calendar_entry=result
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Initializer error: {str(e)}")
 
@@ -167,21 +279,98 @@ async def questioner_endpoint(request: QuestionerRequest):
     """
     try:
         date = request.date or datetime.now().strftime('%Y-%m-%d')
+        student_data = await get_student_data_from_db(request.student_id)
         
         # Call question agent
-        result = await question_agent(date)
+        result = await question_agent(student_data["student_id"], date)
         
         return QuestionerResponse(
             questions=result
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Questioner error: {str(e)}")
 
 
+# ============================================================================
+# Image Upload Endpoints
+# ============================================================================
+
+@app.post("/images")
+async def upload_image(file: UploadFile = File(...)):
+    """
+    Store an image for use in chat messages.
+    
+    The upload is streamed to a content-addressed store, capped in size and
+    downscaled for the model. Pass the returned ``image_id`` in a ChatRequest.
+    """
+    try:
+        stored = await save_upload(file)
+    except ImageTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ImageError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        await file.close()
+    return stored.as_dict()
+
+
+@app.get("/images/{image_id}")
+async def image_metadata(image_id: str):
+    """Return the media type, size and dimensions of a stored image."""
+    try:
+        stored = await asyncio.to_thread(describe_image, image_id)
+    except ImageError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return stored.as_dict()
+
+
 # ============================================================================
 # Chatter Agent Endpoint
 # ============================================================================
 
+async def get_or_create_chat_session(request: ChatRequest) -> TutorChat:
+    """Return the session for request.session_id, creating it on the first message."""
+    if request.image_id:
+        try:
+            await asyncio.to_thread(describe_image, request.image_id)
+        except ImageError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    chat_session = await get_session(request.session_id)
+    if chat_session:
+        check_session_student(chat_session, request.student_id)
+        return chat_session
+
+    if not request.question_answer:
+        raise HTTPException(
+            status_code=400, 
+            detail="'question_answer' is required to start a new chat session."
+        )
+
+    student_data = await get_student_data_from_db(request.student_id)
+    return await create_session(
+        session_id=request.session_id,
+        student_data=student_data,
+        # for first time interaction question answer comes in format of one tutor and one student message
+        question_answer=request.question_answer
+    )
+
+
+def stream_event_payload(event: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a TutorChat.stream event into the payload sent to clients."""
+    if event["type"] == "delta":
+        return {"event": "delta", "text": event["text"]}
+    if event["type"] == "correct_status":
+        return {"event": "correct_status", "correct_status": event["value"]}
+    return {
+        "event": "done",
+        "response": event["response"],
+        "correct_status": event["correct_status"],
+    }
+
+
 @app.post("/chatter", response_model=ChatResponse)
 async def chatter_endpoint(request: ChatRequest):
     """
@@ -195,27 +384,9 @@ async def chatter_endpoint(request: ChatRequest):
         ChatResponse with tutor response.
     """
     try:
-        # 1. Get the chat session
-        chat_session = get_session(request.session_id)
-
-        # 2. If no session exists, create a new one
-        if not chat_session:
-            if not request.question_answer:
-                raise HTTPException(
-                    status_code=400, 
-                    detail="'question_answer' is required to start a new chat session."
-                )
-            
-            student_data = get_student_data_from_db()
-            chat_session = create_session(
-                session_id=request.session_id,
-                student_data=student_data,
-                # for first time interaction question answer comes in format of one tutor and one student message
-                question_answer=request.question_answer
-            )
-
-        # 3. Process the chat message
-        response = await chat_session.chat(request.user_message, contains_image=request.contains_image)
+        chat_session = await get_or_create_chat_session(request)
+        response = await chat_session.chat(request.user_message, image_id=request.image_id)
+        await save_session(request.session_id, chat_session)
         
         return ChatResponse(response=response)
     except HTTPException as http_exc:
@@ -223,40 +394,156 @@ async def chatter_endpoint(request: ChatRequest):
         raise http_exc
     except Exception as e:
         # Clean up the session on error if it exists
-        if get_session(request.session_id):
-            await end_session(request.session_id)
+        await end_session(request.session_id)
         raise HTTPException(status_code=500, detail=f"Chatter error: {str(e)}")
 
 
+@app.post("/chatter/stream")
+async def chatter_stream_endpoint(request: ChatRequest):
+    """
+    Stream the tutor's reply as Server-Sent Events.
+    
+    Emits ``delta`` events with the reply text as it is generated, a
+    ``correct_status`` event as soon as the flag is known, and a final
+    ``done`` event carrying the same response string as ``/chatter``.
+    
+    Args:
+        request: ChatRequest with session_id and user_message.
+                 question_answer is required to start a new session.
+    """
+    try:
+        chat_session = await get_or_create_chat_session(request)
+    except HTTPException as http_exc:
+        raise http_exc
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Chatter error: {str(e)}")
+
+    async def event_stream():
+        try:
+            async with aclosing(chat_session.stream(request.user_message, image_id=request.image_id)) as events:
+                async for event in events:
+                    payload = stream_event_payload(event)
+                    name = payload.pop("event")
+                    yield f"event: {name}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+            await save_session(request.session_id, chat_session)
+        except (asyncio.CancelledError, GeneratorExit):
+            # The client disconnected mid-reply: stop generating and drain it
+            await chat_session.interrupt()
+            raise
+        except Exception as e:
+            await end_session(request.session_id)
+            error = json.dumps({"detail": f"Chatter error: {str(e)}"})
+            yield f"event: error\ndata: {error}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.websocket("/chatter/ws")
+async def chatter_websocket(websocket: WebSocket):
+    """
+    Stream tutor replies over a WebSocket.
+    
+    Each incoming text frame is a ChatRequest JSON object. Replies are sent
+    as JSON frames with the same ``delta`` / ``correct_status`` / ``done``
+    events as ``/chatter/stream``, or ``error`` when a message fails.
+    """
+    await websocket.accept()
+    try:
+        while True:
+            raw_message = await websocket.receive_text()
+            chat_session = None
+            try:
+                request = ChatRequest.model_validate_json(raw_message)
+                with span("http", "WEBSOCKET"):
+                    chat_session = await get_or_create_chat_session(request)
+                    events = chat_session.stream(request.user_message, image_id=request.image_id)
+                    async with aclosing(events):
+                        async for event in events:
+                            await websocket.send_json(stream_event_payload(event))
+                    await save_session(request.session_id, chat_session)
+            except ValidationError as e:
+                await websocket.send_json({"event": "error", "detail": str(e)})
+            except HTTPException as e:
+                await websocket.send_json({"event": "error", "detail": e.detail})
+            except (WebSocketDisconnect, asyncio.CancelledError):
+                # The client disconnected mid-reply: stop generating and drain it
+                if chat_session is not None:
+                    await chat_session.interrupt()
+                raise
+            except Exception as e:
+                await end_session(request.session_id)
+                await websocket.send_json({"event": "error", "detail": f"Chatter error: {str(e)}"})
+    except WebSocketDisconnect:
+        pass
+
+
 # ============================================================================
 # Finalizer Agent Endpoint
 # ============================================================================
 
-@app.post("/finalizer", response_model=FinalizerResponse)
-async def finalizer_endpoint(request: FinalizerRequest):
+def finalizer_job_response(job: FinalizerJob) -> FinalizerResponse:
+    return FinalizerResponse(
+        job_id=job.job_id,
+        student_id=job.student_id,
+        status=job.status,
+        score_deltas=job.score_deltas,
+        skills_updated=job.skills_updated,
+        error=job.error,
+    )
+
+
+@app.post("/finalizer", response_model=FinalizerResponse, status_code=202)
+async def finalizer_endpoint(request: FinalizerRequest, response: Response, wait: float = 0):
     """
-    Evaluate student performance and generate score deltas.
+    Queue an evaluation of the student's performance.
+    
+    The evaluation runs in the background; its score deltas are written to
+    skill_levels and can be polled with ``GET /finalizer/{job_id}``.
     
     Args:
-        request: FinalizerRequest with student data and conversation history
+        request: FinalizerRequest with a session_id or a conversation history
+        wait: Seconds to wait for the job before returning (default 0)
         
     Returns:
-        FinalizerResponse with score deltas for each topic
+        FinalizerResponse with the job id and status (202), or the finished
+        job (200) if it completed within ``wait``
     """
+    student_id = request.student_id
+    conversation = request.conversation_history
+    if request.session_id is not None:
+        # Evaluate the transcript /chatter recorded instead of a re-sent history
+        chat_session = await peek_session(request.session_id)
+        if chat_session is None:
+            raise HTTPException(status_code=404, detail=f"Unknown chat session: {request.session_id}")
+        check_session_student(chat_session, student_id)
+        student_id = chat_session.student_id if student_id is None else student_id
+        conversation = chat_session.transcript_messages()
+
+    student_data = await get_student_data_from_db(student_id)
     try:
-        student_data = get_student_data_from_db()
-        
-        # Call finalizer agent
-        result = await finalizer_agent(student_data, request.conversation_history)
-        
-        # Handle None results
-        if result is None:
-            result = {}
-        
-        # Parse result if it's JSON string
-        if isinstance(result, str):
-            result = json.loads(result)
-        
-        return FinalizerResponse(score_deltas=result)
+        job = await finalizer_queue.submit(student_data["student_id"], student_data, conversation)
+    except FinalizerQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Finalizer error: {str(e)}")
+
+    if wait > 0:
+        await job.wait(wait)
+    if job.finished:
+        response.status_code = 200
+    return finalizer_job_response(job)
+
+
+@app.get("/finalizer/{job_id}", response_model=FinalizerResponse)
+async def finalizer_job_endpoint(job_id: str):
+    """
+    Return the status of a finalization job, with its score deltas once done.
+    """
+    job = finalizer_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired finalizer job: {job_id}")
+    return finalizer_job_response(job)
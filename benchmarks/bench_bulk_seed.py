@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark seeding throughput: one INSERT per row (the old seeders) versus
+database.bulk.bulk_insert at several chunk sizes.
+
+Each strategy loads the same synthetic questions into a fresh scratch copy of
+the questions table (bench_seed_questions) and reports rows/sec. The scratch
+table is dropped afterwards; the real tables are never touched.
+
+Usage:
+    python benchmarks/bench_bulk_seed.py --rows 50000 --chunk-sizes 100,500,1000,5000
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import mysql.connector
+
+from database.bulk import bulk_insert
+from database.db import DB_CONFIG
+from database.seed_data import QUESTION_COLUMNS, QUESTION_UPDATE_COLUMNS
+
+
+TABLE = "bench_seed_questions"
+DIFFICULTIES = ["easy", "medium", "hard"]
+
+
+def make_rows(count, seed):
+    rng = random.Random(seed)
+    topics = [f"topic_{i:03d}" for i in range(200)]
+    rows = []
+    for i in range(count):
+        tags = rng.sample(topics, 3)
+        rows.append((
+            f"Benchmark question {i}: explain {tags[0]} in terms of {tags[1]}.",
+            f"Answer {i}",
+            f"Explanation for question {i}, covering {tags[0]} and {tags[1]}.",
+            rng.choice(DIFFICULTIES),
+            tags[0],
+            tags[1],
+            tags[2] if rng.random() < 0.5 else None,
+            0,
+        ))
+    return rows
+
+
+def reset_table(conn):
+    cursor = conn.cursor()
+    cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    cursor.execute(f"CREATE TABLE {TABLE} LIKE questions")
+    cursor.close()
+
+
+def seed_row_by_row(conn, rows):
+    """The previous seeder: execute per row, one commit at the end."""
+    cursor = conn.cursor()
+    sql = (
+        f"INSERT INTO {TABLE} ({', '.join(QUESTION_COLUMNS)}) "
+        f"VALUES ({', '.join(['%s'] * len(QUESTION_COLUMNS))})"
+    )
+    conn.start_transaction()
+    for row in rows:
+        cursor.execute(sql, row)
+    conn.commit()
+    cursor.close()
+
+
+def seed_bulk(conn, rows, chunk_size):
+    bulk_insert(conn, TABLE, QUESTION_COLUMNS, rows, update_columns=QUESTION_UPDATE_COLUMNS, chunk_size=chunk_size)
+
+
+def run(label, conn, fn, rows):
+    reset_table(conn)
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<24} {elapsed:8.2f} s   {len(rows) / elapsed:10.0f} rows/sec")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50_000, help="synthetic questions to seed")
+    parser.add_argument("--chunk-sizes", default="100,500,1000,5000", help="comma-separated bulk chunk sizes")
+    parser.add_argument("--skip-row-by-row", action="store_true", help="only time the bulk path")
+    parser.add_argument("--seed", type=int, default=7, help="random seed")
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows, args.seed)
+    chunk_sizes = [int(size) for size in args.chunk_sizes.split(",") if size]
+
+    conn = mysql.connector.connect(autocommit=True, **DB_CONFIG)
+    try:
+        print(f"Seeding {args.rows} questions into {TABLE}:")
+        baseline = None
+        if not args.skip_row_by_row:
+            baseline = run("row by row", conn, lambda: seed_row_by_row(conn, rows), rows)
+        for chunk_size in chunk_sizes:
+            elapsed = run(
+                f"bulk_insert chunk={chunk_size}",
+                conn,
+                lambda: seed_bulk(conn, rows, chunk_size),
+                rows,
+            )
+            if baseline:
+                print(f"  {'':<24} {baseline / elapsed:8.1f}x faster than row by row")
+
+        # Re-seeding the same file exercises the upsert path
+        started = time.perf_counter()
+        seed_bulk(conn, rows, chunk_sizes[-1] if chunk_sizes else 1000)
+        elapsed = time.perf_counter() - started
+        print(f"  {'re-seed (all upserts)':<24} {elapsed:8.2f} s   {len(rows) / elapsed:10.0f} rows/sec")
+    finally:
+        cursor = conn.cursor()
+        cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        cursor.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
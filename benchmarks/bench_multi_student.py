@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Load benchmark for the per-student data model at 10k students.
+
+Seeds synthetic students (named bench-student-NNNNN, exam bench-exam) with
+memory notes, skill levels and calendar entries into the real tables, then:
+
+  1. prints the query plan of each per-student lookup, to confirm it reads
+     one student's slice of a student_id-leading index;
+  2. times the database helpers against random students;
+  3. replays the questioner/session-start read path from many concurrent
+     coroutines through database.db_async and reports requests/sec.
+
+The benchmark students (and, by cascade, their rows) are deleted afterwards
+unless --keep is passed; other students are never touched.
+
+Usage:
+    python benchmarks/bench_multi_student.py --students 10000 --concurrency 32
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database import db_async, db_helpers, student_context
+from database.bulk import bulk_insert
+from database.db import DatabaseManager
+from memory.similarity import content_hash
+
+
+BENCH_EXAM = "bench-exam"
+START_DATE = date(2025, 1, 1)
+NOTE_TEMPLATES = [
+    "Prefers {a} examples before {b} proofs",
+    "Confuses {a} with {b} under time pressure",
+    "Strong at {a}, needs review of {b}",
+    "Asked for a recap of {a} after finishing {b}",
+    "Learns {a} faster with diagrams than with {b} tables",
+]
+
+# Per-student lookups as the helpers issue them, for EXPLAIN
+PLANS = (
+    ("calendar point lookup",
+     "SELECT date, topics, n_questions FROM calendar_entries WHERE student_id = %s AND date = %s",
+     lambda sid: (sid, START_DATE.isoformat())),
+    ("skill levels",
+     "SELECT topic, skill_level FROM skill_levels WHERE student_id = %s ORDER BY topic",
+     lambda sid: (sid,)),
+    ("memory dedupe window",
+     "SELECT id, memory_entry, hits FROM student_memory WHERE student_id = %s AND kind = 'note' "
+     "ORDER BY last_seen_at DESC, id DESC LIMIT 50",
+     lambda sid: (sid,)),
+    ("student context",
+     "SELECT s.id, s.student_name, s.exam_name, m.id, m.memory_entry FROM students s "
+     "LEFT JOIN student_memory m ON m.student_id = s.id WHERE s.id = %s ORDER BY m.created_at, m.id",
+     lambda sid: (sid,)),
+)
+
+
+def populate(conn, students, notes, topics, days, rng):
+    started = time.perf_counter()
+    bulk_insert(
+        conn,
+        "students",
+        ("student_name", "exam_name"),
+        ((f"bench-student-{i:05d}", BENCH_EXAM) for i in range(students)),
+        ignore=True,
+    )
+    cursor = conn.cursor()
+    cursor.execute("SELECT id FROM students WHERE exam_name = %s ORDER BY id", (BENCH_EXAM,))
+    student_ids = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+    print(f"  {len(student_ids)} students in {time.perf_counter() - started:.1f}s")
+
+    topic_names = [f"bench_topic_{i:03d}" for i in range(topics)]
+
+    def memory_rows():
+        for sid in student_ids:
+            for n in range(notes):
+                a, b = rng.sample(topic_names, 2)
+                text = f"{rng.choice(NOTE_TEMPLATES).format(a=a, b=b)} (note {n})"
+                yield sid, text, content_hash(text)
+
+    def skill_rows():
+        for sid in student_ids:
+            for topic in rng.sample(topic_names, min(topics, 12)):
+                yield sid, topic, rng.randint(0, 100)
+
+    def calendar_rows():
+        for sid in student_ids:
+            for day in range(days):
+                yield sid, START_DATE + timedelta(days=day), json.dumps(rng.sample(topic_names, 2)), 2
+
+    for table, columns, rows in (
+        ("student_memory", ("student_id", "memory_entry", "content_hash"), memory_rows()),
+        ("skill_levels", ("student_id", "topic", "skill_level"), skill_rows()),
+        ("calendar_entries", ("student_id", "date", "topics", "n_questions"), calendar_rows()),
+    ):
+        started = time.perf_counter()
+        result = bulk_insert(conn, table, columns, rows, ignore=True)
+        print(f"  {result.rows:>8} {table} rows in {time.perf_counter() - started:.1f}s")
+
+    cursor = conn.cursor()
+    cursor.execute("ANALYZE TABLE students, student_memory, skill_levels, calendar_entries")
+    cursor.fetchall()
+    cursor.close()
+    return student_ids
+
+
+def delete_students(conn):
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM students WHERE exam_name = %s", (BENCH_EXAM,))
+    deleted = cursor.rowcount
+    conn.commit()
+    cursor.close()
+    return deleted
+
+
+def explain(cursor, sql, params):
+    cursor.execute("EXPLAIN " + sql, params)
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def report(label, timings):
+    ordered = sorted(timings)
+    p95 = ordered[max(0, int(len(ordered) * 0.95) - 1)]
+    print(
+        f"  {label:<28} p50 {statistics.median(ordered):8.2f} ms   "
+        f"p95 {p95:8.2f} ms   mean {statistics.mean(ordered):8.2f} ms"
+    )
+
+
+def time_calls(fn, args_list):
+    timings = []
+    for args in args_list:
+        started = time.perf_counter()
+        fn(*args)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+async def read_path(student_id, day):
+    """Session start plus the questioner's lookups for one student."""
+    await db_async.load_student_context(student_id)
+    async with db_async.session() as session:
+        await db_async.get_calendar_entry(student_id, day, session=session)
+        await db_async.get_skill_levels(student_id, session=session)
+
+
+async def run_concurrent(student_ids, requests, concurrency, days, rng):
+    work = [
+        (rng.choice(student_ids), (START_DATE + timedelta(days=rng.randrange(days))).isoformat())
+        for _ in range(requests)
+    ]
+    queue = asyncio.Queue()
+    for item in work:
+        queue.put_nowait(item)
+    timings = []
+
+    async def worker():
+        while not queue.empty():
+            student_id, day = queue.get_nowait()
+            started = time.perf_counter()
+            await read_path(student_id, day)
+            timings.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    db_async.shutdown_executor()
+    return timings, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=10_000, help="synthetic students to seed")
+    parser.add_argument("--notes", type=int, default=20, help="memory notes per student")
+    parser.add_argument("--topics", type=int, default=60, help="size of the topic vocabulary")
+    parser.add_argument("--days", type=int, default=14, help="calendar entries per student")
+    parser.add_argument("--queries", type=int, default=500, help="helper calls to time per helper")
+    parser.add_argument("--requests", type=int, default=5_000, help="read-path requests in the concurrent run")
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent coroutines")
+    parser.add_argument("--seed", type=int, default=7, help="random seed")
+    parser.add_argument("--keep", action="store_true", help="keep the benchmark students afterwards")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    DatabaseManager.initialize(seed_mode="off")
+    conn = DatabaseManager.get_connection()
+    try:
+        print(f"Seeding {args.students} students ({args.notes} notes, {args.days} calendar days each)...")
+        student_ids = populate(conn, args.students, args.notes, args.topics, args.days, rng)
+
+        print("\nQuery plans:")
+        cursor = conn.cursor()
+        sample = rng.choice(student_ids)
+        for label, sql, params in PLANS:
+            plan = ", ".join(
+                f"{row['table']}:{row['type']}/{row['key']} rows={row['rows']}"
+                for row in explain(cursor, sql, params(sample))
+            )
+            print(f"  {label:<28} {plan}")
+        cursor.close()
+
+        sampled = [rng.choice(student_ids) for _ in range(args.queries)]
+        days = [(START_DATE + timedelta(days=rng.randrange(args.days))).isoformat() for _ in sampled]
+
+        print(f"\nHelpers ({args.queries} calls each, random students):")
+        report("get_calendar_entry", time_calls(db_helpers.get_calendar_entry, list(zip(sampled, days))))
+        report("get_skill_levels", time_calls(db_helpers.get_skill_levels, [(sid,) for sid in sampled]))
+        report("get_student_memory", time_calls(db_helpers.get_student_memory, [(sid,) for sid in sampled]))
+        report(
+            "load_student_context (cold)",
+            time_calls(student_context.load_student_context, [(sid, True) for sid in sampled]),
+        )
+        report(
+            "load_student_context (warm)",
+            time_calls(student_context.load_student_context, [(sid,) for sid in sampled]),
+        )
+        report(
+            "add_student_memory",
+            time_calls(
+                db_helpers.add_student_memory,
+                [(sid, f"Benchmark observation {i} about bench_topic_{i % args.topics:03d}") for i, sid in enumerate(sampled)],
+            ),
+        )
+        report(
+            "set_skill_levels (3 topics)",
+            time_calls(
+                db_helpers.set_skill_levels,
+                [(sid, {f"bench_topic_{(i + k) % args.topics:03d}": rng.randint(0, 100) for k in range(3)})
+                 for i, sid in enumerate(sampled)],
+            ),
+        )
+
+        student_context.invalidate_student_context()
+        print(f"\nConcurrent read path ({args.requests} requests, concurrency {args.concurrency}):")
+        timings, elapsed = asyncio.run(
+            run_concurrent(student_ids, args.requests, args.concurrency, args.days, rng)
+        )
+        report("context + calendar + skills", timings)
+        print(f"  {'throughput':<28} {args.requests / elapsed:8.0f} requests/sec")
+        print(f"  {'student context cache':<28} {student_context.student_context_stats()}")
+    finally:
+        if not args.keep:
+            print(f"\nDeleted {delete_students(conn)} benchmark students")
+        conn.close()
+        DatabaseManager.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Benchmark topic lookups on the question bank: OR across the three tag
+columns versus the question_topics junction table.
+
+Builds scratch copies of the tables (bench_questions, bench_question_topics)
+in the configured database, fills them with synthetic questions and times
+both query shapes. The scratch tables are dropped afterwards unless --keep
+is passed; the real tables are never touched.
+
+Usage:
+    python benchmarks/bench_question_topics.py --rows 100000 --topics 300
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import mysql.connector
+
+from database.db import DB_CONFIG
+
+
+INSERT_BATCH = 2000
+DIFFICULTIES = ["easy", "medium", "hard"]
+
+
+def create_tables(cursor):
+    cursor.execute("DROP TABLE IF EXISTS bench_question_topics")
+    cursor.execute("DROP TABLE IF EXISTS bench_questions")
+    cursor.execute("CREATE TABLE bench_questions LIKE questions")
+    cursor.execute("CREATE TABLE bench_question_topics LIKE question_topics")
+
+
+def drop_tables(cursor):
+    cursor.execute("DROP TABLE IF EXISTS bench_question_topics")
+    cursor.execute("DROP TABLE IF EXISTS bench_questions")
+
+
+def populate(conn, rows, topics, rng):
+    cursor = conn.cursor()
+    insert_sql = (
+        "INSERT INTO bench_questions (question_prompt, answer, explanation, difficulty, "
+        "topic_tag1, topic_tag2, topic_tag3, has_been_asked) "
+        "VALUES (%s, %s, %s, %s, %s, %s, %s, %s)"
+    )
+    started = time.perf_counter()
+    batch = []
+    for i in range(rows):
+        tags = rng.sample(topics, 3)
+        batch.append((
+            f"Benchmark question {i}: {' '.join(tags)}",
+            f"Answer {i}",
+            f"Explanation {i}",
+            rng.choice(DIFFICULTIES),
+            tags[0],
+            tags[1] if rng.random() < 0.8 else None,
+            tags[2] if rng.random() < 0.5 else None,
+            1 if rng.random() < 0.3 else 0,
+        ))
+        if len(batch) == INSERT_BATCH:
+            cursor.executemany(insert_sql, batch)
+            conn.commit()
+            batch = []
+    if batch:
+        cursor.executemany(insert_sql, batch)
+        conn.commit()
+    print(f"  Inserted {rows} questions in {time.perf_counter() - started:.1f}s")
+
+    started = time.perf_counter()
+    cursor.execute("""
+        INSERT IGNORE INTO bench_question_topics (question_id, topic)
+        SELECT id, topic_tag1 FROM bench_questions WHERE topic_tag1 IS NOT NULL
+        UNION ALL
+        SELECT id, topic_tag2 FROM bench_questions WHERE topic_tag2 IS NOT NULL
+        UNION ALL
+        SELECT id, topic_tag3 FROM bench_questions WHERE topic_tag3 IS NOT NULL
+    """)
+    conn.commit()
+    print(f"  Backfilled {cursor.rowcount} junction rows in {time.perf_counter() - started:.1f}s")
+    cursor.execute("ANALYZE TABLE bench_questions, bench_question_topics")
+    cursor.fetchall()
+    cursor.close()
+
+
+def time_query(cursor, sql, params_list):
+    timings = []
+    for params in params_list:
+        started = time.perf_counter()
+        cursor.execute(sql, params)
+        cursor.fetchall()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def explain(cursor, sql, params):
+    cursor.execute("EXPLAIN " + sql, params)
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def report(label, timings):
+    ordered = sorted(timings)
+    p95 = ordered[max(0, int(len(ordered) * 0.95) - 1)]
+    print(
+        f"  {label:<28} p50 {statistics.median(ordered):8.2f} ms   "
+        f"p95 {p95:8.2f} ms   mean {statistics.mean(ordered):8.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000, help="synthetic questions to generate")
+    parser.add_argument("--topics", type=int, default=300, help="size of the topic vocabulary")
+    parser.add_argument("--queries", type=int, default=200, help="topic lookups to time per query shape")
+    parser.add_argument("--seed", type=int, default=7, help="random seed")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch tables afterwards")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    topics = [f"topic_{i:04d}" for i in range(args.topics)]
+
+    conn = mysql.connector.connect(autocommit=False, **DB_CONFIG)
+    cursor = conn.cursor()
+    try:
+        print(f"Building scratch tables with {args.rows} questions / {args.topics} topics...")
+        create_tables(cursor)
+        populate(conn, args.rows, topics, rng)
+
+        lookups = [(rng.choice(topics),) for _ in range(args.queries)]
+        or_sql = (
+            "SELECT * FROM bench_questions "
+            "WHERE topic_tag1 = %s OR topic_tag2 = %s OR topic_tag3 = %s"
+        )
+        junction_sql = (
+            "SELECT q.* FROM bench_question_topics qt "
+            "JOIN bench_questions q ON q.id = qt.question_id WHERE qt.topic = %s"
+        )
+        union_sql = """
+            SELECT DISTINCT topic_tag1 FROM bench_questions
+            UNION SELECT DISTINCT topic_tag2 FROM bench_questions
+            UNION SELECT DISTINCT topic_tag3 FROM bench_questions
+        """
+        distinct_sql = "SELECT DISTINCT topic FROM bench_question_topics"
+
+        print("\nQuery plans:")
+        for label, sql, params in (
+            ("OR across tag columns", or_sql, lookups[0] * 3),
+            ("question_topics join", junction_sql, lookups[0]),
+        ):
+            plan = ", ".join(f"{row['table']}:{row['type']}/{row['key']}" for row in explain(cursor, sql, params))
+            print(f"  {label:<28} {plan}")
+
+        print(f"\nTopic lookups ({args.queries} queries):")
+        report("OR across tag columns", time_query(cursor, or_sql, [params * 3 for params in lookups]))
+        report("question_topics join", time_query(cursor, junction_sql, lookups))
+
+        print("\nUnique topic listing (20 queries):")
+        report("three-way UNION", time_query(cursor, union_sql, [()] * 20))
+        report("DISTINCT on junction", time_query(cursor, distinct_sql, [()] * 20))
+    finally:
+        if not args.keep:
+            drop_tables(cursor)
+            conn.commit()
+        cursor.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,10 +4,12 @@
 
 import asyncio
 from datetime import datetime
+from pathlib import Path
 import httpx
 
 PAYLOAD = {
     "session_id": "demo-session",
+    "student_id": 1,
     "user_message": "[tutor]: 'what is the sum of the angles in a triangle?' [student]: wait I cant understand English. I can only speak portuguese. You should remember this about me'",
     "question_answer": "180 degrees",
 }
@@ -15,9 +17,10 @@ PAYLOAD = {
 PAYLOAD_2 = {
    "session_id": "demo-session",
    "user_message": "[student]: 'Okay, before that, can you tell me what is the formula in the image?'",
-   "contains_image": "true"
 }
 
+IMAGE_PATH = Path(__file__).parent / "tmp" / "image.jpeg"
+
 
 async def main() -> None:
     async with httpx.AsyncClient(timeout=None) as client:
@@ -29,6 +32,14 @@ async def main() -> None:
         timestamp = datetime.now().strftime("%H:%M:%S")
         print(f"[{timestamp}] response -> {response.json()}", flush=True)
         
+        with open(IMAGE_PATH, "rb") as image_file:
+            upload = await client.post(
+                "http://localhost:8000/images",
+                files={"file": (IMAGE_PATH.name, image_file, "image/jpeg")},
+            )
+        upload.raise_for_status()
+        PAYLOAD_2["image_id"] = upload.json()["image_id"]
+
         response2 = await client.post(
           "http://localhost:8000/chatter",
            json=PAYLOAD_2,
@@ -28,9 +28,9 @@ def get_memory_entries():
         cursor = conn.cursor(dictionary=True)
         
         cursor.execute("""
-            SELECT id, memory_entry, created_at 
+            SELECT id, student_id, memory_entry, created_at 
             FROM student_memory 
-            ORDER BY created_at DESC
+            ORDER BY student_id, created_at DESC
         """)
         
         entries = cursor.fetchall()
@@ -84,6 +84,7 @@ def display_memory_entries(entries):
         
         # Print entry with nice formatting
         print(f"┌─ Entry #{idx} (ID: {entry_id}) ─────────────────────────────────────")
+        print(f"│ Student: {entry.get('student_id', 'N/A')}")
         print(f"│ Created: {timestamp}")
         print(f"│")
         
@@ -4,6 +4,9 @@ Eigen Coach unified database package.
 
 from database.db import DatabaseManager
 from database.db_helpers import (
+    MemoryWrite,
+    create_student,
+    get_student,
     get_student_memory,
     add_student_memory,
     get_calendar_entry,
@@ -11,13 +14,26 @@ from database.db_helpers import (
     get_skill_levels,
     set_skill_level
 )
+from database.student_context import (
+    StudentContext,
+    UnknownStudent,
+    load_student_context,
+    invalidate_student_context
+)
 
 __all__ = [
     'DatabaseManager',
+    'MemoryWrite',
+    'create_student',
+    'get_student',
     'get_student_memory',
     'add_student_memory',
     'get_calendar_entry',
     'set_calendar_entry',
     'get_skill_levels',
-    'set_skill_level'
+    'set_skill_level',
+    'StudentContext',
+    'UnknownStudent',
+    'load_student_context',
+    'invalidate_student_context'
 ]
@@ -0,0 +1,120 @@
+"""Batched multi-row writes for seeders and imports.
+
+One ``INSERT ... VALUES (...), (...), ...`` per chunk replaces a round trip
+per row, and committing per chunk keeps transactions (and undo logs) small
+on large loads.
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+
+BULK_CHUNK_SIZE = int(os.getenv("EIGEN_BULK_CHUNK_SIZE", "1000"))
+
+
+@dataclass
+class BulkResult:
+    """Totals for one bulk write."""
+
+    rows: int = 0
+    affected: int = 0
+    chunks: int = 0
+
+
+def chunked(rows: Iterable[Sequence[Any]], chunk_size: int) -> Iterator[List[Sequence[Any]]]:
+    """Yield lists of at most ``chunk_size`` rows without materializing the input."""
+    chunk: List[Sequence[Any]] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def build_insert_sql(
+    table: str,
+    columns: Sequence[str],
+    row_count: int,
+    update_columns: Optional[Sequence[str]] = None,
+    ignore: bool = False,
+) -> str:
+    """Build a multi-row INSERT for ``row_count`` rows.
+
+    With ``update_columns`` the statement becomes an upsert that overwrites
+    those columns from the incoming row on a duplicate key.
+    """
+    placeholders = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    sql = (
+        f"INSERT {'IGNORE ' if ignore else ''}INTO {table} ({', '.join(columns)}) VALUES "
+        + ", ".join([placeholders] * row_count)
+    )
+    if update_columns:
+        sql += " ON DUPLICATE KEY UPDATE " + ", ".join(
+            f"{column} = VALUES({column})" for column in update_columns
+        )
+    return sql
+
+
+def bulk_insert(
+    conn,
+    table: str,
+    columns: Sequence[str],
+    rows: Iterable[Sequence[Any]],
+    update_columns: Optional[Sequence[str]] = None,
+    ignore: bool = False,
+    chunk_size: int = BULK_CHUNK_SIZE,
+    on_chunk: Optional[Callable[[Any, List[Sequence[Any]]], None]] = None,
+) -> BulkResult:
+    """Write ``rows`` with one multi-row INSERT and one commit per chunk.
+
+    Args:
+        conn: Database connection
+        table: Target table
+        columns: Column names, in the order of each row's values
+        rows: Row tuples; may be a generator
+        update_columns: Columns to overwrite on duplicate keys (upsert)
+        ignore: Use INSERT IGNORE to skip rows that hit a unique key
+        chunk_size: Rows per statement and per transaction (EIGEN_BULK_CHUNK_SIZE)
+        on_chunk: Called with (conn, chunk) after each insert and before its
+            commit, for follow-up writes that must land atomically with it
+
+    Returns:
+        Row, affected-row and chunk counts. MySQL counts an upsert that
+        updates an existing row as 2 affected rows.
+    """
+    if update_columns and ignore:
+        raise ValueError("update_columns and ignore are mutually exclusive")
+
+    result = BulkResult()
+    cursor = conn.cursor()
+    sql_cache: Dict[int, str] = {}
+
+    try:
+        for chunk in chunked(rows, max(1, chunk_size)):
+            sql = sql_cache.get(len(chunk))
+            if sql is None:
+                sql = build_insert_sql(table, columns, len(chunk), update_columns, ignore)
+                sql_cache[len(chunk)] = sql
+
+            if not conn.in_transaction:
+                conn.start_transaction()
+            try:
+                cursor.execute(sql, [value for row in chunk for value in row])
+                result.affected += max(cursor.rowcount, 0)
+                if on_chunk is not None:
+                    on_chunk(conn, chunk)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+            result.rows += len(chunk)
+            result.chunks += 1
+        return result
+    finally:
+        cursor.close()
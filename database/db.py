@@ -1,104 +1,233 @@
 """Database manager for the Eigen Coach system."""
 
-from pathlib import Path
-from typing import Optional
+import os
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
 
-from mysql.connector import Error, pooling
+from mysql.connector import Error
+
+from database.migrations import MigrationError, run_migrations
+from database.pool import ConnectionPool, create_pool
+
+
+# Connection settings shared by the pool and standalone scripts (benchmarks)
+DB_CONFIG = {
+    "host": os.getenv("EIGEN_DB_HOST", 'localhost'),
+    "port": int(os.getenv("EIGEN_DB_PORT", "8003")),
+    "user": os.getenv("EIGEN_DB_USER", 'root'),
+    "password": os.getenv("EIGEN_DB_PASSWORD", 'joe_is_very_cool'),
+    "database": os.getenv("EIGEN_DB_NAME", 'calhacks'),
+}
+
+# Startup seeding: "off" (default, boots do no seeding work), "changed" (apply
+# seed files whose content changed) or "force" (re-apply every seed file)
+SEED_MODE = os.getenv("EIGEN_SEED", "off")
+
+
+class DatabaseSession:
+    """Unit of work: one pooled connection shared by several helper calls.
+
+    Helpers that receive a session run on its connection and reuse its
+    buffered cursors instead of checking out a connection per call. Writes
+    autocommit unless ``begin()`` opens a transaction, which is committed
+    when the session closes cleanly and rolled back otherwise.
+    """
+
+    def __init__(self, conn) -> None:
+        self.conn = conn
+        self._cursors: Dict[bool, Any] = {}
+        self._after_commit: List[Callable[[], None]] = []
+
+    def cursor(self, dictionary: bool = False):
+        """Return the session's shared cursor of the requested kind."""
+        cursor = self._cursors.get(dictionary)
+        if cursor is None:
+            # Buffered so a cursor can be reused even if a caller skips fetching
+            cursor = self.conn.cursor(buffered=True, dictionary=dictionary)
+            self._cursors[dictionary] = cursor
+        return cursor
+
+    def begin(self) -> None:
+        """Start a transaction spanning the following helper calls."""
+        if not self.conn.in_transaction:
+            self.conn.start_transaction()
+
+    def after_commit(self, callback: Callable[[], None]) -> None:
+        """Run ``callback`` once the current writes are committed.
+
+        Outside a transaction the writes already autocommitted, so it runs
+        now; inside one it waits for ``commit()`` and is dropped on rollback.
+        """
+        if self.conn.in_transaction:
+            self._after_commit.append(callback)
+        else:
+            callback()
+
+    def commit(self) -> None:
+        if self.conn.in_transaction:
+            self.conn.commit()
+        callbacks, self._after_commit = self._after_commit, []
+        for callback in callbacks:
+            callback()
+
+    def rollback(self) -> None:
+        self._after_commit = []
+        if self.conn.in_transaction:
+            self.conn.rollback()
+
+    def close(self, commit: bool = True) -> None:
+        """Finish any open transaction and return the connection to the pool."""
+        try:
+            for cursor in self._cursors.values():
+                cursor.close()
+            self._cursors.clear()
+            if commit:
+                self.commit()
+            else:
+                self.rollback()
+        finally:
+            self.conn.close()
 
 
 class DatabaseManager:
     """Manages MySQL connection pool."""
     
-    _pool: Optional[pooling.MySQLConnectionPool] = None
+    _pool: Optional[ConnectionPool] = None
     
     @staticmethod
-    def initialize():
-        """Initialize MySQL connection pool."""
+    def initialize(seed_mode: Optional[str] = None):
+        """Initialize MySQL connection pool, run migrations and optionally seed.
+
+        Args:
+            seed_mode: "off", "changed", "force" or "reset"; defaults to EIGEN_SEED
+        """
         try:
-            DatabaseManager._pool = pooling.MySQLConnectionPool(
-                pool_name="calhacks_pool",
-                pool_size=5,
-                host='localhost',
-                port=8003,
-                user='root',
-                password='joe_is_very_cool',
-                database='calhacks',
-                autocommit=True
+            DatabaseManager._pool = create_pool(DB_CONFIG)
+            pool = DatabaseManager._pool
+            print(
+                f"[DatabaseManager] MySQL connection pool initialized "
+                f"(size={pool.size}, overflow={pool.overflow}, timeout={pool.timeout}s)"
             )
-            print("[DatabaseManager] MySQL connection pool initialized")
             
             # Run migrations to create tables
             DatabaseManager._run_migrations()
-            DatabaseManager._run_seeders()
+
+            seed_mode = seed_mode or SEED_MODE
+            if seed_mode != "off":
+                DatabaseManager._run_seeders(seed_mode)
             
-        except Error as e:
-            print(f"[DatabaseManager] Error initializing pool: {e}")
+        except (Error, MigrationError) as e:
+            print(f"[DatabaseManager] Error initializing database: {e}")
             raise
     
     @staticmethod
     def _run_migrations():
-        """Run SQL migrations found in the migrations directory."""
-        migrations_dir = Path(__file__).resolve().parent.parent / "migrations"
-
-        if not migrations_dir.exists():
-            print(f"[DatabaseManager] Migrations directory not found: {migrations_dir}")
-            return
-
-        sql_files = sorted(migrations_dir.glob("*.sql"))
-        if not sql_files:
-            print("[DatabaseManager] No migration files detected")
-            return
-
+        """Apply migrations not yet recorded in schema_migrations."""
+        conn = DatabaseManager.get_connection()
         try:
-            conn = DatabaseManager.get_connection()
-            cursor = conn.cursor()
-
-            for file_path in sql_files:
-                with open(file_path, "r", encoding="utf-8") as handle:
-                    sql_script = handle.read()
-
-                for statement in sql_script.split(';'):
-                    statement = statement.strip()
-                    if statement:
-                        cursor.execute(statement)
-
-            cursor.close()
+            applied = run_migrations(conn)
+            if applied:
+                print(f"[DatabaseManager] Applied {len(applied)} migration(s)")
+            else:
+                print("[DatabaseManager] Schema up to date")
+        finally:
             conn.close()
-            print("[DatabaseManager] Migrations completed successfully")
-
-        except Error as e:
-            print(f"[DatabaseManager] Migration error: {e}")
 
     @staticmethod
-    def _run_seeders():
+    def _run_seeders(seed_mode: str = "changed"):
         """Run default data seeders after migrations."""
         try:
-            from database.seed_data import run_seeders
+            from database.seed_data import reset_database, run_seeders
         except ImportError as exc:
             print(f"[DatabaseManager] Unable to import seeders: {exc}")
             return
 
         conn = None
+        applied = []
         try:
             conn = DatabaseManager.get_connection()
-            run_seeders(conn)
+            if seed_mode == "reset":
+                applied = reset_database(conn)
+            else:
+                applied = run_seeders(conn, force=seed_mode == "force")
         except Error as e:
             print(f"[DatabaseManager] Seeder error: {e}")
         finally:
             if conn is not None:
                 conn.close()
+
+        if applied:
+            # Seeding may rewrite the student row, memory, questions and skills,
+            # so drop any cached copies
+            from database.student_context import invalidate_student_context
+            from database.topic_cache import invalidate_topic_vocabulary
+            invalidate_student_context()
+            invalidate_topic_vocabulary()
     
     @staticmethod
     def get_connection():
-        """Get a connection from the pool."""
+        """Get a connection from the pool, waiting for one if all are in use.
+
+        Raises:
+            PoolTimeoutError: if none is returned within EIGEN_DB_POOL_TIMEOUT
+        """
         if DatabaseManager._pool is None:
             DatabaseManager.initialize()
         return DatabaseManager._pool.get_connection()
+
+    @staticmethod
+    @contextmanager
+    def session() -> Iterator[DatabaseSession]:
+        """Check out one connection for a unit of work.
+
+        Usage:
+            with DatabaseManager.session() as session:
+                entry = get_calendar_entry(student_id, date, session=session)
+                skills = get_skill_levels(student_id, session=session)
+        """
+        session = DatabaseSession(DatabaseManager.get_connection())
+        try:
+            yield session
+        except BaseException:
+            session.close(commit=False)
+            raise
+        session.close()
+
+    @staticmethod
+    @contextmanager
+    def cursor(session: Optional[DatabaseSession] = None, dictionary: bool = False) -> Iterator[Any]:
+        """Yield a cursor from ``session``, or from a connection checked out just for this call."""
+        if session is not None:
+            yield session.cursor(dictionary)
+            return
+
+        conn = DatabaseManager.get_connection()
+        cursor = conn.cursor(dictionary=dictionary)
+        try:
+            yield cursor
+        finally:
+            cursor.close()
+            conn.close()
+
+    @staticmethod
+    def after_commit(session: Optional[DatabaseSession], callback: Callable[[], None]) -> None:
+        """Run ``callback`` once writes made through ``session`` (or an autocommit cursor) are committed."""
+        if session is not None:
+            session.after_commit(callback)
+        else:
+            callback()
+
+    @staticmethod
+    def pool_stats() -> Dict[str, Any]:
+        """Return connection pool gauges and checkout timings."""
+        if DatabaseManager._pool is None:
+            return {"initialized": False}
+        return {"initialized": True, **DatabaseManager._pool.stats()}
     
     @staticmethod
     def close_all():
         """Close all connections in the pool."""
         if DatabaseManager._pool:
             print("[DatabaseManager] Closing connection pool")
-            # Connection pool doesn't need explicit closing
+            DatabaseManager._pool.close()
             DatabaseManager._pool = None
@@ -0,0 +1,138 @@
+"""Awaitable wrappers around the synchronous Eigen Coach database helpers.
+
+``mysql.connector`` is a blocking driver, so calling the helpers in
+``database.db_helpers`` straight from an ``async def`` endpoint stalls the
+event loop for the whole round trip. Every helper here runs its synchronous
+counterpart on a bounded thread pool instead, so slow queries only occupy a
+worker thread while other requests keep streaming.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional, TypeVar
+
+from database import db_helpers, student_context, topic_cache
+from database.db import DatabaseManager, DatabaseSession
+from database.pool import POOL_OVERFLOW, POOL_SIZE
+from tracing import span
+
+
+T = TypeVar("T")
+
+# Match the most connections the MySQL pool will open: extra threads would
+# only queue on connection checkout.
+DB_EXECUTOR_THREADS = int(os.getenv("EIGEN_DB_EXECUTOR_THREADS", str(POOL_SIZE + POOL_OVERFLOW)))
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=DB_EXECUTOR_THREADS,
+            thread_name_prefix="eigen-db",
+        )
+    return _executor
+
+
+async def run_sync(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking database callable on the database thread pool."""
+    loop = asyncio.get_running_loop()
+    # Carry context variables (e.g. the current trace span) into the worker
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        _get_executor(), functools.partial(context.run, func, *args, **kwargs)
+    )
+
+
+def _offload(func: Callable[..., T]) -> Callable[..., Awaitable[T]]:
+    """Build an awaitable version of a synchronous helper, timed as a ``db`` span."""
+
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> T:
+        with span("db", func.__name__):
+            return await run_sync(func, *args, **kwargs)
+
+    return wrapper
+
+
+def shutdown_executor() -> None:
+    """Stop the database thread pool, waiting for in-flight queries."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+
+@asynccontextmanager
+async def session() -> AsyncIterator[DatabaseSession]:
+    """Async form of ``DatabaseManager.session()``.
+
+    Pass the session to the wrappers below (``session=...``) so a request's
+    queries share one connection checkout:
+
+        async with db_async.session() as db:
+            entry = await get_calendar_entry(student_id, date, session=db)
+    """
+    with span("db", "session_checkout"):
+        db_session = DatabaseSession(await run_sync(DatabaseManager.get_connection))
+    try:
+        yield db_session
+    except BaseException:
+        await run_sync(db_session.close, False)
+        raise
+    await run_sync(db_session.close)
+
+
+async def load_student_context(
+    student_id: Optional[int] = None, refresh: bool = False
+) -> student_context.StudentContext:
+    """Return a student's cached context, offloading the query only on a miss.
+
+    ``student_id`` None means the default student.
+    """
+    if not refresh and student_id is not None:
+        cached = student_context.get_cached_student_context(student_id)
+        if cached is not None:
+            return cached
+    with span("db", "load_student_context"):
+        return await run_sync(student_context.load_student_context, student_id, refresh)
+
+
+async def load_topic_vocabulary(student_id: int, refresh: bool = False) -> topic_cache.TopicVocabulary:
+    """Return a student's cached topic vocabulary, offloading the queries only on a miss."""
+    if not refresh:
+        cached = topic_cache.get_cached_topic_vocabulary(student_id)
+        if cached is not None:
+            return cached
+    with span("db", "load_topic_vocabulary"):
+        return await run_sync(topic_cache.load_topic_vocabulary, student_id, refresh)
+
+
+create_student = _offload(db_helpers.create_student)
+get_student = _offload(db_helpers.get_student)
+get_student_name = _offload(db_helpers.get_student_name)
+get_exam_name = _offload(db_helpers.get_exam_name)
+get_student_memory = _offload(db_helpers.get_student_memory)
+add_student_memory = _offload(db_helpers.add_student_memory)
+get_calendar_entry = _offload(db_helpers.get_calendar_entry)
+set_calendar_entry = _offload(db_helpers.set_calendar_entry)
+get_skill_levels = _offload(db_helpers.get_skill_levels)
+set_skill_level = _offload(db_helpers.set_skill_level)
+set_skill_levels = _offload(db_helpers.set_skill_levels)
+get_questions_by_topic = _offload(db_helpers.get_questions_by_topic)
+get_questions_by_topics = _offload(db_helpers.get_questions_by_topics)
+get_unique_topics = _offload(db_helpers.get_unique_topics)
+get_topic_stats = _offload(db_helpers.get_topic_stats)
+get_chat_session_state = _offload(db_helpers.get_chat_session_state)
+get_chat_session_version = _offload(db_helpers.get_chat_session_version)
+save_chat_session_state = _offload(db_helpers.save_chat_session_state)
+delete_chat_session_state = _offload(db_helpers.delete_chat_session_state)
+purge_chat_session_states = _offload(db_helpers.purge_chat_session_states)
@@ -1,160 +1,631 @@
-"""Database helper functions for a single-student Eigen Coach instance."""
+"""Database helper functions for the Eigen Coach database.
+
+Every per-student table leads its keys with ``student_id``
+(``unique_student_date``, ``unique_student_topic``, ``idx_student_kind``,
+``uniq_student_memory_hash``), so the helpers take the student first and
+filter on it: each query reads one student's slice of an index, and the
+column doubles as the sharding key if the tables are ever split.
+"""
 
 from __future__ import annotations
 
 import json
 import os
-from typing import Any, Dict, List, Optional, Tuple
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
 
-from database.db import DatabaseManager
+from database.bulk import build_insert_sql
+from database.db import DatabaseManager, DatabaseSession
+from database.student_context import record_memory_entry, record_memory_hit
+from database.topic_cache import record_skill_levels
+from memory.similarity import DUPLICATE_THRESHOLD, conflicting_words, content_hash, similarity
 
 
 DEFAULT_STUDENT_NAME = os.getenv("EIGEN_STUDENT_NAME", "Eigen Student")
 DEFAULT_EXAM_NAME = os.getenv("EIGEN_EXAM_NAME", "Eigen Exam")
+SKILL_LEVEL_COLUMNS = ("student_id", "topic", "skill_level")
+# Recent notes a new memory entry is compared against
+MEMORY_DEDUPE_WINDOW = int(os.getenv("EIGEN_MEMORY_DEDUPE_WINDOW", "50"))
+
+
+def create_student(
+    student_name: str,
+    exam_name: str,
+    session: Optional[DatabaseSession] = None,
+) -> int:
+    """Create a student, or return the id of the one with this name and exam."""
+    with DatabaseManager.cursor(session) as cursor:
+        # LAST_INSERT_ID(id) makes lastrowid the existing row's id on a key collision
+        cursor.execute(
+            """INSERT INTO students (student_name, exam_name) VALUES (%s, %s)
+               ON DUPLICATE KEY UPDATE id = LAST_INSERT_ID(id)""",
+            (student_name, exam_name),
+        )
+        return cursor.lastrowid
 
 
-def get_student_name() -> str:
-    """Return the student name."""
-    conn = DatabaseManager.get_connection()
-    cursor = conn.cursor()
+def get_student(student_id: int, session: Optional[DatabaseSession] = None) -> Optional[Dict[str, Any]]:
+    """Return a student's id, name and exam."""
+    with DatabaseManager.cursor(session, dictionary=True) as cursor:
+        cursor.execute(
+            "SELECT id, student_name, exam_name, created_at FROM students WHERE id = %s",
+            (student_id,),
+        )
+        return cursor.fetchone()
 
-    try:
-        cursor.execute("SELECT student_name FROM students LIMIT 1")
+
+def get_student_name(student_id: int, session: Optional[DatabaseSession] = None) -> str:
+    """Return the student name."""
+    with DatabaseManager.cursor(session) as cursor:
+        cursor.execute("SELECT student_name FROM students WHERE id = %s", (student_id,))
         result = cursor.fetchone()
         return result[0] if result else DEFAULT_STUDENT_NAME
-    finally:
-        cursor.close()
-        conn.close()
 
 
-def get_exam_name() -> str:
+def get_exam_name(student_id: int, session: Optional[DatabaseSession] = None) -> str:
     """Return the exam name."""
-    conn = DatabaseManager.get_connection()
-    cursor = conn.cursor()
-
-    try:
-        cursor.execute("SELECT exam_name FROM students LIMIT 1")
+    with DatabaseManager.cursor(session) as cursor:
+        cursor.execute("SELECT exam_name FROM students WHERE id = %s", (student_id,))
         result = cursor.fetchone()
         return result[0] if result else DEFAULT_EXAM_NAME
-    finally:
-        cursor.close()
-        conn.close()
 
 
-def get_student_memory() -> List[str]:
-    """Return memory entries."""
-    conn = DatabaseManager.get_connection()
-    cursor = conn.cursor()
-
-    try:
+def get_student_memory(student_id: int, session: Optional[DatabaseSession] = None) -> List[str]:
+    """Return a student's memory entries."""
+    with DatabaseManager.cursor(session) as cursor:
         cursor.execute(
-            "SELECT memory_entry FROM student_memory ORDER BY created_at"
+            "SELECT memory_entry FROM student_memory WHERE student_id = %s ORDER BY created_at, id",
+            (student_id,),
         )
         return [row[0] for row in cursor.fetchall()]
-    finally:
-        cursor.close()
-        conn.close()
 
 
-def add_student_memory(memory_entry: str) -> bool:
-    """Add a memory entry."""
-    conn = DatabaseManager.get_connection()
-    cursor = conn.cursor()
+@dataclass
+class MemoryWrite:
+    """Outcome of ``add_student_memory``."""
+
+    memory_id: int
+    # True when the entry restated an existing note, which was bumped instead
+    merged: bool = False
+    memory_entry: str = ""
+    hits: int = 1
+
+
+def _find_similar_memory(cursor: Any, student_id: int, memory_entry: str) -> Optional[Tuple[int, str, int]]:
+    """Return (id, memory_entry, hits) of the closest recent note that says the same thing.
+
+    Notes at or above the threshold are skipped if the two differ in a
+    negation, polarity word or number (see ``memory.similarity``).
+    """
+    cursor.execute(
+        """SELECT id, memory_entry, hits
+           FROM student_memory
+           WHERE student_id = %s AND kind = 'note'
+           ORDER BY last_seen_at DESC, id DESC
+           LIMIT %s""",
+        (student_id, MEMORY_DEDUPE_WINDOW),
+    )
+    best, best_score = None, DUPLICATE_THRESHOLD
+    for memory_id, existing, hits in cursor.fetchall():
+        score = similarity(memory_entry, existing)
+        if score >= best_score and not conflicting_words(memory_entry, existing):
+            best, best_score = (memory_id, existing, hits), score
+    return best
+
+
+def _merge_memory(
+    cursor: Any,
+    session: Optional[DatabaseSession],
+    student_id: int,
+    memory_id: int,
+    memory_entry: str,
+    hits: int,
+) -> MemoryWrite:
+    """Fold a new entry into an existing note, keeping the new wording."""
+    cursor.execute(
+        """UPDATE student_memory
+           SET memory_entry = %s, content_hash = %s, hits = hits + 1, last_seen_at = CURRENT_TIMESTAMP
+           WHERE id = %s AND student_id = %s""",
+        (memory_entry, content_hash(memory_entry), memory_id, student_id),
+    )
+    DatabaseManager.after_commit(session, lambda: record_memory_hit(student_id, memory_id, memory_entry))
+    return MemoryWrite(memory_id, merged=True, memory_entry=memory_entry, hits=hits + 1)
+
+
+def add_student_memory(
+    student_id: int,
+    memory_entry: str,
+    session: Optional[DatabaseSession] = None,
+) -> MemoryWrite:
+    """Add a memory entry, merging it into an existing note that says the same thing.
+
+    An entry whose normalized text matches a stored note (the
+    ``(student_id, content_hash)`` unique key) is merged into it. Otherwise it
+    is compared with the student's ``EIGEN_MEMORY_DEDUPE_WINDOW`` most recent
+    notes, and a near-duplicate with no conflicting words is merged. A merge
+    bumps the note's ``hits`` and ``last_seen_at`` and replaces its text with
+    the new entry, since the newest wording is the most current.
+
+    Returns:
+        The written or merged note
+    """
+    memory_entry = memory_entry.strip()
+    if not memory_entry:
+        raise ValueError("memory_entry is empty")
+    entry_hash = content_hash(memory_entry)
+
+    with DatabaseManager.cursor(session) as cursor:
+        cursor.execute(
+            "SELECT id, hits FROM student_memory WHERE student_id = %s AND content_hash = %s",
+            (student_id, entry_hash),
+        )
+        row = cursor.fetchone()
+        if row is not None:
+            return _merge_memory(cursor, session, student_id, row[0], memory_entry, row[1])
 
-    try:
+        similar = _find_similar_memory(cursor, student_id, memory_entry)
+        if similar is not None:
+            memory_id, _, hits = similar
+            return _merge_memory(cursor, session, student_id, memory_id, memory_entry, hits)
+
+        # A concurrent write of the same note lands on the unique key;
+        # LAST_INSERT_ID(id) makes lastrowid the existing row's id then
         cursor.execute(
-            "INSERT INTO student_memory (memory_entry) VALUES (%s)",
-            (memory_entry,),
+            """INSERT INTO student_memory (student_id, memory_entry, content_hash, last_seen_at)
+               VALUES (%s, %s, %s, CURRENT_TIMESTAMP)
+               ON DUPLICATE KEY UPDATE
+                   id = LAST_INSERT_ID(id),
+                   memory_entry = VALUES(memory_entry),
+                   hits = hits + 1,
+                   last_seen_at = CURRENT_TIMESTAMP""",
+            (student_id, memory_entry, entry_hash),
         )
-        return True
-    finally:
-        cursor.close()
-        conn.close()
+        memory_id = cursor.lastrowid
+        # The cached context must not show a note the caller's transaction may roll back
+        if cursor.rowcount == 1:
+            DatabaseManager.after_commit(session, lambda: record_memory_entry(student_id, memory_entry, memory_id))
+            return MemoryWrite(memory_id, memory_entry=memory_entry)
+
+        DatabaseManager.after_commit(session, lambda: record_memory_hit(student_id, memory_id, memory_entry))
+        cursor.execute("SELECT hits FROM student_memory WHERE id = %s", (memory_id,))
+        (hits,) = cursor.fetchone()
+        return MemoryWrite(memory_id, merged=True, memory_entry=memory_entry, hits=hits)
+
+
+def get_memory_student_ids(session: Optional[DatabaseSession] = None) -> List[int]:
+    """Return the ids of students that have memory entries."""
+    with DatabaseManager.cursor(session) as cursor:
+        cursor.execute("SELECT DISTINCT student_id FROM student_memory ORDER BY student_id")
+        return [row[0] for row in cursor.fetchall()]
 
 
-def get_calendar_entry(date: str) -> Optional[Dict[str, Any]]:
-    """Return the calendar entry for the given date."""
-    conn = DatabaseManager.get_connection()
-    cursor = conn.cursor(dictionary=True)
+def get_memory_records(student_id: int, session: Optional[DatabaseSession] = None) -> List[Dict[str, Any]]:
+    """Return a student's memory rows (notes and summary), oldest first."""
+    with DatabaseManager.cursor(session, dictionary=True) as cursor:
+        cursor.execute(
+            """SELECT id, memory_entry, kind, hits, created_at, last_seen_at
+               FROM student_memory
+               WHERE student_id = %s
+               ORDER BY created_at, id""",
+            (student_id,),
+        )
+        return cursor.fetchall()
 
-    try:
+
+def apply_memory_compaction(
+    student_id: int,
+    merged: List[Tuple[int, int, Any]],
+    delete_ids: List[int],
+    summary: Optional[str],
+    summary_id: Optional[int],
+    restored: Sequence[Tuple[str, int, Any]] = (),
+    session: Optional[DatabaseSession] = None,
+) -> None:
+    """Write a compaction plan for one student.
+
+    Args:
+        student_id: Student whose memory is compacted
+        merged: (id, hits, last_seen_at) for notes that absorbed duplicates
+        delete_ids: Notes merged into another note or rolled into the summary
+        summary: New summary text, or None to leave the summary alone
+        summary_id: Existing summary row to update; a new one is inserted if None
+        restored: (text, hits, last_seen_at) for summary lines that no longer
+            fit and become notes again
+    """
+    with DatabaseManager.cursor(session) as cursor:
+        if restored:
+            cursor.executemany(
+                """INSERT INTO student_memory
+                       (student_id, memory_entry, content_hash, hits, created_at, last_seen_at)
+                   VALUES (%s, %s, %s, %s, COALESCE(%s, CURRENT_TIMESTAMP), COALESCE(%s, CURRENT_TIMESTAMP))
+                   ON DUPLICATE KEY UPDATE hits = hits + VALUES(hits)""",
+                [
+                    (student_id, text, content_hash(text), hits, last_seen_at, last_seen_at)
+                    for text, hits, last_seen_at in restored
+                ],
+            )
+        if merged:
+            cursor.executemany(
+                "UPDATE student_memory SET hits = %s, last_seen_at = %s WHERE id = %s AND student_id = %s",
+                [(hits, last_seen_at, memory_id, student_id) for memory_id, hits, last_seen_at in merged],
+            )
+        if summary is not None:
+            if summary_id is None:
+                cursor.execute(
+                    """INSERT INTO student_memory (student_id, memory_entry, kind, last_seen_at)
+                       VALUES (%s, %s, 'summary', CURRENT_TIMESTAMP)""",
+                    (student_id, summary),
+                )
+            else:
+                cursor.execute(
+                    """UPDATE student_memory
+                       SET memory_entry = %s, last_seen_at = CURRENT_TIMESTAMP
+                       WHERE id = %s AND student_id = %s""",
+                    (summary, summary_id, student_id),
+                )
+        if delete_ids:
+            placeholders = ", ".join(["%s"] * len(delete_ids))
+            cursor.execute(
+                f"DELETE FROM student_memory WHERE student_id = %s AND id IN ({placeholders})",
+                (student_id, *delete_ids),
+            )
+
+
+def get_calendar_entry(
+    student_id: int,
+    date: str,
+    session: Optional[DatabaseSession] = None,
+) -> Optional[Dict[str, Any]]:
+    """Return a student's calendar entry for the given date."""
+    with DatabaseManager.cursor(session, dictionary=True) as cursor:
+        # Point lookup on unique_student_date
         cursor.execute(
-            "SELECT date, topics, n_questions FROM calendar_entries WHERE date = %s",
-            (date,),
+            "SELECT date, topics, n_questions FROM calendar_entries WHERE student_id = %s AND date = %s",
+            (student_id, date),
         )
         result = cursor.fetchone()
         if result:
             result["topics"] = json.loads(result["topics"])
         return result
-    finally:
-        cursor.close()
-        conn.close()
 
 
-def set_calendar_entry(date: str, topics: List[str], n_questions: int = 1) -> bool:
-    """Create or update the calendar entry."""
-    conn = DatabaseManager.get_connection()
-    cursor = conn.cursor()
-
-    try:
+def set_calendar_entry(
+    student_id: int,
+    date: str,
+    topics: List[str],
+    n_questions: int = 1,
+    session: Optional[DatabaseSession] = None,
+) -> bool:
+    """Create or update a student's calendar entry."""
+    with DatabaseManager.cursor(session) as cursor:
         topics_json = json.dumps(topics)
         cursor.execute(
-            """INSERT INTO calendar_entries (date, topics, n_questions)
-               VALUES (%s, %s, %s)
+            """INSERT INTO calendar_entries (student_id, date, topics, n_questions)
+               VALUES (%s, %s, %s, %s)
                ON DUPLICATE KEY UPDATE topics = %s, n_questions = %s""",
-            (date, topics_json, n_questions, topics_json, n_questions),
+            (student_id, date, topics_json, n_questions, topics_json, n_questions),
         )
         return True
-    finally:
-        cursor.close()
-        conn.close()
 
 
-def get_skill_levels() -> List[Tuple[str, int]]:
-    """Return skill levels."""
-    conn = DatabaseManager.get_connection()
-    cursor = conn.cursor()
+def get_skill_levels(student_id: int, session: Optional[DatabaseSession] = None) -> List[Tuple[str, int]]:
+    """Return a student's skill levels."""
+    with DatabaseManager.cursor(session) as cursor:
+        # Reads unique_student_topic (student_id, topic) in index order
+        cursor.execute(
+            "SELECT topic, skill_level FROM skill_levels WHERE student_id = %s ORDER BY topic",
+            (student_id,),
+        )
+        return cursor.fetchall()
 
-    try:
+
+def set_skill_level(
+    student_id: int,
+    topic: str,
+    skill_level: int,
+    session: Optional[DatabaseSession] = None,
+) -> bool:
+    """Set a student's skill level for a topic."""
+    with DatabaseManager.cursor(session) as cursor:
         cursor.execute(
-            "SELECT topic, skill_level FROM skill_levels ORDER BY topic"
+            """INSERT INTO skill_levels (student_id, topic, skill_level)
+               VALUES (%s, %s, %s)
+               ON DUPLICATE KEY UPDATE skill_level = %s""",
+            (student_id, topic, skill_level, skill_level),
+        )
+    # The cache must not show a level the caller's transaction may roll back
+    DatabaseManager.after_commit(session, lambda: record_skill_levels(student_id, {topic: skill_level}))
+    return True
+
+
+def set_skill_levels(
+    student_id: int,
+    skill_levels: Dict[str, int],
+    session: Optional[DatabaseSession] = None,
+) -> int:
+    """Upsert several of a student's skill levels in one statement.
+
+    Returns:
+        Number of topics written
+    """
+    if not skill_levels:
+        return 0
+    with DatabaseManager.cursor(session) as cursor:
+        rows = [(student_id, topic, level) for topic, level in sorted(skill_levels.items())]
+        cursor.execute(
+            build_insert_sql("skill_levels", SKILL_LEVEL_COLUMNS, len(rows), update_columns=("skill_level",)),
+            [value for entry in rows for value in entry],
         )
+    DatabaseManager.after_commit(session, lambda: record_skill_levels(student_id, skill_levels))
+    return len(rows)
+
+
+def get_questions_by_topic(topic: str, session: Optional[DatabaseSession] = None) -> List[Dict]:
+    """Return all questions for a given topic."""
+    with DatabaseManager.cursor(session, dictionary=True) as cursor:
+        query = """
+            SELECT q.* FROM question_topics qt
+            JOIN questions q ON q.id = qt.question_id
+            WHERE qt.topic = %s
+            ORDER BY q.id
+        """
+        cursor.execute(query, (topic,))
         return cursor.fetchall()
-    finally:
-        cursor.close()
-        conn.close()
 
 
-def set_skill_level(topic: str, skill_level: int) -> bool:
-    """Set the skill level for a topic."""
-    conn = DatabaseManager.get_connection()
+def get_questions_by_topics(
+    topics: List[str],
+    session: Optional[DatabaseSession] = None,
+) -> Dict[str, List[Dict]]:
+    """Return the questions for several topics in one query.
+
+    Results are keyed by the topic names as passed in (matched with the
+    column's case-insensitive collation); topics without questions map to
+    an empty list. A question tagged with several of the topics appears
+    under each of them.
+    """
+    grouped: Dict[str, List[Dict]] = {topic: [] for topic in topics}
+    if not topics:
+        return grouped
+
+    requested: Dict[str, List[str]] = {}
+    for topic in topics:
+        requested.setdefault(topic.lower(), []).append(topic)
+
+    with DatabaseManager.cursor(session, dictionary=True) as cursor:
+        query = f"""
+            SELECT qt.topic AS matched_topic, q.* FROM question_topics qt
+            JOIN questions q ON q.id = qt.question_id
+            WHERE qt.topic IN ({', '.join(['%s'] * len(topics))})
+            ORDER BY qt.topic, q.id
+        """
+        cursor.execute(query, tuple(topics))
+        for row in cursor.fetchall():
+            matched = row.pop("matched_topic")
+            for topic in requested.get(matched.lower(), []):
+                grouped[topic].append(row)
+        return grouped
+
+
+def get_unique_topics(session: Optional[DatabaseSession] = None) -> List[str]:
+    """Return every topic tagged on at least one question."""
+    with DatabaseManager.cursor(session) as cursor:
+        cursor.execute(
+            "SELECT topic FROM topic_stats WHERE question_count > 0 ORDER BY topic"
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def get_topic_stats(topics: Optional[List[str]] = None, session: Optional[DatabaseSession] = None) -> List[Dict[str, Any]]:
+    """Return question bank statistics per topic, for all topics or the given ones.
+
+    Each row has question_count, easy/medium/hard counts, asked/unasked counts
+    and avg_difficulty on the 1-3 scale (None when no question is rated).
+    """
+    if topics is not None and not topics:
+        return []
+
+    with DatabaseManager.cursor(session, dictionary=True) as cursor:
+        query = """
+            SELECT topic, question_count, easy_count, medium_count, hard_count,
+                   asked_count, unasked_count,
+                   difficulty_sum / NULLIF(easy_count + medium_count + hard_count, 0)
+                       AS avg_difficulty
+            FROM topic_stats
+        """
+        params: Tuple = ()
+        if topics is not None:
+            query += f" WHERE topic IN ({', '.join(['%s'] * len(topics))})"
+            params = tuple(topics)
+        cursor.execute(query + " ORDER BY topic", params)
+        rows = cursor.fetchall()
+        for row in rows:
+            if row["avg_difficulty"] is not None:
+                row["avg_difficulty"] = float(row["avg_difficulty"])
+        return rows
+
+
+_QUESTION_TOPICS_SELECT = """
+    SELECT id, topic_tag1 FROM questions WHERE topic_tag1 IS NOT NULL AND topic_tag1 <> ''{filter}
+    UNION ALL
+    SELECT id, topic_tag2 FROM questions WHERE topic_tag2 IS NOT NULL AND topic_tag2 <> ''{filter}
+    UNION ALL
+    SELECT id, topic_tag3 FROM questions WHERE topic_tag3 IS NOT NULL AND topic_tag3 <> ''{filter}
+"""
+
+
+def sync_question_topics(
+    conn,
+    question_ids: Optional[List[int]] = None,
+    refresh_stats: bool = True,
+) -> Set[str]:
+    """Rebuild question_topics and topic_stats rows from the questions' tag columns.
+
+    Call after inserting or updating questions, on the same connection so the
+    index changes commit with the question writes. Without ``question_ids``
+    both tables are rebuilt; otherwise only the topics those questions had
+    before or have now are re-aggregated. Bulk loads can pass
+    ``refresh_stats=False`` and call ``refresh_topic_stats`` once at the end
+    with the union of the returned topics. Either way, call
+    ``invalidate_topic_list()`` after committing.
+
+    Returns:
+        The topics whose stats were (or need to be) refreshed; empty after a
+        full rebuild
+    """
     cursor = conn.cursor()
 
     try:
+        if question_ids is None:
+            cursor.execute("DELETE FROM question_topics")
+            cursor.execute(
+                "INSERT IGNORE INTO question_topics (question_id, topic)"
+                + _QUESTION_TOPICS_SELECT.format(filter="")
+            )
+            if refresh_stats:
+                refresh_topic_stats(conn)
+            return set()
+        if not question_ids:
+            return set()
+
+        placeholders = ", ".join(["%s"] * len(question_ids))
+        id_filter = f" AND id IN ({placeholders})"
+        topics_query = f"SELECT DISTINCT topic FROM question_topics WHERE question_id IN ({placeholders})"
+
+        cursor.execute(topics_query, tuple(question_ids))
+        affected = {row[0] for row in cursor.fetchall()}
         cursor.execute(
-            """INSERT INTO skill_levels (topic, skill_level)
-               VALUES (%s, %s)
-               ON DUPLICATE KEY UPDATE skill_level = %s""",
-            (topic, skill_level, skill_level),
+            f"DELETE FROM question_topics WHERE question_id IN ({placeholders})",
+            tuple(question_ids),
         )
-        return True
+        cursor.execute(
+            "INSERT IGNORE INTO question_topics (question_id, topic)"
+            + _QUESTION_TOPICS_SELECT.format(filter=id_filter),
+            tuple(question_ids) * 3,
+        )
+        cursor.execute(topics_query, tuple(question_ids))
+        affected.update(row[0] for row in cursor.fetchall())
+        if refresh_stats:
+            refresh_topic_stats(conn, sorted(affected))
+        return affected
     finally:
         cursor.close()
-        conn.close()
 
 
-def get_questions_by_topic(topic: str) -> List[Dict]:
-    """Return all questions for a given topic."""
-    conn = DatabaseManager.get_connection()
-    cursor = conn.cursor(dictionary=True)
+# Aggregates question_topics into topic_stats rows; difficulty labels map to 1-3
+_TOPIC_STATS_SELECT = """
+    SELECT
+        qt.topic,
+        COUNT(*),
+        SUM(LOWER(TRIM(q.difficulty)) IN ('easy', 'beginner')),
+        SUM(LOWER(TRIM(q.difficulty)) IN ('medium', 'intermediate')),
+        SUM(LOWER(TRIM(q.difficulty)) IN ('hard', 'advanced')),
+        COALESCE(SUM(CASE
+            WHEN LOWER(TRIM(q.difficulty)) IN ('easy', 'beginner') THEN 1
+            WHEN LOWER(TRIM(q.difficulty)) IN ('medium', 'intermediate') THEN 2
+            WHEN LOWER(TRIM(q.difficulty)) IN ('hard', 'advanced') THEN 3
+            ELSE 0
+        END), 0),
+        SUM(q.has_been_asked = 1),
+        SUM(q.has_been_asked = 0 OR q.has_been_asked IS NULL)
+    FROM question_topics qt
+    JOIN questions q ON q.id = qt.question_id
+    {filter}
+    GROUP BY qt.topic
+"""
+
+
+def refresh_topic_stats(conn, topics: Optional[List[str]] = None) -> None:
+    """Recompute topic_stats for the given topics (or all of them).
+
+    Each topic is re-aggregated through the question_topics primary key, so
+    the cost scales with the questions in the touched topics, not the bank.
+    Topics that no longer have questions are removed. The finalizer's cached
+    topic list is derived from topic_stats, so callers call
+    ``invalidate_topic_list()`` once these writes are committed.
+    """
+    if topics is not None and not topics:
+        return
+
+    cursor = conn.cursor()
 
     try:
-        query = """
-            SELECT * FROM questions
-            WHERE topic_tag1 = %s OR topic_tag2 = %s OR topic_tag3 = %s
-        """
-        cursor.execute(query, (topic, topic, topic))
-        return cursor.fetchall()
+        columns = (
+            "topic, question_count, easy_count, medium_count, hard_count, "
+            "difficulty_sum, asked_count, unasked_count"
+        )
+        if topics is None:
+            cursor.execute("DELETE FROM topic_stats")
+            cursor.execute(
+                f"INSERT INTO topic_stats ({columns})" + _TOPIC_STATS_SELECT.format(filter="")
+            )
+            return
+
+        placeholders = ", ".join(["%s"] * len(topics))
+        cursor.execute(
+            f"DELETE FROM topic_stats WHERE topic IN ({placeholders})",
+            tuple(topics),
+        )
+        cursor.execute(
+            f"INSERT INTO topic_stats ({columns})"
+            + _TOPIC_STATS_SELECT.format(filter=f"WHERE qt.topic IN ({placeholders})"),
+            tuple(topics),
+        )
     finally:
         cursor.close()
-        conn.close()
+
+
+def get_chat_session_state(session_id: str, session: Optional[DatabaseSession] = None) -> Optional[Dict[str, Any]]:
+    """Return the stored state of a chat session."""
+    with DatabaseManager.cursor(session) as cursor:
+        cursor.execute(
+            "SELECT state FROM chat_sessions WHERE session_id = %s",
+            (session_id,),
+        )
+        result = cursor.fetchone()
+        return json.loads(result[0]) if result else None
+
+
+def get_chat_session_version(session_id: str, session: Optional[DatabaseSession] = None) -> Optional[int]:
+    """Return the stored version of a chat session without loading its state."""
+    with DatabaseManager.cursor(session) as cursor:
+        cursor.execute(
+            "SELECT version FROM chat_sessions WHERE session_id = %s",
+            (session_id,),
+        )
+        result = cursor.fetchone()
+        return result[0] if result else None
+
+
+def save_chat_session_state(session_id: str, state: Dict[str, Any], session: Optional[DatabaseSession] = None) -> bool:
+    """Create or replace the stored state of a chat session."""
+    with DatabaseManager.cursor(session) as cursor:
+        state_json = json.dumps(state)
+        version = state.get("version", 0)
+        cursor.execute(
+            """INSERT INTO chat_sessions (session_id, state, version)
+               VALUES (%s, %s, %s)
+               ON DUPLICATE KEY UPDATE state = %s, version = %s""",
+            (session_id, state_json, version, state_json, version),
+        )
+        return True
+
+
+def delete_chat_session_state(session_id: str, session: Optional[DatabaseSession] = None) -> bool:
+    """Delete the stored state of a chat session."""
+    with DatabaseManager.cursor(session) as cursor:
+        cursor.execute(
+            "DELETE FROM chat_sessions WHERE session_id = %s",
+            (session_id,),
+        )
+        return True
+
+
+def purge_chat_session_states(max_age_seconds: int, session: Optional[DatabaseSession] = None) -> int:
+    """Delete chat session state untouched for longer than max_age_seconds."""
+    with DatabaseManager.cursor(session) as cursor:
+        cursor.execute(
+            "DELETE FROM chat_sessions WHERE updated_at < NOW() - INTERVAL %s SECOND",
+            (max_age_seconds,),
+        )
+        return cursor.rowcount
@@ -1,10 +1,19 @@
 """
 Unified MCP server for Eigen Coach database.
 Provides tools for questions, student memory, calendar, and skill levels.
+
+The student tools act for the student bound to the server, never for an id
+the model supplies: a prompt-injected "use student 7" must not read or write
+another student's data. Each agent gets its own server through
+``get_mcp_servers(binding)``; the tutor binds its session's student when it
+leases a client.
 """
 
-from claude_agent_sdk import tool, create_sdk_mcp_server
-from typing import Any
+from claude_agent_sdk import SdkMcpTool, tool, create_sdk_mcp_server
+from typing import Any, Awaitable, Callable, Optional
+import argparse
+import asyncio
+import os
 import sys
 import logging
 import json
@@ -12,23 +21,77 @@ import json
 # Add parent directory to path
 sys.path.insert(0, '/Users/joe/repostories/calhacks/backend')
 
-from database.db import DatabaseManager
-from database.db_helpers import (
-    get_student_memory,
+from database.db_async import (
     add_student_memory,
     get_calendar_entry,
     get_skill_levels,
     set_skill_level,
     get_questions_by_topic,
+    get_topic_stats,
 )
+from tracing import traced
 
-# Configure logging
 log = logging.getLogger("db_mcp")
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    stream=sys.stderr
-)
+
+# "inprocess" attaches a build_db_server() instance to each agent so tool calls share the
+# API process's connection pool; "subprocess" launches this module per client.
+MCP_MODE = os.getenv("EIGEN_MCP_MODE", "inprocess")
+
+
+class StudentBinding:
+    """The student an agent's database tools act for.
+
+    Set by the server (when the session is created or a pooled client is
+    leased) and never from tool arguments. Once bound it cannot be moved to
+    another student.
+    """
+
+    def __init__(self, student_id: Optional[int] = None) -> None:
+        self.student_id = student_id
+
+    def bind(self, student_id: int) -> None:
+        if self.student_id is not None and self.student_id != student_id:
+            raise ValueError(f"Tools are already bound to student {self.student_id}")
+        self.student_id = student_id
+
+
+def student_id_arg(args: dict[str, Any]) -> int:
+    """Return the ``student_id`` injected by ``bind_student_tools``."""
+    try:
+        return int(args["student_id"])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("No student is bound to this session")
+
+
+def _bound_handler(
+    name: str,
+    handler: Callable[[dict[str, Any]], Awaitable[dict[str, Any]]],
+    binding: StudentBinding,
+) -> Callable[[dict[str, Any]], Awaitable[dict[str, Any]]]:
+    async def call(args: dict[str, Any]) -> dict[str, Any]:
+        if binding.student_id is None:
+            return {"content": [{"type": "text", "text": "Error: No student is bound to this session"}]}
+        requested = args.get("student_id")
+        if requested is not None and str(requested) != str(binding.student_id):
+            log.warning(f"{name}: refused student_id {requested!r} from the model (bound to {binding.student_id})")
+            return {"content": [{"type": "text", "text": "Error: This session can only access its own student"}]}
+        return await handler({**args, "student_id": binding.student_id})
+
+    return call
+
+
+def bind_student_tools(tools: list[SdkMcpTool[Any]], binding: StudentBinding) -> list[SdkMcpTool[Any]]:
+    """Copy student tools so they act only for ``binding``'s student."""
+    return [
+        SdkMcpTool(
+            name=student_tool.name,
+            description=student_tool.description,
+            input_schema=student_tool.input_schema,
+            handler=_bound_handler(student_tool.name, student_tool.handler, binding),
+            annotations=student_tool.annotations,
+        )
+        for student_tool in tools
+    ]
 
 
 # ============================================================================
@@ -40,12 +103,13 @@ logging.basicConfig(
     "Get questions from the database by topic tag",
     {"topic": str}
 )
+@traced("mcp_tool", "get_question_by_topic")
 async def get_question_by_topic(args: dict[str, Any]) -> dict[str, Any]:
     """Get questions for a specific topic."""
     topic = args.get("topic", "")
     
     try:
-        results = get_questions_by_topic(topic)
+        results = await get_questions_by_topic(topic)
         
         if not results:
             text = f"No questions found for topic: {topic}"
@@ -68,52 +132,33 @@ Asked: {row['has_been_asked']}
         return {"content": [{"type": "text", "text": f"Error: {str(e)}"}]}
 
 
+def _format_topic_stats(row: dict[str, Any]) -> str:
+    avg = row["avg_difficulty"]
+    avg_text = f"{avg:.2f}" if avg is not None else "n/a"
+    return (
+        f"{row['topic']}: avg difficulty {avg_text} (1=easy, 3=hard), "
+        f"{row['question_count']} questions "
+        f"[easy {row['easy_count']}, medium {row['medium_count']}, hard {row['hard_count']}], "
+        f"{row['unasked_count']} not yet asked"
+    )
+
+
 @tool(
     "get_unique_topics",
     "Get all unique topics with their average difficulty scores",
     {}
 )
+@traced("mcp_tool", "get_unique_topics")
 async def get_unique_topics(args: dict[str, Any]) -> dict[str, Any]:
     """Get all unique topics from the question bank."""
     try:
-        conn = DatabaseManager.get_connection()
-        cursor = conn.cursor()
-        
-        # Get unique topics
-        query = """
-            SELECT DISTINCT topic_tag1 FROM questions 
-            UNION 
-            SELECT DISTINCT topic_tag2 FROM questions
-            UNION
-            SELECT DISTINCT topic_tag3 FROM questions
-            WHERE topic_tag3 IS NOT NULL
-            ORDER BY topic_tag1
-        """
-        cursor.execute(query)
-        topics_results = cursor.fetchall()
-        
-        if not topics_results:
+        stats = [row for row in await get_topic_stats() if row["question_count"] > 0]
+
+        if not stats:
             text = "No topics found."
         else:
-            topics = [row[0] for row in topics_results if row[0]]
-            topic_scores = []
-            
-            # Calculate average difficulty for each topic
-            for topic in topics:
-                score_query = """
-                    SELECT AVG(CAST(difficulty AS FLOAT)) as avg_score
-                    FROM questions 
-                    WHERE topic_tag1 = %s OR topic_tag2 = %s OR topic_tag3 = %s
-                """
-                cursor.execute(score_query, (topic, topic, topic))
-                score_result = cursor.fetchone()
-                avg_score = score_result[0] if score_result and score_result[0] else 0.0
-                topic_scores.append(f"{topic}: {round(avg_score, 2)}")
-            
-            text = "Topics (with avg difficulty):\n" + "\n".join(topic_scores)
-        
-        cursor.close()
-        conn.close()
+            text = "Topics (with avg difficulty):\n" + "\n".join(_format_topic_stats(row) for row in stats)
+
         return {"content": [{"type": "text", "text": text}]}
         
     except Exception as e:
@@ -129,11 +174,12 @@ async def get_unique_topics(args: dict[str, Any]) -> dict[str, Any]:
     "Get topic-skill level pairs for the student",
     {}
 )
+@traced("mcp_tool", "get_skill_level_pairs")
 async def get_skill_level_pairs(args: dict[str, Any]) -> dict[str, Any]:
     """Get skill level pairs for a student."""
     
     try:
-        pairs = get_skill_levels()
+        pairs = await get_skill_levels(student_id_arg(args))
         
         if not pairs:
             text = "No skill levels found."
@@ -149,15 +195,16 @@ async def get_skill_level_pairs(args: dict[str, Any]) -> dict[str, Any]:
 
 @tool(
     "get_topics_by_date",
-    "Get topics and question count for a specific date",
+    "Get the student's scheduled topics and question count for a specific date",
     {"date": str}
 )
+@traced("mcp_tool", "get_topics_by_date")
 async def get_topics_by_date(args: dict[str, Any]) -> dict[str, Any]:
     """Get calendar entry for a date."""
     date = args.get("date", "")
     
     try:
-        entry = get_calendar_entry(date)
+        entry = await get_calendar_entry(student_id_arg(args), date)
         
         if not entry:
             text = f"No schedule found for {date}."
@@ -176,15 +223,19 @@ async def get_topics_by_date(args: dict[str, Any]) -> dict[str, Any]:
     "Add a memory note for the student",
     {"memory_entry": str}
 )
+@traced("mcp_tool", "add_memory_entry")
 async def add_memory_entry(args: dict[str, Any]) -> dict[str, Any]:
     """Add memory entry for a student."""
     print("add_memory_entry called with args:", args)
     memory_entry = args.get("memory_entry", "")
     
     try:
-        success = add_student_memory(memory_entry)
+        result = await add_student_memory(student_id_arg(args), memory_entry)
         
-        text = f"Memory added: '{memory_entry}'" if success else "Failed to add memory"
+        if result.merged:
+            text = f"Already noted (noted {result.hits} times); the note now reads '{result.memory_entry}'"
+        else:
+            text = f"Memory added: '{memory_entry}'"
         return {"content": [{"type": "text", "text": text}]}
         
     except Exception as e:
@@ -193,16 +244,17 @@ async def add_memory_entry(args: dict[str, Any]) -> dict[str, Any]:
 
 @tool(
     "update_skill_level",
-    "Update or set skill level for a topic",
+    "Update or set the student's skill level for a topic",
     {"topic": str, "skill_level": int}
 )
+@traced("mcp_tool", "update_skill_level")
 async def update_skill_level(args: dict[str, Any]) -> dict[str, Any]:
     """Update skill level for a student topic."""
     topic = args.get("topic", "")
     skill_level = args.get("skill_level", 0)
     
     try:
-        success = set_skill_level(topic, skill_level)
+        success = await set_skill_level(student_id_arg(args), topic, skill_level)
         
         text = f"Skill level updated: {topic} = {skill_level}" if success else "Failed to update"
         return {"content": [{"type": "text", "text": text}]}
@@ -215,22 +267,51 @@ async def update_skill_level(args: dict[str, Any]) -> dict[str, Any]:
 # Create Unified MCP Server
 # ============================================================================
 
-db_server = create_sdk_mcp_server(
-    "eigen-coach-db",
-    "1.0.0",
-    tools=[
-        # Question bank tools
-        get_question_by_topic,
-        get_unique_topics,
-        # Student memory tools
-        get_skill_level_pairs,
-        get_topics_by_date,
-        add_memory_entry,
-        update_skill_level
-    ]
-)
+QUESTION_TOOLS = [get_question_by_topic, get_unique_topics]
+STUDENT_TOOLS = [get_skill_level_pairs, get_topics_by_date, add_memory_entry, update_skill_level]
+
+
+def build_db_server(binding: StudentBinding) -> dict[str, Any]:
+    """Build an in-process server whose student tools act for ``binding``'s student."""
+    return create_sdk_mcp_server(
+        "eigen-coach-db",
+        "1.0.0",
+        tools=QUESTION_TOOLS + bind_student_tools(STUDENT_TOOLS, binding),
+    )
+
+
+def get_mcp_servers(binding: Optional[StudentBinding] = None) -> dict[str, Any]:
+    """Return the ``mcp_servers`` option for agents that use the database tools.
+
+    Without a bound student the student tools refuse every call. In
+    subprocess mode the student is fixed when the server process starts.
+    """
+    binding = binding or StudentBinding()
+    if MCP_MODE == "subprocess":
+        args = ["-m", "database.db_mcp"]
+        if binding.student_id is not None:
+            args += ["--student-id", str(binding.student_id)]
+        return {"database": {"command": sys.executable, "args": args}}
+    return {"database": build_db_server(binding)}
+
+
+async def _serve_stdio(student_id: Optional[int]) -> None:
+    """Serve the database tools over stdio for subprocess mode."""
+    from mcp.server.stdio import stdio_server
+
+    server = build_db_server(StudentBinding(student_id))["instance"]
+    async with stdio_server() as (read_stream, write_stream):
+        await server.run(read_stream, write_stream, server.create_initialization_options())
 
 
 if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        stream=sys.stderr
+    )
+    parser = argparse.ArgumentParser(description="Serve the Eigen Coach database tools over stdio.")
+    parser.add_argument("--student-id", type=int, help="student the student tools act for")
+    cli_args = parser.parse_args()
     log.info("Starting Eigen Coach unified database MCP server")
-    db_server.run()
+    asyncio.run(_serve_stdio(cli_args.student_id))
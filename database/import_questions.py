@@ -0,0 +1,323 @@
+"""
+Streaming question-bank import.
+
+Reads JSONL or CSV (optionally gzipped) one record at a time, validates each
+record against the ``questions`` schema, drops in-chunk duplicates of the
+``uniq_question_prompt`` key and bulk-upserts the rest, so memory use stays
+flat however large the file is. Re-importing a file updates existing
+questions instead of duplicating them.
+
+Usage:
+    python -m database.import_questions bank.jsonl
+    python -m database.import_questions bank.csv.gz --chunk-size 2000 --rejects rejects.jsonl
+    python -m database.import_questions bank.jsonl --dry-run
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import gzip
+import hashlib
+import io
+import json
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, TextIO, Tuple
+
+from database.bulk import BULK_CHUNK_SIZE, bulk_insert, chunked
+from database.db import DatabaseManager
+from database.db_helpers import refresh_topic_stats
+from database.topic_cache import invalidate_topic_list
+from database.seed_data import (
+    PROMPT_KEY_CHARS,
+    QUESTION_COLUMNS,
+    QUESTION_UPDATE_COLUMNS,
+    question_chunk_syncer,
+)
+
+
+REQUIRED_FIELDS = ("question_prompt", "answer", "topic_tag1")
+# VARCHAR limits from migrations/002_create_question_bank.sql
+MAX_LENGTHS = {
+    "difficulty": 50,
+    "topic_tag1": 255,
+    "topic_tag2": 255,
+    "topic_tag3": 255,
+    "source": 255,
+}
+TRUE_VALUES = {"1", "true", "yes", "y", "t"}
+FALSE_VALUES = {"", "0", "false", "no", "n", "f"}
+PROGRESS_INTERVAL = 2.0
+MAX_ERRORS_SHOWN = 10
+
+IMPORT_COLUMNS = QUESTION_COLUMNS + ("source",)
+IMPORT_UPDATE_COLUMNS = QUESTION_UPDATE_COLUMNS + ("source",)
+
+
+class ValidationError(ValueError):
+    """A record that cannot be imported."""
+
+
+@dataclass
+class ImportStats:
+    """Running totals for an import."""
+
+    read: int = 0
+    written: int = 0
+    invalid: int = 0
+    duplicates: int = 0
+    chunks: int = 0
+    started: float = 0.0
+
+    @property
+    def elapsed(self) -> float:
+        return max(time.perf_counter() - self.started, 1e-9)
+
+    def __str__(self) -> str:
+        return (
+            f"{self.read:,} read, {self.written:,} written, {self.invalid:,} invalid, "
+            f"{self.duplicates:,} duplicate ({self.read / self.elapsed:,.0f} rows/sec)"
+        )
+
+
+def _open_text(path: Path) -> TextIO:
+    if path.suffix == ".gz":
+        return io.TextIOWrapper(gzip.open(path, "rb"), encoding="utf-8", newline="")
+    return open(path, "r", encoding="utf-8", newline="")
+
+
+def detect_format(path: Path) -> str:
+    """Return "jsonl" or "csv" from the file name."""
+    suffixes = [suffix.lower() for suffix in path.suffixes if suffix.lower() != ".gz"]
+    last = suffixes[-1] if suffixes else ""
+    if last in (".jsonl", ".ndjson"):
+        return "jsonl"
+    if last in (".csv", ".tsv"):
+        return "csv"
+    raise ValueError(f"Cannot tell the format of {path.name}; pass --format")
+
+
+def read_records(path: Path, file_format: str) -> Iterator[Tuple[int, Any]]:
+    """Yield (line number, record) pairs without loading the whole file.
+
+    Lines that are not valid JSON are yielded as ValidationError instances
+    so the caller can count them with the other invalid records.
+    """
+    with _open_text(path) as handle:
+        if file_format == "csv":
+            dialect = "excel-tab" if ".tsv" in path.suffixes else "excel"
+            reader = csv.DictReader(handle, dialect=dialect)
+            for record in reader:
+                yield reader.line_num, record
+            return
+
+        for line_no, line in enumerate(handle, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield line_no, json.loads(line)
+            except json.JSONDecodeError as exc:
+                yield line_no, ValidationError(f"invalid JSON: {exc.msg}")
+
+
+def _clean(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    text = str(value).strip()
+    return text or None
+
+
+def _parse_bool(value: Any) -> int:
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (int, float)):
+        return 1 if value else 0
+    text = str(value or "").strip().lower()
+    if text in TRUE_VALUES:
+        return 1
+    if text in FALSE_VALUES:
+        return 0
+    raise ValidationError(f"has_been_asked must be a boolean, got {value!r}")
+
+
+def validate_record(record: Any, default_source: Optional[str] = None) -> tuple:
+    """Turn one input record into a row in IMPORT_COLUMNS order.
+
+    Raises:
+        ValidationError: if a required field is missing or a value does not fit its column
+    """
+    if isinstance(record, ValidationError):
+        raise record
+    if not isinstance(record, dict):
+        raise ValidationError("record is not an object")
+
+    values: Dict[str, Optional[str]] = {
+        column: _clean(record.get(column))
+        for column in IMPORT_COLUMNS
+        if column != "has_been_asked"
+    }
+    missing = [field for field in REQUIRED_FIELDS if not values.get(field)]
+    if missing:
+        raise ValidationError(f"missing required field(s): {', '.join(missing)}")
+
+    for column, limit in MAX_LENGTHS.items():
+        value = values.get(column)
+        if value is not None and len(value) > limit:
+            raise ValidationError(f"{column} is longer than {limit} characters")
+
+    return (
+        values["question_prompt"],
+        values["answer"],
+        values["explanation"],
+        values["difficulty"] or "medium",
+        values["topic_tag1"],
+        values["topic_tag2"],
+        values["topic_tag3"],
+        _parse_bool(record.get("has_been_asked")),
+        values["source"] or default_source,
+    )
+
+
+def prompt_key(prompt: str) -> bytes:
+    """Hash of the part of a prompt that uniq_question_prompt compares.
+
+    The column collation is case-insensitive, so the key is casefolded too.
+    """
+    return hashlib.blake2b(prompt[:PROMPT_KEY_CHARS].casefold().encode("utf-8"), digest_size=16).digest()
+
+
+def dedupe_chunk(chunk: List[tuple]) -> List[tuple]:
+    """Keep the last row for each prompt key within a chunk.
+
+    Duplicates across chunks are resolved by the upsert itself.
+    """
+    rows: Dict[bytes, tuple] = {}
+    for row in chunk:
+        key = prompt_key(row[0])
+        rows.pop(key, None)
+        rows[key] = row
+    return list(rows.values())
+
+
+def import_questions(
+    path: Path,
+    file_format: Optional[str] = None,
+    chunk_size: int = BULK_CHUNK_SIZE,
+    source: Optional[str] = None,
+    rejects_path: Optional[Path] = None,
+    dry_run: bool = False,
+) -> ImportStats:
+    """Stream ``path`` into the questions table.
+
+    Args:
+        path: JSONL or CSV file, optionally gzipped
+        file_format: "jsonl" or "csv"; detected from the file name by default
+        chunk_size: Rows per bulk upsert and per commit
+        source: Value for the ``source`` column when records do not set one
+        rejects_path: Write invalid records here as JSONL with their error
+        dry_run: Validate and count only; nothing is written to the database
+    """
+    file_format = file_format or detect_format(path)
+    source = source or path.name
+    stats = ImportStats(started=time.perf_counter())
+    touched_topics: Set[str] = set()
+    errors_shown = 0
+    last_report = stats.started
+    rejects = open(rejects_path, "w", encoding="utf-8") if rejects_path else None
+
+    def valid_rows() -> Iterator[tuple]:
+        nonlocal errors_shown
+        for line_no, record in read_records(path, file_format):
+            stats.read += 1
+            try:
+                yield validate_record(record, source)
+            except ValidationError as exc:
+                stats.invalid += 1
+                if errors_shown < MAX_ERRORS_SHOWN:
+                    print(f"[QuestionImport] Line {line_no}: {exc}")
+                    errors_shown += 1
+                if rejects is not None:
+                    rejected = record if isinstance(record, dict) else None
+                    rejects.write(json.dumps({"line": line_no, "error": str(exc), "record": rejected}) + "\n")
+
+    conn = None if dry_run else DatabaseManager.get_connection()
+    sync_chunk = question_chunk_syncer(touched_topics)
+    try:
+        for chunk in chunked(valid_rows(), max(1, chunk_size)):
+            rows = dedupe_chunk(chunk)
+            stats.duplicates += len(chunk) - len(rows)
+            if conn is not None:
+                bulk_insert(
+                    conn,
+                    "questions",
+                    IMPORT_COLUMNS,
+                    rows,
+                    update_columns=IMPORT_UPDATE_COLUMNS,
+                    chunk_size=len(rows),
+                    on_chunk=sync_chunk,
+                )
+            stats.written += len(rows)
+            stats.chunks += 1
+
+            now = time.perf_counter()
+            if now - last_report >= PROGRESS_INTERVAL:
+                print(f"[QuestionImport] {stats}")
+                last_report = now
+
+        if conn is not None and touched_topics:
+            refresh_topic_stats(conn, sorted(touched_topics))
+            conn.commit()
+            # After the commit, so a reload cannot cache the old topic list
+            invalidate_topic_list()
+    finally:
+        if rejects is not None:
+            rejects.close()
+        if conn is not None:
+            conn.close()
+
+    if errors_shown < stats.invalid:
+        print(f"[QuestionImport] ... {stats.invalid - errors_shown} more invalid record(s) not shown")
+    verb = "Validated" if dry_run else "Imported"
+    print(f"[QuestionImport] {verb} {path.name} in {stats.elapsed:.1f}s: {stats}")
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Stream a JSONL or CSV question bank into the questions table.",
+    )
+    parser.add_argument("path", type=Path, help="input file (.jsonl, .csv, optionally .gz)")
+    parser.add_argument("--format", choices=("jsonl", "csv"), help="override format detection")
+    parser.add_argument("--chunk-size", type=int, default=BULK_CHUNK_SIZE, help="rows per upsert and commit")
+    parser.add_argument("--source", help="source label for records without one (default: file name)")
+    parser.add_argument("--rejects", type=Path, help="write invalid records to this JSONL file")
+    parser.add_argument("--dry-run", action="store_true", help="validate without writing to the database")
+    args = parser.parse_args(argv)
+
+    if not args.path.exists():
+        print(f"[QuestionImport] File not found: {args.path}")
+        return 1
+
+    try:
+        stats = import_questions(
+            args.path,
+            file_format=args.format,
+            chunk_size=args.chunk_size,
+            source=args.source,
+            rejects_path=args.rejects,
+            dry_run=args.dry_run,
+        )
+    except ValueError as exc:
+        print(f"[QuestionImport] {exc}")
+        return 1
+    finally:
+        DatabaseManager.close_all()
+    return 0 if stats.written or not stats.read else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,25 +1,37 @@
 """
 Unified database initialization for Eigen Coach.
 Creates database, tables, and sets up connection pool.
+
+Usage:
+    python database/init.py             # migrate (seeds only if EIGEN_SEED is set)
+    python database/init.py --seed      # migrate and apply changed seed files
+    python database/init.py --force-seed  # migrate and re-apply every seed file
+    python database/init.py --reset     # DELETE all data, then seed from scratch
+    python database/init.py --status    # show applied / pending migrations
+    python database/init.py --dry-run   # list pending migrations without applying them
 """
 
+import argparse
 import sys
 import os
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from database.db import DatabaseManager
+import mysql.connector
+
+from database.db import DB_CONFIG, DatabaseManager
+from database.migrations import get_migration_status, run_migrations
 
 
-def initialize_database():
+def initialize_database(seed_mode=None):
     """
     Initialize the Eigen Coach database.
-    Creates connection pool and runs migrations.
+    Creates connection pool, runs migrations and seeds according to seed_mode.
     """
     try:
         print("[Database] Initializing connection pool and running migrations...")
-        DatabaseManager.initialize()
+        DatabaseManager.initialize(seed_mode=seed_mode)
         print("[Database] ✓ Initialization complete")
         return True
     except Exception as e:
@@ -29,6 +41,73 @@ def initialize_database():
         return False
 
 
+def _connect():
+    # A plain connection: --status and --dry-run must not migrate or seed
+    return mysql.connector.connect(autocommit=True, **DB_CONFIG)
+
+
+def show_status():
+    """Print every migration file with its recorded state."""
+    conn = _connect()
+    try:
+        statuses = get_migration_status(conn)
+    finally:
+        conn.close()
+
+    if not statuses:
+        print("[Database] No migration files found")
+        return True
+
+    for status in statuses:
+        detail = f"applied {status.applied_at} ({status.execution_ms} ms)" if status.applied_at else ""
+        print(f"  {status.state:<8} {status.version}  {detail}".rstrip())
+
+    changed = [status.version for status in statuses if status.state == "changed"]
+    if changed:
+        print(f"[Database] ✗ {len(changed)} applied migration(s) were edited afterwards: {', '.join(changed)}")
+    return not changed
+
+
+def dry_run():
+    """Print the migrations the next startup would apply."""
+    conn = _connect()
+    try:
+        pending = run_migrations(conn, dry_run=True)
+    finally:
+        conn.close()
+
+    if not pending:
+        print("[Database] Schema up to date; nothing to apply")
+        return True
+
+    print(f"[Database] {len(pending)} pending migration(s):")
+    for migration in pending:
+        mode = "transaction" if migration.transactional else "autocommit DDL"
+        print(f"  {migration.path.name}: {len(migration.statements)} statement(s), {mode}")
+    return True
+
+
 if __name__ == "__main__":
-    success = initialize_database()
+    parser = argparse.ArgumentParser(description="Initialize the Eigen Coach database.")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--status", action="store_true", help="show applied and pending migrations")
+    group.add_argument("--dry-run", action="store_true", help="list pending migrations without applying them")
+    group.add_argument("--seed", action="store_true", help="apply seed files whose content changed")
+    group.add_argument("--force-seed", action="store_true", help="re-apply every seed file")
+    group.add_argument("--reset", action="store_true", help="delete all data and seed from scratch")
+    args = parser.parse_args()
+
+    if args.status:
+        success = show_status()
+    elif args.dry_run:
+        success = dry_run()
+    elif args.seed:
+        success = initialize_database(seed_mode="changed")
+    elif args.force_seed:
+        success = initialize_database(seed_mode="force")
+    elif args.reset:
+        print("[Database] Resetting: all student and question data will be deleted")
+        success = initialize_database(seed_mode="reset")
+    else:
+        success = initialize_database()
     sys.exit(0 if success else 1)
@@ -0,0 +1,342 @@
+"""Versioned migration runner for the Eigen Coach database.
+
+Each ``migrations/*.sql`` file is applied once and recorded in
+``schema_migrations`` with its SHA-256 checksum, so startup only reads that
+table and skips everything already applied. Files that contain no DDL run in
+a single transaction; MySQL commits DDL implicitly, so files with DDL are
+applied statement by statement. A file that fails halfway is re-run from the
+top, so every DDL step must be idempotent on its own: ``CREATE TABLE IF NOT
+EXISTS`` where MySQL supports it, and for ``ALTER TABLE`` (which has no ``IF
+NOT EXISTS`` in MySQL 8) an ``information_schema`` check that prepares either
+the ALTER or a no-op, as in ``007_add_memory_compaction.sql``.
+
+``--status`` and ``--dry-run`` only read: without a ``schema_migrations``
+table every file is reported as pending.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations"
+# Serializes runners when several workers start at once
+MIGRATION_LOCK_NAME = "eigen_schema_migrations"
+MIGRATION_LOCK_TIMEOUT = 60
+
+_DDL_PATTERN = re.compile(r"^\s*(CREATE|ALTER|DROP|RENAME|TRUNCATE)\b", re.IGNORECASE)
+# Prepared statements may hold DDL (see the guarded ALTERs), so they rule out a transaction too
+_DYNAMIC_SQL_PATTERN = re.compile(r"^\s*PREPARE\b", re.IGNORECASE)
+_DELIMITER_PATTERN = re.compile(r"^\s*DELIMITER\s+(\S+)\s*$", re.IGNORECASE)
+
+
+class MigrationError(Exception):
+    """Raised when a migration file cannot be applied."""
+
+
+@dataclass
+class Migration:
+    """A migration file on disk."""
+
+    version: str
+    path: Path
+    sql: str
+    checksum: str
+
+    @property
+    def statements(self) -> List[str]:
+        return split_sql(self.sql)
+
+    @property
+    def transactional(self) -> bool:
+        """Whether the whole file can run inside one transaction."""
+        return not any(
+            _DDL_PATTERN.match(statement) or _DYNAMIC_SQL_PATTERN.match(statement)
+            for statement in self.statements
+        )
+
+
+@dataclass
+class MigrationStatus:
+    """How a migration file relates to what the database has recorded."""
+
+    version: str
+    state: str  # "applied", "pending" or "changed"
+    applied_at: Optional[str] = None
+    execution_ms: Optional[int] = None
+
+
+def _split_block(script: str, delimiter: str) -> List[str]:
+    """Split on ``delimiter`` outside quotes and comments, dropping comments."""
+    statements: List[str] = []
+    current: List[str] = []
+    i = 0
+    length = len(script)
+
+    while i < length:
+        char = script[i]
+
+        if char in ("'", '"', "`"):
+            # Quoted string or identifier; backslash and doubled quotes escape
+            end = i + 1
+            while end < length:
+                if script[end] == "\\" and char != "`":
+                    end += 2
+                    continue
+                if script[end] == char:
+                    if end + 1 < length and script[end + 1] == char:
+                        end += 2
+                        continue
+                    break
+                end += 1
+            current.append(script[i:end + 1])
+            i = end + 1
+            continue
+
+        if script.startswith("--", i) and (i + 2 >= length or script[i + 2] in " \t\r\n"):
+            newline = script.find("\n", i)
+            i = length if newline == -1 else newline
+            continue
+
+        if char == "#":
+            newline = script.find("\n", i)
+            i = length if newline == -1 else newline
+            continue
+
+        if script.startswith("/*", i):
+            end = script.find("*/", i + 2)
+            end = length if end == -1 else end + 2
+            if script.startswith("/*!", i):
+                # Versioned comments are executable MySQL syntax
+                current.append(script[i:end])
+            else:
+                current.append(" ")
+            i = end
+            continue
+
+        if script.startswith(delimiter, i):
+            statement = "".join(current).strip()
+            if statement:
+                statements.append(statement)
+            current = []
+            i += len(delimiter)
+            continue
+
+        current.append(char)
+        i += 1
+
+    statement = "".join(current).strip()
+    if statement:
+        statements.append(statement)
+    return statements
+
+
+def split_sql(script: str) -> List[str]:
+    """Split a SQL script into statements.
+
+    Understands quoted strings and identifiers, ``--``, ``#`` and ``/* */``
+    comments, and client-side ``DELIMITER`` lines (for trigger and procedure
+    bodies), which the server itself would reject.
+    """
+    statements: List[str] = []
+    delimiter = ";"
+    block: List[str] = []
+
+    for line in script.splitlines(keepends=True):
+        match = _DELIMITER_PATTERN.match(line)
+        if match:
+            statements.extend(_split_block("".join(block), delimiter))
+            block = []
+            delimiter = match.group(1)
+            continue
+        block.append(line)
+
+    statements.extend(_split_block("".join(block), delimiter))
+    return statements
+
+
+def discover_migrations(directory: Path = MIGRATIONS_DIR) -> List[Migration]:
+    """Return the migration files in apply order (by file name)."""
+    if not directory.exists():
+        return []
+
+    migrations = []
+    for path in sorted(directory.glob("*.sql")):
+        sql = path.read_text(encoding="utf-8")
+        migrations.append(Migration(
+            version=path.stem,
+            path=path,
+            sql=sql,
+            checksum=hashlib.sha256(sql.encode("utf-8")).hexdigest(),
+        ))
+    return migrations
+
+
+def ensure_migrations_table(conn) -> None:
+    """Create the schema_migrations bookkeeping table if needed."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version VARCHAR(255) NOT NULL PRIMARY KEY,
+                checksum CHAR(64) NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                execution_ms INT NOT NULL DEFAULT 0
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """)
+    finally:
+        cursor.close()
+
+
+def migrations_table_exists(conn) -> bool:
+    """Whether schema_migrations exists yet, checked without creating it."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "SELECT COUNT(*) FROM information_schema.tables "
+            "WHERE table_schema = DATABASE() AND table_name = 'schema_migrations'"
+        )
+        row = cursor.fetchone()
+        return bool(row and row[0])
+    finally:
+        cursor.close()
+
+
+def get_applied_migrations(conn) -> Dict[str, Dict]:
+    """Return recorded migrations keyed by version."""
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(
+            "SELECT version, checksum, applied_at, execution_ms FROM schema_migrations"
+        )
+        return {row["version"]: row for row in cursor.fetchall()}
+    finally:
+        cursor.close()
+
+
+def get_migration_status(conn, directory: Path = MIGRATIONS_DIR) -> List[MigrationStatus]:
+    """Compare the migration files with what schema_migrations has recorded.
+
+    Read-only: a database without schema_migrations has nothing applied.
+    """
+    applied = get_applied_migrations(conn) if migrations_table_exists(conn) else {}
+
+    statuses = []
+    for migration in discover_migrations(directory):
+        record = applied.get(migration.version)
+        if record is None:
+            statuses.append(MigrationStatus(migration.version, "pending"))
+            continue
+        state = "applied" if record["checksum"] == migration.checksum else "changed"
+        statuses.append(MigrationStatus(
+            migration.version,
+            state,
+            applied_at=str(record["applied_at"]),
+            execution_ms=record["execution_ms"],
+        ))
+    return statuses
+
+
+def apply_migration(conn, migration: Migration) -> int:
+    """Apply one migration and record it. Returns the execution time in ms."""
+    transactional = migration.transactional
+    started = time.perf_counter()
+    cursor = conn.cursor()
+
+    try:
+        if transactional:
+            conn.start_transaction()
+        for index, statement in enumerate(migration.statements, start=1):
+            try:
+                cursor.execute(statement)
+                if cursor.with_rows:
+                    cursor.fetchall()
+            except Exception as exc:
+                raise MigrationError(
+                    f"{migration.path.name}, statement {index}: {exc}"
+                ) from exc
+
+        execution_ms = int((time.perf_counter() - started) * 1000)
+        cursor.execute(
+            """INSERT INTO schema_migrations (version, checksum, execution_ms)
+               VALUES (%s, %s, %s)
+               ON DUPLICATE KEY UPDATE checksum = %s, execution_ms = %s, applied_at = CURRENT_TIMESTAMP""",
+            (migration.version, migration.checksum, execution_ms, migration.checksum, execution_ms),
+        )
+        if transactional:
+            conn.commit()
+        return execution_ms
+    except Exception:
+        if transactional:
+            conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def _acquire_lock(conn) -> None:
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT GET_LOCK(%s, %s)", (MIGRATION_LOCK_NAME, MIGRATION_LOCK_TIMEOUT))
+        row = cursor.fetchone()
+        if not row or row[0] != 1:
+            raise MigrationError("Timed out waiting for another process to finish migrating")
+    finally:
+        cursor.close()
+
+
+def _release_lock(conn) -> None:
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT RELEASE_LOCK(%s)", (MIGRATION_LOCK_NAME,))
+        cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def _pending_migrations(applied: Dict[str, Dict], directory: Path) -> List[Migration]:
+    """Return the files not yet recorded, warning about edited applied ones."""
+    pending = []
+    for migration in discover_migrations(directory):
+        record = applied.get(migration.version)
+        if record is None:
+            pending.append(migration)
+        elif record["checksum"] != migration.checksum:
+            print(
+                f"[Migrations] Warning: {migration.path.name} changed after it was applied; "
+                "add a new migration instead of editing it"
+            )
+    return pending
+
+
+def run_migrations(conn, directory: Path = MIGRATIONS_DIR, dry_run: bool = False) -> List[Migration]:
+    """Apply every pending migration in order.
+
+    Applied files whose checksum changed are reported but not re-run. With
+    ``dry_run`` nothing is written, not even the schema_migrations table,
+    and the pending migrations are returned.
+
+    Returns:
+        The migrations that were (or, in a dry run, would be) applied
+    """
+    if dry_run:
+        applied = get_applied_migrations(conn) if migrations_table_exists(conn) else {}
+        return _pending_migrations(applied, directory)
+
+    ensure_migrations_table(conn)
+    _acquire_lock(conn)
+    try:
+        # Read after taking the lock so a concurrent runner's work is seen
+        pending = _pending_migrations(get_applied_migrations(conn), directory)
+        for migration in pending:
+            execution_ms = apply_migration(conn, migration)
+            mode = "transaction" if migration.transactional else "autocommit DDL"
+            print(f"[Migrations] Applied {migration.path.name} in {execution_ms} ms ({mode})")
+        return pending
+    finally:
+        _release_lock(conn)
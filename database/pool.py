@@ -0,0 +1,241 @@
+"""Queueing, instrumented MySQL connection pool.
+
+``mysql.connector``'s own pool raises as soon as every connection is checked
+out, so a burst larger than the pool turned into 500s. This pool holds
+``EIGEN_DB_POOL_SIZE`` connections, opens up to ``EIGEN_DB_POOL_OVERFLOW``
+extra ones under load, and beyond that makes callers wait up to
+``EIGEN_DB_POOL_TIMEOUT`` seconds for a connection to come back. Idle
+connections older than ``EIGEN_DB_POOL_RECYCLE`` seconds are replaced, and
+with ``EIGEN_DB_POOL_PRE_PING`` each checkout pings first so connections the
+server dropped are never handed out.
+
+Helpers keep the usual ``conn.close()`` in their ``finally`` blocks: the
+connections handed out are proxies whose ``close`` returns them to the pool.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+import mysql.connector
+from mysql.connector import errors
+
+
+POOL_SIZE = int(os.getenv("EIGEN_DB_POOL_SIZE", "5"))
+POOL_OVERFLOW = int(os.getenv("EIGEN_DB_POOL_OVERFLOW", "5"))
+POOL_TIMEOUT = float(os.getenv("EIGEN_DB_POOL_TIMEOUT", "10"))
+POOL_RECYCLE = float(os.getenv("EIGEN_DB_POOL_RECYCLE", "3600"))
+POOL_PRE_PING = os.getenv("EIGEN_DB_POOL_PRE_PING", "1") != "0"
+
+
+class PoolTimeoutError(errors.PoolError):
+    """Raised when no connection becomes available within the checkout timeout."""
+
+
+class PooledConnection:
+    """Proxy for a pooled connection; ``close()`` returns it to the pool."""
+
+    def __init__(self, pool: "ConnectionPool", conn: Any, created_at: float) -> None:
+        self._pool = pool
+        self._conn = conn
+        self._created_at = created_at
+
+    def __getattr__(self, name: str) -> Any:
+        conn = self.__dict__.get("_conn")
+        if conn is None:
+            raise errors.OperationalError("Connection has been returned to the pool")
+        return getattr(conn, name)
+
+    def close(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            self._pool._release(conn, self._created_at)
+
+    def __enter__(self) -> "PooledConnection":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+class ConnectionPool:
+    """Thread-safe pool with overflow, queued checkout, recycling and pre-ping."""
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        size: int = POOL_SIZE,
+        overflow: int = POOL_OVERFLOW,
+        timeout: float = POOL_TIMEOUT,
+        recycle: float = POOL_RECYCLE,
+        pre_ping: bool = POOL_PRE_PING,
+    ) -> None:
+        self._connect = connect
+        self.size = max(1, size)
+        self.overflow = max(0, overflow)
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+
+        self._idle: Deque[Tuple[Any, float]] = deque()
+        self._open = 0  # Connections that exist or are being opened
+        self._in_use = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+        # Metrics
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._exhausted = 0
+        self._recycled = 0
+        self._ping_failures = 0
+        self._peak_in_use = 0
+
+    @property
+    def max_connections(self) -> int:
+        return self.size + self.overflow
+
+    def get_connection(self, timeout: Optional[float] = None) -> PooledConnection:
+        """Check out a connection, waiting up to ``timeout`` seconds if none is free."""
+        timeout = self.timeout if timeout is None else timeout
+        started = time.perf_counter()
+        deadline = started + timeout
+        waited = False
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise errors.PoolError("Connection pool is closed")
+                if self._idle:
+                    conn, created_at = self._idle.pop()
+                    self._in_use += 1
+                    break
+                if self._open < self.max_connections:
+                    # Reserve the slot, then connect outside the lock
+                    conn, created_at = None, 0.0
+                    self._open += 1
+                    self._in_use += 1
+                    break
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    self._exhausted += 1
+                    raise PoolTimeoutError(
+                        f"No database connection available within {timeout:.1f}s "
+                        f"({self._in_use} in use, max {self.max_connections})"
+                    )
+                waited = True
+                self._cond.wait(remaining)
+
+        try:
+            conn, created_at = self._prepare(conn, created_at)
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        wait = time.perf_counter() - started
+        with self._cond:
+            self._checkouts += 1
+            self._peak_in_use = max(self._peak_in_use, self._in_use)
+            if waited:
+                self._waits += 1
+            self._wait_total += wait
+            self._wait_max = max(self._wait_max, wait)
+        return PooledConnection(self, conn, created_at)
+
+    def _prepare(self, conn: Any, created_at: float) -> Tuple[Any, float]:
+        """Open, recycle or health-check a connection before handing it out."""
+        if conn is not None and self.recycle > 0 and time.monotonic() - created_at > self.recycle:
+            self._discard(conn)
+            conn = None
+            with self._cond:
+                self._recycled += 1
+        if conn is not None and self.pre_ping:
+            try:
+                conn.ping(reconnect=False)
+            except Exception:
+                self._discard(conn)
+                conn = None
+                with self._cond:
+                    self._ping_failures += 1
+        if conn is None:
+            conn = self._connect()
+            created_at = time.monotonic()
+        return conn, created_at
+
+    def _release(self, conn: Any, created_at: float) -> None:
+        keep = True
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except Exception:
+            keep = False
+
+        with self._cond:
+            self._in_use -= 1
+            # Overflow connections are closed once the core pool is full again
+            if keep and not self._closed and len(self._idle) < self.size:
+                self._idle.append((conn, created_at))
+                conn = None
+            else:
+                self._open -= 1
+            self._cond.notify()
+
+        if conn is not None:
+            self._discard(conn)
+
+    @staticmethod
+    def _discard(conn: Any) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def close(self) -> None:
+        """Close idle connections and refuse new checkouts.
+
+        Connections still checked out are closed when they are returned.
+        """
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return gauges and checkout timings."""
+        with self._cond:
+            checkouts = self._checkouts
+            return {
+                "size": self.size,
+                "max_overflow": self.overflow,
+                "open": self._open,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "overflow_in_use": max(0, self._open - self.size),
+                "peak_in_use": self._peak_in_use,
+                "checkouts": checkouts,
+                "waited_checkouts": self._waits,
+                "exhausted": self._exhausted,
+                "recycled": self._recycled,
+                "pre_ping_failures": self._ping_failures,
+                "checkout_wait_avg_ms": round(self._wait_total / checkouts * 1000, 3) if checkouts else 0.0,
+                "checkout_wait_max_ms": round(self._wait_max * 1000, 3),
+                "timeout_seconds": self.timeout,
+            }
+
+
+def create_pool(config: Dict[str, Any], **kwargs: Any) -> ConnectionPool:
+    """Build a pool of autocommit connections for ``config`` (mysql.connector.connect kwargs)."""
+    return ConnectionPool(lambda: mysql.connector.connect(autocommit=True, **config), **kwargs)
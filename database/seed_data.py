@@ -1,14 +1,25 @@
-"""Default data seeding utilities for the Eigen Coach database."""
+"""Default data seeding utilities for the Eigen Coach database.
+
+Seeding is explicit (``python database/init.py --seed`` or ``EIGEN_SEED``) and
+incremental: each seed file's SHA-256 is stored in ``seed_state`` and only
+files whose content changed are applied, as upserts that leave data the
+app has since written (learned skill levels, asked flags, new memory) alone.
+"""
 
 from __future__ import annotations
 
+import hashlib
 import json
 import os
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
 from mysql.connector import Error
 
+from database.bulk import bulk_insert
+from database.db_helpers import refresh_topic_stats, sync_question_topics
+from memory.similarity import content_hash
+
 
 SEEDS_DIR = Path(__file__).resolve().parent / "seeds"
 STUDENTS_FILE = SEEDS_DIR / "students.json"
@@ -46,8 +57,11 @@ def _clear_all_data(conn) -> None:
         cursor.execute("TRUNCATE TABLE student_memory")
         cursor.execute("TRUNCATE TABLE calendar_entries")
         cursor.execute("TRUNCATE TABLE skill_levels")
+        cursor.execute("TRUNCATE TABLE question_topics")
+        cursor.execute("TRUNCATE TABLE topic_stats")
         cursor.execute("TRUNCATE TABLE questions")
         cursor.execute("TRUNCATE TABLE students")
+        cursor.execute("TRUNCATE TABLE seed_state")
         cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
         print("[DatabaseSeeder] Cleared all data from tables")
     except Error as exc:
@@ -87,7 +101,7 @@ def _get_or_create_student_id(
         cursor.close()
 
 
-def _seed_students(conn) -> None:
+def _seed_students(conn) -> int:
     students = _load_json(STUDENTS_FILE)
     first = students[0] if students else {}
     student_id = _get_or_create_student_id(
@@ -96,137 +110,269 @@ def _seed_students(conn) -> None:
         first.get("exam_name") if isinstance(first, dict) else None,
     )
     print(f"[DatabaseSeeder] Ensured single student record (id={student_id})")
+    return 1
 
 
-def _seed_student_memory(conn) -> None:
+def _seed_student_memory(conn) -> int:
     memory_entries = _load_json(MEMORY_FILE)
     if not memory_entries:
-        return
-
-    insert_sql = "INSERT INTO student_memory (student_id, memory_entry) VALUES (%s, %s)"
+        return 0
 
     student_id = _get_or_create_student_id(conn)
     cursor = conn.cursor()
     try:
-        for entry in memory_entries:
-            memory_text = (
-                entry.get("memory_entry")
-                if isinstance(entry, dict)
-                else entry
-            )
-            if not memory_text:
-                continue
-            cursor.execute(insert_sql, (student_id, memory_text))
-        conn.commit()
-        print(f"[DatabaseSeeder] Seeded {len(memory_entries)} student memory entries")
-    except Error as exc:
-        print(f"[DatabaseSeeder] Failed to seed student memory: {exc}")
+        # student_memory has no natural key, so skip entries that already exist
+        cursor.execute(
+            "SELECT memory_entry FROM student_memory WHERE student_id = %s",
+            (student_id,),
+        )
+        existing = {row[0] for row in cursor.fetchall()}
     finally:
         cursor.close()
 
+    rows = []
+    for entry in memory_entries:
+        memory_text = (
+            entry.get("memory_entry")
+            if isinstance(entry, dict)
+            else entry
+        )
+        if not memory_text or memory_text in existing:
+            continue
+        existing.add(memory_text)
+        rows.append((student_id, memory_text, content_hash(memory_text)))
+
+    # Entries that restate an existing note hit uniq_student_memory_hash and are skipped
+    result = bulk_insert(
+        conn, "student_memory", ("student_id", "memory_entry", "content_hash"), rows, ignore=True
+    )
+    print(f"[DatabaseSeeder] Added {result.affected} of {len(memory_entries)} student memory entries")
+    return result.affected
+
 
-def _seed_calendar_entries(conn) -> None:
+def _seed_calendar_entries(conn) -> int:
     entries = _load_json(CALENDAR_FILE)
     if not entries:
-        return
-
-    insert_sql = (
-        "INSERT INTO calendar_entries (student_id, date, topics, n_questions) "
-        "VALUES (%s, %s, %s, %s)"
-    )
+        return 0
 
     student_id = _get_or_create_student_id(conn)
-    cursor = conn.cursor()
-    try:
-        for entry in entries:
-            date = entry.get("date")
-            if not date:
-                continue
-            topics_json = json.dumps(entry.get("topics", []))
-            cursor.execute(
-                insert_sql,
-                (
-                    student_id,
-                    date,
-                    topics_json,
-                    entry.get("n_questions", 1),
-                ),
-            )
-        conn.commit()
-        print(f"[DatabaseSeeder] Seeded {len(entries)} calendar entries")
-    except Error as exc:
-        print(f"[DatabaseSeeder] Failed to seed calendar entries: {exc}")
-    finally:
-        cursor.close()
+    rows = (
+        (
+            student_id,
+            entry.get("date"),
+            json.dumps(entry.get("topics", [])),
+            entry.get("n_questions", 1),
+        )
+        for entry in entries
+        if entry.get("date")
+    )
+    result = bulk_insert(
+        conn,
+        "calendar_entries",
+        ("student_id", "date", "topics", "n_questions"),
+        rows,
+        update_columns=("topics", "n_questions"),
+    )
+    print(f"[DatabaseSeeder] Upserted {result.rows} calendar entries")
+    return result.rows
 
 
-def _seed_skill_levels(conn) -> None:
+def _seed_skill_levels(conn) -> int:
     skills = _load_json(SKILL_LEVELS_FILE)
     if not skills:
-        return
-
-    insert_sql = "INSERT INTO skill_levels (student_id, topic, skill_level) VALUES (%s, %s, %s)"
+        return 0
 
     student_id = _get_or_create_student_id(conn)
-    cursor = conn.cursor()
-    try:
-        for entry in skills:
-            topic = entry.get("topic") if isinstance(entry, dict) else None
-            if not topic:
-                continue
-            cursor.execute(
-                insert_sql,
-                (student_id, topic, entry.get("skill_level", 0)),
-            )
-        conn.commit()
-        print(f"[DatabaseSeeder] Seeded {len(skills)} skill level rows")
-    except Error as exc:
-        print(f"[DatabaseSeeder] Failed to seed skill levels: {exc}")
-    finally:
-        cursor.close()
+    rows = (
+        (student_id, entry["topic"], entry.get("skill_level", 0))
+        for entry in skills
+        if isinstance(entry, dict) and entry.get("topic")
+    )
+    # Seeds are starting points only; never overwrite a level the finalizer has set
+    result = bulk_insert(
+        conn,
+        "skill_levels",
+        ("student_id", "topic", "skill_level"),
+        rows,
+        ignore=True,
+    )
+    print(f"[DatabaseSeeder] Added {result.affected} of {len(skills)} skill level rows")
+    return result.affected
+
+
+# uniq_question_prompt indexes this many leading characters, so two prompts
+# that share them are the same question to the upsert
+PROMPT_KEY_CHARS = 255
+QUESTION_COLUMNS = (
+    "question_prompt", "answer", "explanation", "difficulty",
+    "topic_tag1", "topic_tag2", "topic_tag3", "has_been_asked",
+)
+# has_been_asked is app state, so it is only set when a question is first inserted
+QUESTION_UPDATE_COLUMNS = (
+    "answer", "explanation", "difficulty", "topic_tag1", "topic_tag2", "topic_tag3",
+)
+
+
+def question_row(entry: Dict[str, Any]) -> tuple:
+    """Turn a question dict into a row in QUESTION_COLUMNS order."""
+    return (
+        entry.get("question_prompt"),
+        entry.get("answer"),
+        entry.get("explanation"),
+        entry.get("difficulty", "medium"),
+        entry.get("topic_tag1"),
+        entry.get("topic_tag2"),
+        entry.get("topic_tag3"),
+        1 if entry.get("has_been_asked") else 0,
+    )
 
 
-def _seed_questions(conn) -> None:
+def _escape_like(text: str) -> str:
+    return text.replace("!", "!!").replace("%", "!%").replace("_", "!_")
+
+
+def prompt_key_filter(prompts: List[str]) -> Tuple[str, List[str]]:
+    """WHERE clause matching the stored questions an upsert of ``prompts`` touched.
+
+    The upsert matches on uniq_question_prompt, i.e. the first
+    PROMPT_KEY_CHARS characters under the column's case-insensitive
+    collation. A shorter prompt therefore matches one stored prompt exactly.
+    A longer one matches the stored prompt sharing that prefix, whose text
+    may differ after it (the upsert does not rewrite question_prompt). Both
+    forms are seeks on the prefix index.
+    """
+    short = [prompt for prompt in prompts if len(prompt) < PROMPT_KEY_CHARS]
+    long = [prompt for prompt in prompts if len(prompt) >= PROMPT_KEY_CHARS]
+    clauses: List[str] = []
+    params: List[str] = []
+    if short:
+        clauses.append(f"question_prompt IN ({', '.join(['%s'] * len(short))})")
+        params.extend(short)
+    for prompt in long:
+        clauses.append("question_prompt LIKE %s ESCAPE '!'")
+        params.append(_escape_like(prompt[:PROMPT_KEY_CHARS]) + "%")
+    return " OR ".join(clauses) or "FALSE", params
+
+
+def question_chunk_syncer(touched_topics: Set[str]) -> Callable[[Any, list], None]:
+    """Build a bulk_insert callback that indexes each chunk of upserted questions.
+
+    Topic stats are not refreshed per chunk (that would re-aggregate the same
+    topics over and over); the touched topics are collected so the caller can
+    run refresh_topic_stats once when the load is done.
+    """
+
+    def sync_chunk(conn, chunk) -> None:
+        where, params = prompt_key_filter([row[0] for row in chunk])
+        cursor = conn.cursor()
+        try:
+            # Multi-row upserts do not report IDs, so look them up by the upsert's key
+            cursor.execute(f"SELECT id FROM questions WHERE {where}", params)
+            question_ids = [row[0] for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+        touched_topics.update(sync_question_topics(conn, question_ids, refresh_stats=False))
+
+    return sync_chunk
+
+
+def _seed_questions(conn) -> int:
     questions = _load_json(QUESTIONS_FILE)
     if not questions:
-        return
+        return 0
 
-    insert_sql = (
-        "INSERT INTO questions (question_prompt, answer, explanation, difficulty, "
-        "topic_tag1, topic_tag2, topic_tag3, has_been_asked) "
-        "VALUES (%s, %s, %s, %s, %s, %s, %s, %s)"
+    # Keyed on uniq_question_prompt
+    touched_topics: Set[str] = set()
+    result = bulk_insert(
+        conn,
+        "questions",
+        QUESTION_COLUMNS,
+        (question_row(entry) for entry in questions),
+        update_columns=QUESTION_UPDATE_COLUMNS,
+        on_chunk=question_chunk_syncer(touched_topics),
     )
+    refresh_topic_stats(conn, sorted(touched_topics))
+    conn.commit()
+    print(f"[DatabaseSeeder] Upserted {result.rows} default questions in {result.chunks} chunk(s)")
+    return result.rows
+
+
+# Apply order matters: the student row must exist before rows that reference it
+SEEDERS: List[Tuple[Path, Callable[[Any], int]]] = [
+    (STUDENTS_FILE, _seed_students),
+    (MEMORY_FILE, _seed_student_memory),
+    (CALENDAR_FILE, _seed_calendar_entries),
+    (SKILL_LEVELS_FILE, _seed_skill_levels),
+    (QUESTIONS_FILE, _seed_questions),
+]
+
 
+def _file_hash(file_path: Path) -> Optional[str]:
+    if not file_path.exists():
+        return None
+    return hashlib.sha256(file_path.read_bytes()).hexdigest()
+
+
+def _get_seed_hashes(conn) -> Dict[str, str]:
     cursor = conn.cursor()
     try:
-        for entry in questions:
-            payload = (
-                entry.get("question_prompt"),
-                entry.get("answer"),
-                entry.get("explanation"),
-                entry.get("difficulty", "medium"),
-                entry.get("topic_tag1"),
-                entry.get("topic_tag2"),
-                entry.get("topic_tag3"),
-                1 if entry.get("has_been_asked") else 0,
-            )
-            cursor.execute(insert_sql, payload)
-        conn.commit()
-        print(f"[DatabaseSeeder] Seeded {len(questions)} default questions")
-    except Error as exc:
-        print(f"[DatabaseSeeder] Failed to seed questions: {exc}")
+        cursor.execute("SELECT seed_file, content_hash FROM seed_state")
+        return dict(cursor.fetchall())
     finally:
         cursor.close()
 
 
-def run_seeders(conn) -> None:
-    """Run all available default data seeders."""
+def _record_seed(conn, seed_file: str, content_hash: str, row_count: int) -> None:
+    cursor = conn.cursor()
     try:
-        _clear_all_data(conn)
-        _seed_students(conn)
-        _seed_student_memory(conn)
-        _seed_calendar_entries(conn)
-        _seed_skill_levels(conn)
-        _seed_questions(conn)
-    except Error as exc:
-        print(f"[DatabaseSeeder] Error during seeding: {exc}")
\ No newline at end of file
+        cursor.execute(
+            """INSERT INTO seed_state (seed_file, content_hash, row_count)
+               VALUES (%s, %s, %s)
+               ON DUPLICATE KEY UPDATE content_hash = %s, row_count = %s""",
+            (seed_file, content_hash, row_count, content_hash, row_count),
+        )
+    finally:
+        cursor.close()
+
+
+def run_seeders(conn, force: bool = False) -> List[str]:
+    """Apply seed files that changed since they were last seeded.
+
+    Files are written in bulk_insert chunks that commit as they go; the
+    file's seed_state row is recorded last, so a file that fails partway is
+    re-applied (idempotently) on the next run.
+
+    Args:
+        conn: Database connection
+        force: Re-apply every seed file even if its hash is unchanged
+
+    Returns:
+        Names of the seed files that were applied
+    """
+    seeded_hashes = {} if force else _get_seed_hashes(conn)
+    applied = []
+
+    for file_path, seeder in SEEDERS:
+        content_hash = _file_hash(file_path)
+        if content_hash is None or seeded_hashes.get(file_path.name) == content_hash:
+            continue
+
+        try:
+            conn.start_transaction()
+            row_count = seeder(conn)
+            _record_seed(conn, file_path.name, content_hash, row_count)
+            conn.commit()
+            applied.append(file_path.name)
+        except Error as exc:
+            conn.rollback()
+            print(f"[DatabaseSeeder] Failed to seed {file_path.name}: {exc}")
+
+    if not applied:
+        print("[DatabaseSeeder] Seed files unchanged; nothing to seed")
+    return applied
+
+
+def reset_database(conn) -> List[str]:
+    """Delete all student and question data, then seed from scratch."""
+    _clear_all_data(conn)
+    return run_seeders(conn, force=True)
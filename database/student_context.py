@@ -0,0 +1,229 @@
+"""Cached student context (name, exam and memory) for the Eigen Coach agents.
+
+Every session start, initializer and finalizer call needs the same three
+pieces of student data. ``load_student_context`` fetches them in a single
+query and keeps the result in-process, one entry per student in an LRU of
+``EIGEN_STUDENT_CONTEXT_CACHE_SIZE`` students; ``add_student_memory`` writes
+through to the cache so the common path never touches the database.
+
+Requests that do not name a student fall back to the default student
+(``EIGEN_DEFAULT_STUDENT_ID``, or the lowest id), so single-learner
+deployments keep working unchanged.
+
+The agents do not get every note: ``to_student_data`` passes the memory
+through ``build_memory_window`` so prompts stay within a token budget as
+notes accumulate (see ``memory/compaction.py`` for how old notes are folded
+into a summary).
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from database.db import DatabaseManager
+from memory.window import build_memory_window
+
+
+# Upper bound on how stale the cache may get when memory is written by
+# another process (e.g. the subprocess MCP server). 0 disables expiry.
+STUDENT_CONTEXT_TTL = float(os.getenv("EIGEN_STUDENT_CONTEXT_TTL", "60"))
+# Students whose context is kept in memory; the least recently used go first
+STUDENT_CONTEXT_CACHE_SIZE = int(os.getenv("EIGEN_STUDENT_CONTEXT_CACHE_SIZE", "1000"))
+# Student used when a request does not name one; unset means the lowest id
+DEFAULT_STUDENT_ID = int(os.getenv("EIGEN_DEFAULT_STUDENT_ID", "0")) or None
+
+
+@dataclass
+class MemoryRecord:
+    """One ``student_memory`` row: a note, or the rolled-up summary."""
+
+    id: Optional[int]
+    text: str
+    kind: str = "note"
+    hits: int = 1
+    created_at: Optional[datetime] = None
+    last_seen_at: Optional[datetime] = None
+
+
+@dataclass
+class StudentContext:
+    """Student profile plus learning notes, as passed to the agents."""
+
+    student_id: Optional[int]
+    student_name: str
+    exam_name: str
+    memory: List[MemoryRecord] = field(default_factory=list)
+    loaded_at: float = field(default_factory=time.monotonic)
+
+    def to_student_data(self) -> Dict[str, Any]:
+        """Return the ``student_data`` dict the agents expect, with windowed memory."""
+        return {
+            "student_id": self.student_id,
+            "student_name": self.student_name,
+            "exam_name": self.exam_name,
+            "memory": build_memory_window(self.memory),
+        }
+
+
+_cache: "OrderedDict[int, StudentContext]" = OrderedDict()
+_lock = threading.Lock()
+_default_student_id: Optional[int] = DEFAULT_STUDENT_ID
+_hits = 0
+_misses = 0
+
+
+class UnknownStudent(LookupError):
+    """Raised when a student id has no ``students`` row."""
+
+
+def _fetch_student_context(student_id: int) -> Optional[StudentContext]:
+    conn = DatabaseManager.get_connection()
+    cursor = conn.cursor()
+
+    try:
+        # Both sides are primary/foreign key lookups on student_id
+        cursor.execute(
+            """SELECT s.id, s.student_name, s.exam_name,
+                      m.id, m.memory_entry, m.kind, m.hits, m.created_at, m.last_seen_at
+               FROM students s
+               LEFT JOIN student_memory m ON m.student_id = s.id
+               WHERE s.id = %s
+               ORDER BY m.created_at, m.id""",
+            (student_id,),
+        )
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+
+    if not rows:
+        return None
+
+    student_id, student_name, exam_name = rows[0][:3]
+    return StudentContext(
+        student_id=student_id,
+        student_name=student_name,
+        exam_name=exam_name,
+        memory=[MemoryRecord(*row[3:]) for row in rows if row[3] is not None],
+    )
+
+
+def default_student_id() -> Optional[int]:
+    """Return the student used when a request names none (cached after the first lookup)."""
+    global _default_student_id
+    if _default_student_id is not None:
+        return _default_student_id
+
+    with DatabaseManager.session() as session:
+        cursor = session.cursor()
+        cursor.execute("SELECT id FROM students ORDER BY id LIMIT 1")
+        row = cursor.fetchone()
+    if row is not None:
+        _default_student_id = row[0]
+    return _default_student_id
+
+
+def resolve_student_id(student_id: Optional[int]) -> int:
+    """Return ``student_id``, or the default student's id when it is None.
+
+    Raises:
+        UnknownStudent: if no student is given and the database has none
+    """
+    if student_id is not None:
+        return student_id
+    resolved = default_student_id()
+    if resolved is None:
+        raise UnknownStudent("No students in the database")
+    return resolved
+
+
+def get_cached_student_context(student_id: int) -> Optional[StudentContext]:
+    """Return the student's cached context if it is still fresh, without querying."""
+    global _hits
+    cached = _cache.get(student_id)
+    if cached is None:
+        return None
+    if STUDENT_CONTEXT_TTL and time.monotonic() - cached.loaded_at > STUDENT_CONTEXT_TTL:
+        return None
+    with _lock:
+        if student_id in _cache:
+            _cache.move_to_end(student_id)
+        _hits += 1
+    return cached
+
+
+def load_student_context(student_id: Optional[int] = None, refresh: bool = False) -> StudentContext:
+    """Return a student's context, querying the database only on a cache miss.
+
+    Raises:
+        UnknownStudent: if the student does not exist
+    """
+    global _misses
+    student_id = resolve_student_id(student_id)
+
+    if not refresh:
+        cached = get_cached_student_context(student_id)
+        if cached is not None:
+            return cached
+
+    context = _fetch_student_context(student_id)
+    if context is None:
+        raise UnknownStudent(f"Unknown student: {student_id}")
+    with _lock:
+        _misses += 1
+        _cache[student_id] = context
+        _cache.move_to_end(student_id)
+        while len(_cache) > STUDENT_CONTEXT_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return context
+
+
+def record_memory_entry(student_id: int, memory_entry: str, memory_id: Optional[int] = None) -> None:
+    """Append a freshly written memory entry to the student's cached context."""
+    now = datetime.now()
+    with _lock:
+        cached = _cache.get(student_id)
+        if cached is not None:
+            cached.memory.append(MemoryRecord(memory_id, memory_entry, created_at=now, last_seen_at=now))
+
+
+def record_memory_hit(student_id: int, memory_id: int, memory_entry: Optional[str] = None) -> None:
+    """Bump a cached note that a new entry was merged into, taking its text if given."""
+    now = datetime.now()
+    with _lock:
+        cached = _cache.get(student_id)
+        if cached is not None:
+            for record in cached.memory:
+                if record.id == memory_id:
+                    record.hits += 1
+                    record.last_seen_at = now
+                    if memory_entry is not None:
+                        record.text = memory_entry
+                    break
+
+
+def invalidate_student_context(student_id: Optional[int] = None) -> None:
+    """Drop a student's cached context (every student's when None)."""
+    global _default_student_id
+    with _lock:
+        if student_id is None:
+            _cache.clear()
+            _default_student_id = DEFAULT_STUDENT_ID
+        else:
+            _cache.pop(student_id, None)
+
+
+def student_context_stats() -> Dict[str, Any]:
+    with _lock:
+        return {
+            "cached": len(_cache),
+            "capacity": STUDENT_CONTEXT_CACHE_SIZE,
+            "hits": _hits,
+            "misses": _misses,
+        }
@@ -0,0 +1,175 @@
+"""Cached topic vocabulary and skill levels for the finalizer prompt.
+
+Every finalizer call needs the list of question-bank topics and the
+student's current skill levels, already formatted for the prompt.
+``load_topic_vocabulary`` keeps both in-process, prompt fragments included:
+the topic list is shared by every student, and skill levels are kept per
+student in an LRU of ``EIGEN_SKILL_CACHE_SIZE`` students. Question writes
+invalidate the topic list once they commit, and committed skill-level writes
+update the student's entry in place, so the finalizer's hot path does not
+touch the database. Skill topics are keyed in lowercase, matching the
+case-insensitive ``unique_student_topic`` key: "Algebra" and "algebra" are
+one row, so they are one cache entry too.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from database.db import DatabaseManager
+
+
+# Upper bound on staleness when questions or skills are written by another
+# process (e.g. the question importer CLI). 0 disables expiry.
+TOPIC_CACHE_TTL = float(os.getenv("EIGEN_TOPIC_CACHE_TTL", "300"))
+# Students whose skill levels are kept in memory
+SKILL_CACHE_SIZE = int(os.getenv("EIGEN_SKILL_CACHE_SIZE", "1000"))
+
+
+def _format_topics(topics: List[str]) -> str:
+    return ", ".join(topics) if topics else "general"
+
+
+def _format_skills(skills: Dict[str, int]) -> str:
+    return "\n".join(f"- {topic}: {level}" for topic, level in skills.items()) or "- No prior skills"
+
+
+@dataclass
+class TopicVocabulary:
+    """Question-bank topics and one student's skill levels, with their prompt fragments."""
+
+    topics: List[str]
+    skills: Dict[str, int]
+    topics_text: str = ""
+    skills_text: str = ""
+    loaded_at: float = field(default_factory=time.monotonic)
+
+    def __post_init__(self) -> None:
+        self.topics_text = self.topics_text or _format_topics(self.topics)
+        self.skills_text = self.skills_text or _format_skills(self.skills)
+
+
+# (topics, topics_text, loaded_at)
+_topics: Optional[Tuple[List[str], str, float]] = None
+# student_id -> (skills, skills_text, loaded_at)
+_skills: "OrderedDict[int, Tuple[Dict[str, int], str, float]]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def _fresh(loaded_at: float) -> bool:
+    return not TOPIC_CACHE_TTL or time.monotonic() - loaded_at <= TOPIC_CACHE_TTL
+
+
+def _fetch_topics(cursor) -> List[str]:
+    cursor.execute("SELECT topic FROM topic_stats WHERE question_count > 0 ORDER BY topic")
+    return [row[0] for row in cursor.fetchall() if row[0]]
+
+
+def _fetch_skills(cursor, student_id: int) -> Dict[str, int]:
+    # Reads unique_student_topic (student_id, topic) in index order
+    cursor.execute(
+        "SELECT topic, skill_level FROM skill_levels WHERE student_id = %s ORDER BY topic",
+        (student_id,),
+    )
+    return {topic.lower(): level for topic, level in cursor.fetchall()}
+
+
+def _store_skills(student_id: int, skills: Dict[str, int], loaded_at: float) -> None:
+    """Cache a student's skills; the caller holds ``_lock``."""
+    _skills[student_id] = (skills, _format_skills(skills), loaded_at)
+    _skills.move_to_end(student_id)
+    while len(_skills) > SKILL_CACHE_SIZE:
+        _skills.popitem(last=False)
+
+
+def get_cached_topic_vocabulary(student_id: int) -> Optional[TopicVocabulary]:
+    """Return the student's cached vocabulary if it is still fresh, without querying."""
+    topics, skills = _topics, _skills.get(student_id)
+    if topics is None or skills is None or not _fresh(topics[2]) or not _fresh(skills[2]):
+        return None
+    with _lock:
+        if student_id in _skills:
+            _skills.move_to_end(student_id)
+    return TopicVocabulary(
+        topics=topics[0],
+        skills=skills[0],
+        topics_text=topics[1],
+        skills_text=skills[1],
+        loaded_at=min(topics[2], skills[2]),
+    )
+
+
+def load_topic_vocabulary(student_id: int, refresh: bool = False) -> TopicVocabulary:
+    """Return the topic vocabulary for a student, querying only what is not cached."""
+    global _topics
+
+    if not refresh:
+        cached = get_cached_topic_vocabulary(student_id)
+        if cached is not None:
+            return cached
+
+    topics = None if refresh else _topics
+    skills = None if refresh else _skills.get(student_id)
+    topics = topics if topics is not None and _fresh(topics[2]) else None
+    skills = skills if skills is not None and _fresh(skills[2]) else None
+
+    now = time.monotonic()
+    # Both reads share one connection checkout
+    with DatabaseManager.session() as session:
+        cursor = session.cursor()
+        topic_list = _fetch_topics(cursor) if topics is None else None
+        skill_levels = _fetch_skills(cursor, student_id) if skills is None else None
+
+    with _lock:
+        if topic_list is not None:
+            topics = _topics = (topic_list, _format_topics(topic_list), now)
+        if skill_levels is not None:
+            _store_skills(student_id, skill_levels, now)
+            skills = _skills[student_id]
+
+    return TopicVocabulary(
+        topics=topics[0],
+        skills=skills[0],
+        topics_text=topics[1],
+        skills_text=skills[1],
+        loaded_at=min(topics[2], skills[2]),
+    )
+
+
+def record_skill_levels(student_id: int, skill_levels: Dict[str, int]) -> None:
+    """Write freshly stored skill levels through to the student's cached entry."""
+    with _lock:
+        cached = _skills.get(student_id)
+        if cached is None:
+            return
+        skills = dict(cached[0])
+        skills.update((topic.lower(), level) for topic, level in skill_levels.items())
+        # Replace rather than mutate so readers never see half an update
+        _store_skills(student_id, dict(sorted(skills.items())), cached[2])
+
+
+def invalidate_topic_vocabulary(student_id: Optional[int] = None) -> None:
+    """Drop the cached topic list, or one student's cached skill levels.
+
+    With no ``student_id`` everything is dropped, so the next load
+    re-queries the database.
+    """
+    global _topics
+    with _lock:
+        if student_id is None:
+            _topics = None
+            _skills.clear()
+        else:
+            _skills.pop(student_id, None)
+
+
+def invalidate_topic_list() -> None:
+    """Drop only the cached topic list, keeping every student's skill levels."""
+    global _topics
+    with _lock:
+        _topics = None
@@ -7,6 +7,7 @@ from datetime import datetime
 import httpx
 
 PAYLOAD = {
+    "student_id": 1,
     "student_data": {
         "student_name": "Alice",
         "exam_name": "SAT Math",
@@ -19,6 +20,9 @@ PAYLOAD = {
 }
 
 
+POLL_INTERVAL = 1.0
+
+
 async def main() -> None:
     async with httpx.AsyncClient(timeout=None) as client:
         response = await client.post(
@@ -26,8 +30,19 @@ async def main() -> None:
             json=PAYLOAD,
         )
         response.raise_for_status()
+        job = response.json()
+        timestamp = datetime.now().strftime("%H:%M:%S")
+        print(f"[{timestamp}] queued -> {job}", flush=True)
+
+        # The evaluation runs in the background; poll until it finishes
+        while job["status"] not in ("done", "failed"):
+            await asyncio.sleep(POLL_INTERVAL)
+            response = await client.get(f"http://localhost:8000/finalizer/{job['job_id']}")
+            response.raise_for_status()
+            job = response.json()
+
         timestamp = datetime.now().strftime("%H:%M:%S")
-        print(f"[{timestamp}] response -> {response.json()}", flush=True)
+        print(f"[{timestamp}] response -> {job}", flush=True)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,243 @@
+"""
+Content-addressed image store for chat attachments.
+
+``POST /images`` streams an upload to disk under its SHA-256, rejecting
+anything over ``EIGEN_IMAGE_MAX_BYTES`` or not a JPEG/PNG/GIF/WebP. Images
+larger than ``EIGEN_IMAGE_MAX_DIMENSION`` on their long edge are downscaled
+when Pillow is installed. Chat requests then reference the returned
+``image_id``; the base64 content block sent to Claude is built once and kept
+in an LRU cache, so repeated turns about the same image neither re-read nor
+re-encode it. Identical uploads share one file.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import hashlib
+import io
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    from PIL import Image
+except ImportError:  # Downscaling is skipped without Pillow
+    Image = None
+
+
+IMAGE_DIR = Path(os.getenv(
+    "EIGEN_IMAGE_DIR",
+    str(Path(__file__).resolve().parent / "tmp" / "images"),
+))
+IMAGE_MAX_BYTES = int(os.getenv("EIGEN_IMAGE_MAX_BYTES", str(10 * 1024 * 1024)))
+# Long-edge limit; larger images cost more tokens without helping the model
+IMAGE_MAX_DIMENSION = int(os.getenv("EIGEN_IMAGE_MAX_DIMENSION", "1568"))
+IMAGE_CACHE_SIZE = int(os.getenv("EIGEN_IMAGE_CACHE_SIZE", "64"))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Media type by file signature; extension used for the stored file
+_SIGNATURES: Tuple[Tuple[bytes, str, str], ...] = (
+    (b"\xff\xd8\xff", "image/jpeg", ".jpg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png", ".png"),
+    (b"GIF87a", "image/gif", ".gif"),
+    (b"GIF89a", "image/gif", ".gif"),
+)
+_EXTENSIONS = {".jpg": "image/jpeg", ".png": "image/png", ".gif": "image/gif", ".webp": "image/webp"}
+_PIL_FORMATS = {"image/jpeg": "JPEG", "image/png": "PNG", "image/webp": "WEBP"}
+_IMAGE_ID = re.compile(r"^[0-9a-f]{64}$")
+
+
+class ImageError(ValueError):
+    """An upload that cannot be stored, or an unknown image id."""
+
+
+class ImageTooLarge(ImageError):
+    """Raised when an upload exceeds EIGEN_IMAGE_MAX_BYTES."""
+
+
+@dataclass
+class StoredImage:
+    """An image in the store."""
+
+    image_id: str
+    media_type: str
+    size: int
+    width: Optional[int] = None
+    height: Optional[int] = None
+    downscaled: bool = False
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "image_id": self.image_id,
+            "media_type": self.media_type,
+            "size": self.size,
+            "width": self.width,
+            "height": self.height,
+            "downscaled": self.downscaled,
+        }
+
+
+def detect_media_type(header: bytes) -> Tuple[str, str]:
+    """Return (media type, extension) from the first bytes of a file.
+
+    Raises:
+        ImageError: if the bytes are not a supported image format
+    """
+    for signature, media_type, extension in _SIGNATURES:
+        if header.startswith(signature):
+            return media_type, extension
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "image/webp", ".webp"
+    raise ImageError("Unsupported image type; upload a JPEG, PNG, GIF or WebP file")
+
+
+def _image_path(image_id: str) -> Optional[Path]:
+    if not _IMAGE_ID.match(image_id):
+        raise ImageError(f"Invalid image id: {image_id!r}")
+    for extension in _EXTENSIONS:
+        path = IMAGE_DIR / f"{image_id}{extension}"
+        if path.exists():
+            return path
+    return None
+
+
+def _downscale(path: Path, media_type: str) -> Tuple[Optional[int], Optional[int], bool]:
+    """Shrink the image at ``path`` in place to IMAGE_MAX_DIMENSION; returns (width, height, changed)."""
+    if Image is None:
+        return None, None, False
+    with Image.open(path) as image:
+        width, height = image.size
+        # Animated GIFs would lose their frames; leave them alone
+        if max(width, height) <= IMAGE_MAX_DIMENSION or media_type not in _PIL_FORMATS:
+            return width, height, False
+        image.thumbnail((IMAGE_MAX_DIMENSION, IMAGE_MAX_DIMENSION))
+        buffer = io.BytesIO()
+        image.save(buffer, format=_PIL_FORMATS[media_type], optimize=True)
+        width, height = image.size
+    path.write_bytes(buffer.getvalue())
+    return width, height, True
+
+
+def _finish_upload(temp_path: Path, image_id: str, header: bytes) -> StoredImage:
+    """Identify, downscale and move a fully written upload into place."""
+    media_type, extension = detect_media_type(header)
+    existing = _image_path(image_id)
+    if existing is not None:
+        temp_path.unlink(missing_ok=True)
+        return describe_image(image_id)
+
+    try:
+        width, height, downscaled = _downscale(temp_path, media_type)
+    except Exception as exc:
+        raise ImageError(f"Could not read image: {exc}") from exc
+    final_path = IMAGE_DIR / f"{image_id}{extension}"
+    os.replace(temp_path, final_path)
+    return StoredImage(image_id, media_type, final_path.stat().st_size, width, height, downscaled)
+
+
+async def save_upload(upload: Any) -> StoredImage:
+    """Stream an ``UploadFile`` into the store and return its entry.
+
+    Raises:
+        ImageTooLarge: if the upload exceeds IMAGE_MAX_BYTES
+        ImageError: if it is not a supported image
+    """
+    IMAGE_DIR.mkdir(parents=True, exist_ok=True)
+    digest = hashlib.sha256()
+    header = b""
+    size = 0
+    handle, temp_name = tempfile.mkstemp(dir=IMAGE_DIR, suffix=".upload")
+    temp_path = Path(temp_name)
+    try:
+        with os.fdopen(handle, "wb") as temp_file:
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > IMAGE_MAX_BYTES:
+                    raise ImageTooLarge(f"Image is larger than {IMAGE_MAX_BYTES} bytes")
+                if len(header) < 16:
+                    header += chunk[:16 - len(header)]
+                digest.update(chunk)
+                temp_file.write(chunk)
+        if not size:
+            raise ImageError("Empty upload")
+        # Decoding and resizing are CPU-bound; keep them off the event loop
+        return await asyncio.to_thread(_finish_upload, temp_path, digest.hexdigest(), header)
+    finally:
+        temp_path.unlink(missing_ok=True)
+
+
+def describe_image(image_id: str) -> StoredImage:
+    """Return the store entry for ``image_id``.
+
+    Raises:
+        ImageError: if the id is malformed or unknown
+    """
+    path = _image_path(image_id)
+    if path is None:
+        raise ImageError(f"Unknown image: {image_id}")
+    width = height = None
+    if Image is not None:
+        with Image.open(path) as image:
+            width, height = image.size
+    return StoredImage(image_id, _EXTENSIONS[path.suffix], path.stat().st_size, width, height)
+
+
+_payloads: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_payload_lock = threading.Lock()
+_payload_hits = 0
+_payload_misses = 0
+
+
+def load_image_block(image_id: str) -> Dict[str, Any]:
+    """Return the Claude ``image`` content block for a stored image, LRU-cached.
+
+    Raises:
+        ImageError: if the id is malformed or unknown
+    """
+    global _payload_hits, _payload_misses
+    with _payload_lock:
+        block = _payloads.get(image_id)
+        if block is not None:
+            _payloads.move_to_end(image_id)
+            _payload_hits += 1
+            return block
+
+    path = _image_path(image_id)
+    if path is None:
+        raise ImageError(f"Unknown image: {image_id}")
+    block = {
+        "type": "image",
+        "source": {
+            "type": "base64",
+            "media_type": _EXTENSIONS[path.suffix],
+            "data": base64.standard_b64encode(path.read_bytes()).decode("ascii"),
+        },
+    }
+
+    with _payload_lock:
+        _payload_misses += 1
+        _payloads[image_id] = block
+        _payloads.move_to_end(image_id)
+        while len(_payloads) > IMAGE_CACHE_SIZE:
+            _payloads.popitem(last=False)
+    return block
+
+
+def image_cache_stats() -> Dict[str, Any]:
+    with _payload_lock:
+        return {
+            "cached": len(_payloads),
+            "capacity": IMAGE_CACHE_SIZE,
+            "hits": _payload_hits,
+            "misses": _payload_misses,
+            "downscaling": Image is not None,
+        }
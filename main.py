@@ -4,7 +4,11 @@ Initializes database and exposes FastAPI endpoints.
 """
 
 from api import app as api_app
+from agents.chat_manager import close_all_sessions, start_session_reaper, tutor_client_pool
+from agents.finalizer_queue import finalizer_queue
 from database.db import DatabaseManager
+from database.db_async import shutdown_executor
+from memory.compaction import start_memory_compactor, stop_memory_compactor
 
 # Expose FastAPI app for: python -m uvicorn main:app --reload
 app = api_app
@@ -20,6 +24,12 @@ async def on_startup():
         print("\n[Startup] Initializing database connection pool...")
         DatabaseManager.initialize()
         print("[Startup] ✓ Database initialized and ready")
+        await tutor_client_pool.start()
+        print("[Startup] ✓ Tutor client pool warming up")
+        await start_session_reaper()
+        await start_memory_compactor()
+        await finalizer_queue.start()
+        print("[Startup] ✓ Finalizer queue started")
         print("[Startup] ✓ API endpoints available")
         print("\n" + "=" * 60)
         print("Server Ready!")
@@ -35,6 +45,11 @@ async def on_startup():
 async def on_shutdown():
     """Close database connections when server shuts down."""
     try:
+        await stop_memory_compactor()
+        await finalizer_queue.close()
+        await close_all_sessions()
+        await tutor_client_pool.close()
+        shutdown_executor()
         DatabaseManager.close_all()
         print("\n[Shutdown] Database connections closed.")
     except Exception as e:
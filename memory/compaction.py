@@ -0,0 +1,337 @@
+"""
+Student memory compaction.
+
+The tutor writes a memory note whenever it notices something, so
+``student_memory`` grows without bound and fills up with restatements of the
+same observation. Compaction, run in the background every
+``EIGEN_MEMORY_COMPACT_INTERVAL`` seconds:
+
+1. merges near-identical notes into the newest one, summing their ``hits``
+   (how often the observation was made) and keeping the latest
+   ``last_seen_at``;
+2. keeps the newest ``EIGEN_MEMORY_KEEP_NOTES`` notes as they are and rolls
+   older ones into a single ``kind = 'summary'`` row of one line per
+   observation, most-noted first, capped at ``EIGEN_MEMORY_SUMMARY_CHARS``.
+   Observations that do not fit under the cap stay (or go back to being)
+   regular notes; compaction never deletes an observation outright.
+
+The summary is extractive (the notes' own text, with their counts) so it is
+deterministic and needs no model call.
+
+Usage:
+    python -m memory.compaction              # compact every student once
+    python -m memory.compaction --dry-run    # show what would change
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import re
+import sys
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, List, NamedTuple, Optional, Sequence, Tuple
+
+# Allow running as a script from the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database.db import DatabaseManager
+from database.db_async import run_sync
+from database.db_helpers import apply_memory_compaction, get_memory_records, get_memory_student_ids
+from database.student_context import MemoryRecord, invalidate_student_context
+from memory.similarity import DUPLICATE_THRESHOLD, is_near_duplicate
+
+
+MEMORY_KEEP_NOTES = int(os.getenv("EIGEN_MEMORY_KEEP_NOTES", "30"))
+MEMORY_SUMMARY_CHARS = int(os.getenv("EIGEN_MEMORY_SUMMARY_CHARS", "2000"))
+MEMORY_COMPACT_INTERVAL = float(os.getenv("EIGEN_MEMORY_COMPACT_INTERVAL", "600"))
+
+# Only one process compacts at a time; others skip the round
+_LOCK_NAME = "eigen_memory_compaction"
+_SUMMARY_LINE = re.compile(r"^- (?P<text>.*?)(?: \(noted (?P<hits>\d+) times\))?$")
+
+_compactor_task: Optional[asyncio.Task] = None
+
+
+@dataclass
+class CompactionPlan:
+    """Changes compaction would make to one student's memory."""
+
+    student_id: int
+    # (id, hits, last_seen_at) for notes that absorbed near-duplicates
+    merged: List[Tuple[int, int, Any]] = field(default_factory=list)
+    delete_ids: List[int] = field(default_factory=list)
+    # (text, hits, last_seen_at) for summary lines that no longer fit under
+    # the character cap and are written back as notes
+    restored: List[Tuple[str, int, Any]] = field(default_factory=list)
+    summary: Optional[str] = None
+    summary_id: Optional[int] = None
+    duplicates: int = 0
+    rolled_up: int = 0
+    # Observations kept as notes because the summary is full
+    overflow: int = 0
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.merged or self.delete_ids or self.restored or self.summary is not None)
+
+    def __str__(self) -> str:
+        return (
+            f"student {self.student_id}: {self.duplicates} duplicate(s) merged, "
+            f"{self.rolled_up} note(s) rolled into the summary, "
+            f"{self.overflow} kept as notes for lack of summary space"
+        )
+
+
+class SummaryItem(NamedTuple):
+    """One summary line, with the rolled-up notes it came from (newest first)."""
+
+    text: str
+    hits: int
+    notes: Tuple[MemoryRecord, ...] = ()
+
+
+def _seen_at(record: MemoryRecord) -> datetime:
+    return record.last_seen_at or record.created_at or datetime.min
+
+
+def parse_summary(text: str) -> List[Tuple[str, int]]:
+    """Split a summary record back into (observation, hits) items."""
+    items = []
+    for line in text.splitlines():
+        match = _SUMMARY_LINE.match(line.strip())
+        if match and match.group("text"):
+            items.append((match.group("text"), int(match.group("hits") or 1)))
+    return items
+
+
+def format_summary(items: Sequence[SummaryItem], max_chars: int) -> Tuple[str, List[SummaryItem]]:
+    """Render summary items, most-noted first, within ``max_chars``.
+
+    Returns:
+        (summary text, items that did not fit, most-noted first)
+    """
+    ranked = sorted(items, key=lambda item: -item.hits)
+    lines: List[str] = []
+    size = 0
+    for item in ranked:
+        line = f"- {item.text}" + (f" (noted {item.hits} times)" if item.hits > 1 else "")
+        if lines and size + len(line) + 1 > max_chars:
+            break
+        lines.append(line)
+        size += len(line) + 1
+    return "\n".join(lines), ranked[len(lines):]
+
+
+def _merge_items(items: List[SummaryItem], new_items: Sequence[SummaryItem], threshold: float) -> List[SummaryItem]:
+    """Fold ``new_items`` into ``items``; a near-duplicate adds its hits.
+
+    ``new_items`` come newest first, so the first rolled-up note merged into a
+    line sets its wording and older ones only add to its count.
+    """
+    merged = list(items)
+    for new in new_items:
+        for index, existing in enumerate(merged):
+            if is_near_duplicate(new.text, existing.text, threshold):
+                text = existing.text if existing.notes else new.text
+                merged[index] = SummaryItem(text, existing.hits + new.hits, existing.notes + new.notes)
+                break
+        else:
+            merged.append(new)
+    return merged
+
+
+def plan_compaction(
+    student_id: int,
+    records: Sequence[MemoryRecord],
+    keep_notes: int = MEMORY_KEEP_NOTES,
+    summary_chars: int = MEMORY_SUMMARY_CHARS,
+    threshold: float = DUPLICATE_THRESHOLD,
+) -> CompactionPlan:
+    """Work out how to compact one student's memory, without touching the database."""
+    plan = CompactionPlan(student_id)
+    summaries = [record for record in records if record.kind == "summary"]
+    notes = sorted((record for record in records if record.kind != "summary"), key=_seen_at, reverse=True)
+
+    # 1. Near-duplicate clusters, newest note first; the newest wording survives.
+    # is_near_duplicate never groups notes that differ in a negation, polarity
+    # word or number, so a cluster only holds restatements
+    clusters: List[List[MemoryRecord]] = []
+    for note in notes:
+        for cluster in clusters:
+            if is_near_duplicate(note.text, cluster[0].text, threshold):
+                cluster.append(note)
+                break
+        else:
+            clusters.append([note])
+
+    survivors: List[MemoryRecord] = []
+    for cluster in clusters:
+        head = cluster[0]
+        if len(cluster) > 1:
+            head = MemoryRecord(
+                id=head.id,
+                text=head.text,
+                kind=head.kind,
+                hits=sum(max(note.hits, 1) for note in cluster),
+                created_at=min(note.created_at or _seen_at(note) for note in cluster),
+                last_seen_at=max(_seen_at(note) for note in cluster),
+            )
+            plan.merged.append((head.id, head.hits, head.last_seen_at))
+            plan.delete_ids.extend(note.id for note in cluster[1:])
+            plan.duplicates += len(cluster) - 1
+        survivors.append(head)
+
+    # 2. Roll everything past the newest keep_notes into the summary
+    survivors.sort(key=_seen_at, reverse=True)
+    rolled = survivors[max(keep_notes, 0):]
+    if rolled or len(summaries) > 1:
+        rolled_ids = {note.id for note in rolled}
+        merged_ids = {entry[0] for entry in plan.merged}
+        plan.merged = [entry for entry in plan.merged if entry[0] not in rolled_ids]
+        plan.delete_ids.extend(note.id for note in rolled)
+
+        items: List[SummaryItem] = []
+        for summary in summaries:
+            items = _merge_items(items, [SummaryItem(*item) for item in parse_summary(summary.text)], threshold)
+        # Newest first, so a rolled note's wording replaces an older summary line
+        items = _merge_items(items, [SummaryItem(note.text, max(note.hits, 1), (note,)) for note in rolled], threshold)
+        summary_text, overflow = format_summary(items, summary_chars)
+
+        # What does not fit stays a note: the newest rolled note of the line
+        # is kept with the line's count, or the line is written back as a note
+        delete_ids = set(plan.delete_ids)
+        summary_seen_at = min((_seen_at(summary) for summary in summaries), default=None)
+        for item in overflow:
+            if item.notes:
+                keeper = item.notes[0]
+                delete_ids.discard(keeper.id)
+                if item.hits != keeper.hits or keeper.id in merged_ids:
+                    plan.merged.append((keeper.id, item.hits, keeper.last_seen_at))
+            else:
+                plan.restored.append((item.text, item.hits, summary_seen_at))
+        plan.delete_ids = [memory_id for memory_id in plan.delete_ids if memory_id in delete_ids]
+        plan.rolled_up = len(rolled) - sum(1 for item in overflow if item.notes)
+        plan.overflow = len(overflow)
+
+        if len(summaries) == 1 and summaries[0].text == summary_text:
+            plan.summary_id = summaries[0].id
+        else:
+            plan.summary = summary_text
+            if summaries:
+                plan.summary_id = summaries[0].id
+                plan.delete_ids.extend(summary.id for summary in summaries[1:])
+
+    return plan
+
+
+def _load_records(student_id: int, session: Any) -> List[MemoryRecord]:
+    return [
+        MemoryRecord(
+            id=row["id"],
+            text=row["memory_entry"],
+            kind=row["kind"],
+            hits=row["hits"],
+            created_at=row["created_at"],
+            last_seen_at=row["last_seen_at"],
+        )
+        for row in get_memory_records(student_id, session=session)
+    ]
+
+
+def compact_student_memory(student_id: Optional[int] = None, dry_run: bool = False) -> List[CompactionPlan]:
+    """Compact one student's memory, or every student's when ``student_id`` is None.
+
+    Returns:
+        The plans that changed something (or would have, with ``dry_run``)
+    """
+    plans: List[CompactionPlan] = []
+    with DatabaseManager.session() as session:
+        cursor = session.cursor()
+        cursor.execute("SELECT GET_LOCK(%s, 0)", (_LOCK_NAME,))
+        if cursor.fetchone()[0] != 1:
+            print("[MemoryCompaction] Another process is compacting; skipping this round")
+            return plans
+        try:
+            student_ids = [student_id] if student_id is not None else get_memory_student_ids(session=session)
+            for current in student_ids:
+                session.begin()
+                plan = plan_compaction(current, _load_records(current, session))
+                if plan.changed and not dry_run:
+                    apply_memory_compaction(
+                        current,
+                        plan.merged,
+                        plan.delete_ids,
+                        plan.summary,
+                        plan.summary_id,
+                        restored=plan.restored,
+                        session=session,
+                    )
+                session.commit()
+                if plan.changed:
+                    if not dry_run:
+                        # Right away, so no request reads notes this commit deleted
+                        invalidate_student_context(current)
+                    plans.append(plan)
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (_LOCK_NAME,))
+            cursor.fetchall()
+
+    return plans
+
+
+async def _compact_forever() -> None:
+    while True:
+        await asyncio.sleep(MEMORY_COMPACT_INTERVAL)
+        try:
+            plans = await run_sync(compact_student_memory)
+        except Exception as exc:
+            print(f"[MemoryCompaction] Error compacting memory: {exc}")
+            continue
+        for plan in plans:
+            print(f"[MemoryCompaction] Compacted {plan}")
+
+
+async def start_memory_compactor() -> None:
+    """Start the background task that compacts student memory."""
+    global _compactor_task
+    if _compactor_task is None and MEMORY_COMPACT_INTERVAL > 0:
+        _compactor_task = asyncio.create_task(_compact_forever())
+
+
+async def stop_memory_compactor() -> None:
+    """Stop the background compaction task."""
+    global _compactor_task
+    if _compactor_task is not None:
+        _compactor_task.cancel()
+        try:
+            await _compactor_task
+        except asyncio.CancelledError:
+            pass
+        _compactor_task = None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Merge duplicate memory notes and roll old ones into a summary.")
+    parser.add_argument("--student", type=int, help="only compact this student id")
+    parser.add_argument("--dry-run", action="store_true", help="report changes without writing them")
+    args = parser.parse_args(argv)
+
+    try:
+        plans = compact_student_memory(args.student, dry_run=args.dry_run)
+    finally:
+        DatabaseManager.close_all()
+
+    verb = "Would compact" if args.dry_run else "Compacted"
+    for plan in plans:
+        print(f"[MemoryCompaction] {verb} {plan}")
+    if not plans:
+        print("[MemoryCompaction] Nothing to compact")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,7 +4,8 @@ Provides tools for accessing student memory, calendar, and skill levels.
 """
 
 from claude_agent_sdk import tool, create_sdk_mcp_server
-from typing import Any
+from typing import Any, Optional
+import os
 import sys
 import logging
 import json
@@ -12,13 +13,14 @@ import json
 # Add parent directory to path for imports
 sys.path.insert(0, '/Users/joe/repostories/calhacks/backend')
 
-from database.db_helpers import (
-    get_student_memory,
+from database.db_async import (
     add_student_memory,
     get_calendar_entry,
     get_skill_levels,
     set_skill_level,
 )
+from database.db_mcp import StudentBinding, bind_student_tools, student_id_arg
+from tracing import traced
 
 # Configure logging
 log = logging.getLogger("memory_mcp")
@@ -30,14 +32,14 @@ logging.basicConfig(
 
 
 # Helper functions for direct data access
-def get_skill_level_pairs_helper() -> list:
+async def get_skill_level_pairs_helper(student_id: int) -> list:
     """Helper to get skill level pairs for a student.
     
     Returns:
         List of (topic, skill_level) tuples
     """
     try:
-        return get_skill_levels()
+        return await get_skill_levels(student_id)
     except Exception as e:
         log.error(f"Error in get_skill_level_pairs_helper: {e}")
         return []
@@ -49,10 +51,11 @@ def get_skill_level_pairs_helper() -> list:
     "Get topic-skill level pairs for the student",
     {}
 )
+@traced("mcp_tool", "get_skill_level_pairs")
 async def get_skill_level_pairs_tool(args: dict[str, Any]) -> dict[str, Any]:
     """Get skill level pairs for a student."""
     try:
-        pairs = get_skill_level_pairs_helper()
+        pairs = await get_skill_level_pairs_helper(student_id_arg(args))
         
         if not pairs:
             text = "No skill levels found."
@@ -68,15 +71,16 @@ async def get_skill_level_pairs_tool(args: dict[str, Any]) -> dict[str, Any]:
 
 @tool(
     "get_topics_by_date",
-    "Get topics and question count for a specific date",
+    "Get the student's scheduled topics and question count for a specific date",
     {"date": str}
 )
+@traced("mcp_tool", "get_topics_by_date")
 async def get_topics_by_date_tool(args: dict[str, Any]) -> dict[str, Any]:
     """Get calendar entry for a date."""
     date = args.get("date", "")
     
     try:
-        entry = get_calendar_entry(date)
+        entry = await get_calendar_entry(student_id_arg(args), date)
         
         if not entry:
             text = f"No schedule found for {date}."
@@ -95,17 +99,18 @@ async def get_topics_by_date_tool(args: dict[str, Any]) -> dict[str, Any]:
     "Add a memory note for the student",
     {"memory_entry": str}
 )
+@traced("mcp_tool", "add_memory_entry")
 async def add_memory_entry_tool(args: dict[str, Any]) -> dict[str, Any]:
     """Add memory entry for a student."""
     memory_entry = args.get("memory_entry", "")
     
     try:
-        success = add_student_memory(memory_entry)
+        result = await add_student_memory(student_id_arg(args), memory_entry)
         
-        if success:
-            text = f"Memory added: '{memory_entry}'"
+        if result.merged:
+            text = f"Already noted (noted {result.hits} times); the note now reads '{result.memory_entry}'"
         else:
-            text = "Failed to add memory entry"
+            text = f"Memory added: '{memory_entry}'"
         
         return {"content": [{"type": "text", "text": text}]}
         
@@ -115,16 +120,17 @@ async def add_memory_entry_tool(args: dict[str, Any]) -> dict[str, Any]:
 
 @tool(
     "update_skill_level",
-    "Update or set skill level for a topic",
+    "Update or set the student's skill level for a topic",
     {"topic": str, "skill_level": int}
 )
+@traced("mcp_tool", "update_skill_level")
 async def update_skill_level_tool(args: dict[str, Any]) -> dict[str, Any]:
     """Update skill level for a student topic."""
     topic = args.get("topic", "")
     skill_level = args.get("skill_level", 0)
     
     try:
-        success = set_skill_level(topic, skill_level)
+        success = await set_skill_level(student_id_arg(args), topic, skill_level)
         
         if success:
             text = f"Skill level updated: {topic} = {skill_level}"
@@ -137,17 +143,26 @@ async def update_skill_level_tool(args: dict[str, Any]) -> dict[str, Any]:
         return {"content": [{"type": "text", "text": f"Error: {str(e)}"}]}
 
 
-# Create MCP server
-memory_server = create_sdk_mcp_server(
-    "memory-manager",
-    "1.0.0",
-    tools=[
-        get_skill_level_pairs_tool,
-        get_topics_by_date_tool,
-        add_memory_entry_tool,
-        update_skill_level_tool
-    ]
-)
+def build_memory_server(binding: StudentBinding) -> dict[str, Any]:
+    """Build the memory server; its tools act only for ``binding``'s student."""
+    return create_sdk_mcp_server(
+        "memory-manager",
+        "1.0.0",
+        tools=bind_student_tools(
+            [
+                get_skill_level_pairs_tool,
+                get_topics_by_date_tool,
+                add_memory_entry_tool,
+                update_skill_level_tool
+            ],
+            binding,
+        )
+    )
+
+
+# Create MCP server for the student in EIGEN_MCP_STUDENT_ID (unset: tools refuse)
+_student_id: Optional[str] = os.getenv("EIGEN_MCP_STUDENT_ID")
+memory_server = build_memory_server(StudentBinding(int(_student_id) if _student_id else None))
 
 
 
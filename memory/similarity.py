@@ -0,0 +1,147 @@
+"""Cheap text similarity for spotting near-identical memory notes.
+
+The tutor tends to restate the same observation with small wording changes
+("struggles with stoichiometry" / "Student struggles with stoichiometry
+problems"). Word-set and character-trigram Jaccard catch those without an
+embedding model.
+
+Jaccard cannot tell a restatement from a contradiction: "Weak at integration
+by parts" and "Strong at integration by parts" share most of their words. So
+a high score is not enough to merge. Two notes are never duplicates if the
+words only one of them has include a negation, a polarity word (weak/strong,
+likes/dislikes, always/sometimes, ...) or a number. Merging wrongly loses
+what the student said; missing a merge only costs a row that compaction can
+still fold later.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+from typing import FrozenSet
+
+
+# Notes at or above this similarity (and with no conflicting words) are
+# treated as the same observation
+DUPLICATE_THRESHOLD = float(os.getenv("EIGEN_MEMORY_DEDUPE_THRESHOLD", "0.6"))
+
+_WORD = re.compile(r"[^\W_]+", re.UNICODE)
+# "doesn't" -> "does not", so the negation survives as a word of its own
+_CONTRACTED_NOT = re.compile(r"n['\u2019]t\b")
+# Words that carry no meaning in tutor notes
+_STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "has", "have", "in",
+    "is", "it", "of", "on", "or", "the", "their", "they", "this", "to", "with",
+    "student", "students",
+})
+
+
+_NEGATIONS = frozenset({
+    "not", "no", "never", "nor", "none", "neither", "nobody", "nothing", "nowhere",
+    "without", "cannot", "lacks", "lacking", "unable",
+})
+# Words that flip or grade an observation; a note differing from another in
+# one of them says something else about the student
+_POLARITY = frozenset({
+    "weak", "weaker", "weakness", "weaknesses", "strong", "stronger", "strength", "strengths",
+    "good", "better", "best", "bad", "worse", "worst", "poor", "poorly", "well",
+    "easy", "easier", "easily", "hard", "harder", "difficult", "difficulty", "difficulties",
+    "struggle", "struggles", "struggled", "struggling", "excel", "excels", "excelled", "excelling",
+    "like", "likes", "liked", "love", "loves", "enjoy", "enjoys", "hate", "hates",
+    "prefer", "prefers", "preferred", "avoid", "avoids", "avoided",
+    "fast", "faster", "quick", "quickly", "slow", "slower", "slowly",
+    "confident", "confidence", "anxious", "anxiety", "nervous", "unsure",
+    "high", "higher", "low", "lower", "more", "less", "fewer", "most", "least",
+    "increase", "increased", "increasing", "decrease", "decreased", "decreasing",
+    "improve", "improved", "improving", "improvement", "decline", "declined", "declining",
+    "worsened", "worsening", "regressed",
+    "correct", "correctly", "right", "wrong", "mistake", "mistakes",
+    "pass", "passed", "fail", "failed", "failing", "yes",
+    "always", "usually", "often", "frequently", "sometimes", "occasionally", "rarely", "seldom",
+    "before", "after", "above", "below",
+})
+# Prefixes that turn a word into its opposite (correct/incorrect, likes/dislikes)
+_NEGATING_PREFIXES = ("un", "in", "im", "ir", "il", "dis", "non")
+_NUMBER_WORDS = frozenset({
+    "zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten",
+    "eleven", "twelve", "twenty", "thirty", "forty", "fifty", "hundred",
+    "first", "second", "third", "fourth", "fifth", "last", "once", "twice", "half", "double",
+})
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, spell out "n't" and collapse everything but letters and digits to single spaces."""
+    return " ".join(_WORD.findall(_CONTRACTED_NOT.sub(" not", text.lower())))
+
+
+def word_set(text: str) -> FrozenSet[str]:
+    """Content words of a note."""
+    return frozenset(word for word in normalize_text(text).split() if word not in _STOPWORDS)
+
+
+def content_hash(text: str) -> str:
+    """Hash of a note's normalized text (``student_memory.content_hash``).
+
+    Word order is kept: "weak in algebra, strong in geometry" and "strong in
+    algebra, weak in geometry" are different notes.
+    """
+    return hashlib.blake2b(normalize_text(text).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def char_ngrams(text: str, n: int = 3) -> FrozenSet[str]:
+    """Character n-grams of the normalized text, robust to plurals and typos."""
+    normalized = normalize_text(text)
+    if len(normalized) < n:
+        return frozenset({normalized}) if normalized else frozenset()
+    return frozenset(normalized[i:i + n] for i in range(len(normalized) - n + 1))
+
+
+def jaccard(left: FrozenSet[str], right: FrozenSet[str]) -> float:
+    if not left and not right:
+        return 1.0
+    if not left or not right:
+        return 0.0
+    return len(left & right) / len(left | right)
+
+
+def similarity(left: str, right: str) -> float:
+    """Similarity of two notes in [0, 1]: the higher of word and trigram Jaccard."""
+    if normalize_text(left) == normalize_text(right):
+        return 1.0
+    return max(
+        jaccard(word_set(left), word_set(right)),
+        jaccard(char_ngrams(left), char_ngrams(right)),
+    )
+
+
+def _changes_meaning(word: str) -> bool:
+    return (
+        word in _NEGATIONS
+        or word in _POLARITY
+        or word in _NUMBER_WORDS
+        or any(char.isdigit() for char in word)
+    )
+
+
+def conflicting_words(left: str, right: str) -> FrozenSet[str]:
+    """Words only one of the notes has that change what it says.
+
+    Negations, polarity words, numbers, and pairs such as correct/incorrect
+    that differ only by a negating prefix.
+    """
+    left_words = set(normalize_text(left).split())
+    right_words = set(normalize_text(right).split())
+    left_only, right_only = left_words - right_words, right_words - left_words
+
+    conflicts = {word for word in left_only | right_only if _changes_meaning(word)}
+    for word in left_only:
+        for other in right_only:
+            if any(other == prefix + word or word == prefix + other for prefix in _NEGATING_PREFIXES):
+                conflicts.update((word, other))
+    return frozenset(conflicts)
+
+
+def is_near_duplicate(left: str, right: str, threshold: float = DUPLICATE_THRESHOLD) -> bool:
+    """Whether two notes restate the same observation and can be merged."""
+    return similarity(left, right) >= threshold and not conflicting_words(left, right)
@@ -0,0 +1,97 @@
+"""Bounded memory window for agent prompts.
+
+Prompts used to include every memory note ever written. ``build_memory_window``
+picks what fits a token budget instead: the rolled-up summary, the most
+recent notes, then the most salient older ones (noted often, noted lately).
+"""
+
+from __future__ import annotations
+
+import os
+from datetime import datetime
+from typing import Any, List, Optional, Sequence
+
+
+MEMORY_TOKEN_BUDGET = int(os.getenv("EIGEN_MEMORY_TOKEN_BUDGET", "500"))
+# Newest notes that are always considered first
+MEMORY_RECENT_NOTES = int(os.getenv("EIGEN_MEMORY_RECENT_NOTES", "5"))
+# Age at which a note's salience halves
+SALIENCE_HALF_LIFE_DAYS = 30.0
+# Share of the budget the summary record may take
+SUMMARY_BUDGET_SHARE = 0.5
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate prompt tokens for a line of text."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _seen_at(record: Any) -> datetime:
+    return record.last_seen_at or record.created_at or datetime.min
+
+
+def salience(record: Any, now: Optional[datetime] = None) -> float:
+    """Score a note by how often and how recently it was noted."""
+    now = now or datetime.now()
+    age_days = max((now - _seen_at(record)).total_seconds() / 86400, 0.0)
+    return max(record.hits, 1) * 0.5 ** (age_days / SALIENCE_HALF_LIFE_DAYS)
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    # The summary is one item per line, most salient first; cut at a line break
+    cut = text[:max_chars].rsplit("\n", 1)[0]
+    return cut if cut else text[:max_chars]
+
+
+def build_memory_window(
+    records: Sequence[Any],
+    token_budget: int = MEMORY_TOKEN_BUDGET,
+    recent: int = MEMORY_RECENT_NOTES,
+    now: Optional[datetime] = None,
+) -> List[str]:
+    """Choose the memory lines to put in a prompt.
+
+    Args:
+        records: Memory records with ``text``, ``kind``, ``hits``,
+            ``created_at`` and ``last_seen_at`` attributes
+        token_budget: Approximate token cap for all returned lines
+        recent: How many of the newest notes to take before ranking the rest
+
+    Returns:
+        The summary (if any) followed by the chosen notes in chronological order
+    """
+    now = now or datetime.now()
+    remaining = token_budget
+    lines: List[str] = []
+
+    for record in records:
+        if record.kind != "summary" or not record.text:
+            continue
+        summary = _truncate(record.text, int(token_budget * SUMMARY_BUDGET_SHARE))
+        lines.append(summary)
+        remaining -= estimate_tokens(summary)
+
+    notes = sorted(
+        (record for record in records if record.kind != "summary" and record.text),
+        key=_seen_at,
+    )
+    newest_first = list(reversed(notes))
+    candidates = newest_first[:recent] + sorted(
+        newest_first[recent:], key=lambda record: salience(record, now), reverse=True
+    )
+
+    chosen = []
+    for record in candidates:
+        cost = estimate_tokens(record.text)
+        if cost > remaining:
+            continue
+        chosen.append(record)
+        remaining -= cost
+
+    chosen.sort(key=_seen_at)
+    lines.extend(record.text for record in chosen)
+    return lines
@@ -0,0 +1,11 @@
+-- Migration script for shared chat session state
+-- Lets any API worker rehydrate a tutoring session created by another one
+
+CREATE TABLE IF NOT EXISTS chat_sessions (
+    session_id VARCHAR(255) NOT NULL PRIMARY KEY,
+    state JSON NOT NULL,
+    version INT NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    INDEX idx_updated_at (updated_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -0,0 +1,18 @@
+-- Migration script for the normalized question/topic junction table
+-- Replaces OR-across-three-columns topic lookups with a single index seek
+
+CREATE TABLE IF NOT EXISTS question_topics (
+    question_id INT NOT NULL,
+    topic VARCHAR(255) NOT NULL,
+    PRIMARY KEY (topic, question_id),
+    INDEX idx_question_id (question_id),
+    FOREIGN KEY (question_id) REFERENCES questions(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Backfill from the tag columns of existing questions
+INSERT IGNORE INTO question_topics (question_id, topic)
+SELECT id, topic_tag1 FROM questions WHERE topic_tag1 IS NOT NULL AND topic_tag1 <> ''
+UNION ALL
+SELECT id, topic_tag2 FROM questions WHERE topic_tag2 IS NOT NULL AND topic_tag2 <> ''
+UNION ALL
+SELECT id, topic_tag3 FROM questions WHERE topic_tag3 IS NOT NULL AND topic_tag3 <> '';
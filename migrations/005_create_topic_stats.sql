@@ -0,0 +1,39 @@
+-- Migration script for per-topic question bank statistics
+-- Maintained by refresh_topic_stats() whenever question_topics changes, so
+-- topic listings read one indexed table instead of aggregating per topic
+
+CREATE TABLE IF NOT EXISTS topic_stats (
+    topic VARCHAR(255) NOT NULL PRIMARY KEY,
+    question_count INT NOT NULL DEFAULT 0,
+    easy_count INT NOT NULL DEFAULT 0,
+    medium_count INT NOT NULL DEFAULT 0,
+    hard_count INT NOT NULL DEFAULT 0,
+    -- Sum of the 1-3 difficulty values of the rated (easy/medium/hard) questions
+    difficulty_sum INT NOT NULL DEFAULT 0,
+    asked_count INT NOT NULL DEFAULT 0,
+    unasked_count INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Backfill from the existing question bank
+REPLACE INTO topic_stats (
+    topic, question_count, easy_count, medium_count, hard_count,
+    difficulty_sum, asked_count, unasked_count
+)
+SELECT
+    qt.topic,
+    COUNT(*),
+    SUM(LOWER(TRIM(q.difficulty)) IN ('easy', 'beginner')),
+    SUM(LOWER(TRIM(q.difficulty)) IN ('medium', 'intermediate')),
+    SUM(LOWER(TRIM(q.difficulty)) IN ('hard', 'advanced')),
+    COALESCE(SUM(CASE
+        WHEN LOWER(TRIM(q.difficulty)) IN ('easy', 'beginner') THEN 1
+        WHEN LOWER(TRIM(q.difficulty)) IN ('medium', 'intermediate') THEN 2
+        WHEN LOWER(TRIM(q.difficulty)) IN ('hard', 'advanced') THEN 3
+        ELSE 0
+    END), 0),
+    SUM(q.has_been_asked = 1),
+    SUM(q.has_been_asked = 0 OR q.has_been_asked IS NULL)
+FROM question_topics qt
+JOIN questions q ON q.id = qt.question_id
+GROUP BY qt.topic;
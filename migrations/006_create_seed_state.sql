@@ -0,0 +1,9 @@
+-- Migration script for seed bookkeeping
+-- Records the content hash of each seed file so seeding only re-runs changed files
+
+CREATE TABLE IF NOT EXISTS seed_state (
+    seed_file VARCHAR(255) NOT NULL PRIMARY KEY,
+    content_hash CHAR(64) NOT NULL,
+    row_count INT NOT NULL DEFAULT 0,
+    seeded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -0,0 +1,52 @@
+-- Migration script for student memory compaction
+-- kind separates regular notes from the rolled-up summary record, hits counts
+-- how many near-duplicate notes were folded into an entry (its salience), and
+-- last_seen_at is the most recent time any of them was written
+--
+-- MySQL 8 has no ADD COLUMN / ADD INDEX IF NOT EXISTS, so each step checks
+-- information_schema and prepares either the ALTER or a no-op. A re-run after
+-- a partial failure skips the steps that already went through.
+
+SET @ddl = IF(
+    (SELECT COUNT(*) FROM information_schema.columns
+     WHERE table_schema = DATABASE() AND table_name = 'student_memory' AND column_name = 'kind') = 0,
+    'ALTER TABLE student_memory ADD COLUMN kind VARCHAR(20) NOT NULL DEFAULT ''note''',
+    'DO 0'
+);
+PREPARE ddl FROM @ddl;
+EXECUTE ddl;
+DEALLOCATE PREPARE ddl;
+
+SET @ddl = IF(
+    (SELECT COUNT(*) FROM information_schema.columns
+     WHERE table_schema = DATABASE() AND table_name = 'student_memory' AND column_name = 'hits') = 0,
+    'ALTER TABLE student_memory ADD COLUMN hits INT NOT NULL DEFAULT 1',
+    'DO 0'
+);
+PREPARE ddl FROM @ddl;
+EXECUTE ddl;
+DEALLOCATE PREPARE ddl;
+
+SET @ddl = IF(
+    (SELECT COUNT(*) FROM information_schema.columns
+     WHERE table_schema = DATABASE() AND table_name = 'student_memory' AND column_name = 'last_seen_at') = 0,
+    'ALTER TABLE student_memory ADD COLUMN last_seen_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP',
+    'DO 0'
+);
+PREPARE ddl FROM @ddl;
+EXECUTE ddl;
+DEALLOCATE PREPARE ddl;
+
+SET @ddl = IF(
+    (SELECT COUNT(*) FROM information_schema.statistics
+     WHERE table_schema = DATABASE() AND table_name = 'student_memory' AND index_name = 'idx_student_kind') = 0,
+    'ALTER TABLE student_memory ADD INDEX idx_student_kind (student_id, kind)',
+    'DO 0'
+);
+PREPARE ddl FROM @ddl;
+EXECUTE ddl;
+DEALLOCATE PREPARE ddl;
+
+-- Safe to repeat: the file is only re-run if it never finished, and the
+-- server does not start (and write notes) until it has
+UPDATE student_memory SET last_seen_at = created_at;
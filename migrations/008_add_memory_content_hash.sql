@@ -0,0 +1,28 @@
+-- Migration script for write-side memory deduplication
+-- content_hash is a hash of a note's normalized text (lowercase, punctuation
+-- collapsed, word order kept), so restating the same fact with different case
+-- or punctuation maps to the same key. Rows written before this migration
+-- keep a NULL hash (NULLs never collide in a unique index) and are still
+-- caught by the similarity check.
+--
+-- Each step is guarded through information_schema, as in 007.
+
+SET @ddl = IF(
+    (SELECT COUNT(*) FROM information_schema.columns
+     WHERE table_schema = DATABASE() AND table_name = 'student_memory' AND column_name = 'content_hash') = 0,
+    'ALTER TABLE student_memory ADD COLUMN content_hash CHAR(32) NULL',
+    'DO 0'
+);
+PREPARE ddl FROM @ddl;
+EXECUTE ddl;
+DEALLOCATE PREPARE ddl;
+
+SET @ddl = IF(
+    (SELECT COUNT(*) FROM information_schema.statistics
+     WHERE table_schema = DATABASE() AND table_name = 'student_memory' AND index_name = 'uniq_student_memory_hash') = 0,
+    'ALTER TABLE student_memory ADD UNIQUE KEY uniq_student_memory_hash (student_id, content_hash)',
+    'DO 0'
+);
+PREPARE ddl FROM @ddl;
+EXECUTE ddl;
+DEALLOCATE PREPARE ddl;
@@ -3,6 +3,7 @@ curl -X GET http://localhost:8000/health
 curl -X POST http://localhost:8000/initializer \
   -H "Content-Type: application/json" \
   -d '{
+    "student_id": 1,
     "student_data": {
       "student_name": "Maria Silva",
       "exam_name": "ENEM 2025",
@@ -14,6 +15,7 @@ curl -X POST http://localhost:8000/initializer \
 curl -X POST http://localhost:8000/questioner \
   -H "Content-Type: application/json" \
   -d '{
+    "student_id": 1,
     "student_data": {
       "student_name": "Maria Silva",
       "exam_name": "ENEM 2025",
@@ -25,6 +27,7 @@ curl -X POST http://localhost:8000/questioner \
 curl -X POST http://localhost:8000/chatter \
   -H "Content-Type: application/json" \
   -d '{
+    "student_id": 1,
     "student_data": {
       "student_name": "Maria Silva",
       "exam_name": "ENEM 2025",
@@ -34,9 +37,10 @@ curl -X POST http://localhost:8000/chatter \
     "conversation_history": []
   }'
 
-curl -X POST http://localhost:8000/finalizer \
+curl -X POST "http://localhost:8000/finalizer?wait=60" \
   -H "Content-Type: application/json" \
   -d '{
+    "student_id": 1,
     "student_data": {
       "student_name": "Maria Silva",
       "exam_name": "ENEM 2025",
@@ -5,6 +5,7 @@ Tests connection, available tools, and basic operations.
 """
 
 import asyncio
+import os
 import sys
 import subprocess
 import time
@@ -14,6 +15,10 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent))
 
 from claude_agent_sdk import ClaudeSDKClient, ClaudeAgentOptions
+from database.db_mcp import MCP_MODE, StudentBinding, get_mcp_servers
+
+# Student the student-scoped tools are exercised against
+STUDENT_ID = int(os.getenv("EIGEN_TEST_STUDENT_ID", "1"))
 
 
 async def test_mcp_connection():
@@ -26,16 +31,11 @@ async def test_mcp_connection():
         # Create client with MCP server configuration
         options = ClaudeAgentOptions(
             model="haiku",
-            mcp_servers={
-                "database": {
-                    "command": "-m",
-                    "args": ["database.db_mcp"],
-                }
-            },
+            mcp_servers=get_mcp_servers(StudentBinding(STUDENT_ID)),
         )
         
         client = ClaudeSDKClient(options=options)
-        print("✓ ClaudeSDKClient created successfully")
+        print(f"✓ ClaudeSDKClient created successfully (MCP mode: {MCP_MODE})")
         
         # Connect to the server
         await client.connect()
@@ -110,7 +110,7 @@ async def test_get_skill_level_pairs(client):
     print("=" * 60)
     
     try:
-        query = "Please use the get_skill_level_pairs tool to retrieve skill level information."
+        query = "Please use the get_skill_level_pairs tool to retrieve the student's skill level information."
         
         await client.query(query)
         
@@ -0,0 +1,112 @@
+"""Shared fixtures: an in-memory stand-in for MySQL connections."""
+
+import re
+from typing import Any, Callable, List, Optional, Tuple
+
+import pytest
+
+from database.db import DatabaseManager
+
+
+def _squash(sql: str) -> str:
+    return re.sub(r"\s+", " ", sql).strip()
+
+
+class FakeCursor:
+    """Records statements and answers queries through the owning FakeDatabase."""
+
+    def __init__(self, db: "FakeDatabase", dictionary: bool = False) -> None:
+        self.db = db
+        self.dictionary = dictionary
+        self.rows: List[Any] = []
+        self.rowcount = 0
+        self.lastrowid = None
+        self.description = None
+
+    def execute(self, sql: str, params: Tuple = ()) -> None:
+        sql = _squash(sql)
+        self.db.log.append(("execute", sql, tuple(params or ())))
+        self.rows = list(self.db.answer(sql, tuple(params or ())))
+        self.rowcount = len(self.rows)
+
+    def executemany(self, sql: str, rows: List[Tuple]) -> None:
+        for params in rows:
+            self.execute(sql, params)
+
+    @property
+    def with_rows(self) -> bool:
+        return bool(self.rows)
+
+    def fetchall(self) -> List[Any]:
+        rows, self.rows = self.rows, []
+        return rows
+
+    def fetchone(self) -> Optional[Any]:
+        return self.rows.pop(0) if self.rows else None
+
+    def close(self) -> None:
+        pass
+
+
+class FakeConnection:
+    def __init__(self, db: "FakeDatabase") -> None:
+        self.db = db
+        self.in_transaction = False
+        self.autocommit = True
+
+    def cursor(self, buffered: bool = False, dictionary: bool = False) -> FakeCursor:
+        return FakeCursor(self.db, dictionary)
+
+    def start_transaction(self) -> None:
+        self.in_transaction = True
+        self.db.log.append(("begin",))
+
+    def commit(self) -> None:
+        self.in_transaction = False
+        self.db.log.append(("commit",))
+
+    def rollback(self) -> None:
+        self.in_transaction = False
+        self.db.log.append(("rollback",))
+
+    def close(self) -> None:
+        self.db.log.append(("close",))
+
+
+class FakeDatabase:
+    """Answers each query with the rows of the first matching responder.
+
+    ``log`` records statements, commits and rollbacks in order, so tests can
+    check what a helper wrote and when it did so.
+    """
+
+    def __init__(self) -> None:
+        self.log: List[Tuple] = []
+        self.responders: List[Tuple[re.Pattern, Callable[[Tuple], List[Any]]]] = []
+
+    def respond(self, pattern: str, rows: Any) -> None:
+        """Answer statements matching ``pattern`` with ``rows`` (or ``rows(params)``)."""
+        handler = rows if callable(rows) else (lambda params, rows=rows: rows)
+        self.responders.insert(0, (re.compile(pattern, re.IGNORECASE), handler))
+
+    def answer(self, sql: str, params: Tuple) -> List[Any]:
+        for pattern, handler in self.responders:
+            if pattern.search(sql):
+                return handler(params)
+        return []
+
+    def connection(self) -> FakeConnection:
+        return FakeConnection(self)
+
+    def statements(self, pattern: str = "") -> List[Tuple[str, Tuple]]:
+        """Executed (sql, params) pairs whose SQL matches ``pattern``."""
+        regex = re.compile(pattern, re.IGNORECASE)
+        return [(entry[1], entry[2]) for entry in self.log if entry[0] == "execute" and regex.search(entry[1])]
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """Route DatabaseManager connections to a FakeDatabase."""
+    db = FakeDatabase()
+    monkeypatch.setattr(DatabaseManager, "get_connection", staticmethod(db.connection))
+    return db
@@ -0,0 +1,157 @@
+"""Tests for TutorChat error handling and interrupted replies (agents/chatter.py)."""
+
+import asyncio
+import json
+
+import pytest
+from claude_agent_sdk import AssistantMessage, ResultMessage, TextBlock
+
+import agents.chatter as chatter
+from agents.chatter import TutorChat
+from database.db_mcp import StudentBinding
+
+
+def assistant(text):
+    return AssistantMessage(content=[TextBlock(text=text)], model="fake")
+
+
+def result():
+    return ResultMessage(
+        subtype="success", duration_ms=1, duration_api_ms=1, is_error=False, num_turns=1, session_id="fake"
+    )
+
+
+class FakeClient:
+    """Replays scripted replies; each reply ends with a ResultMessage."""
+
+    def __init__(self, replies, fail_after=None, hang_on_drain=False):
+        self.replies = list(replies)
+        self.fail_after = fail_after
+        self.hang_on_drain = hang_on_drain
+        self.current = []
+        self.queries = []
+        self.interrupted = 0
+        self.disconnected = False
+        self.student = StudentBinding()
+
+    async def query(self, prompt):
+        self.queries.append(prompt)
+        self.current = [assistant(text) for text in self.replies.pop(0)] + [result()]
+
+    async def receive_response(self):
+        sent = 0
+        while self.current:
+            if self.fail_after is not None and sent == self.fail_after:
+                raise RuntimeError("CLI exited")
+            if self.hang_on_drain and self.interrupted:
+                await asyncio.sleep(3600)
+            message = self.current.pop(0)
+            sent += 1
+            yield message
+            if isinstance(message, ResultMessage):
+                return
+
+    async def interrupt(self):
+        self.interrupted += 1
+
+    async def disconnect(self):
+        self.disconnected = True
+
+
+def make_chat(client):
+    return TutorChat({"student_id": 7, "student_name": "Ana", "exam_name": "ENEM"}, "42", client=client)
+
+
+def test_chat_returns_the_json_reply():
+    client = FakeClient([['{"response": "Good start", "correct_status": false}']])
+    reply = asyncio.run(make_chat(client).chat("hi"))
+    assert json.loads(reply) == {"response": "Good start", "correct_status": False}
+
+
+def test_chat_reraises_instead_of_answering_with_an_error_string():
+    client = FakeClient([["partial"]], fail_after=0)
+    with pytest.raises(RuntimeError, match="CLI exited"):
+        asyncio.run(make_chat(client).chat("hi"))
+
+
+def test_interrupt_drains_abandoned_reply_before_the_next_message():
+    client = FakeClient([
+        ['{"response": "first ', 'half", "correct_status": false}'],
+        ['{"response": "second reply", "correct_status": true}'],
+    ])
+    session = make_chat(client)
+
+    async def scenario():
+        events = session.stream("one")
+        await events.__anext__()  # the student disconnects after the first delta
+        await events.aclose()
+        await session.interrupt()
+        return await session.chat("two")
+
+    assert json.loads(asyncio.run(scenario()))["response"] == "second reply"
+    assert client.interrupted == 1
+    assert client.current == []
+
+
+def test_interrupt_is_a_no_op_once_the_reply_was_read():
+    client = FakeClient([['{"response": "done", "correct_status": true}']])
+    session = make_chat(client)
+
+    async def scenario():
+        await session.chat("one")
+        await session.interrupt()
+
+    asyncio.run(scenario())
+    assert client.interrupted == 0
+    assert not client.disconnected
+
+
+def test_interrupt_drops_a_client_that_will_not_drain(monkeypatch):
+    monkeypatch.setattr(chatter, "INTERRUPT_DRAIN_TIMEOUT", 0.05)
+    client = FakeClient([["a", "b"]], hang_on_drain=True)
+    session = make_chat(client)
+    session.record_turn("student", "earlier question")
+
+    async def scenario():
+        events = session.stream("one")
+        await events.__anext__()
+        await events.aclose()
+        await session.interrupt()
+
+    asyncio.run(scenario())
+    assert client.disconnected
+    assert session.client is None
+    # The next message reconnects and replays the transcript
+    assert "earlier question" in session._build_system_prompt()
+
+
+def test_sse_disconnect_interrupts_the_reply(monkeypatch):
+    import api
+
+    client = FakeClient([['{"response": "a long ', 'reply", "correct_status": false}']])
+    session = make_chat(client)
+
+    async def fake_session(request):
+        return session
+
+    monkeypatch.setattr(api, "get_or_create_chat_session", fake_session)
+
+    async def scenario():
+        request = api.ChatRequest(session_id="s1", user_message="hi")
+        response = await api.chatter_stream_endpoint(request)
+        body = response.body_iterator
+        first = await body.__anext__()
+        await body.aclose()  # what the server does once the client has gone
+        return first
+
+    assert asyncio.run(scenario()).startswith("event: delta")
+    assert client.interrupted == 1
+    assert client.current == []
+
+
+def test_leased_client_is_bound_to_the_session_student():
+    client = FakeClient([])
+    make_chat(client)
+    assert client.student.student_id == 7
+    with pytest.raises(ValueError):
+        TutorChat({"student_id": 8}, "42", client=client)
@@ -0,0 +1,171 @@
+"""Tests for the tutor client pool (agents/client_pool.py)."""
+
+import asyncio
+import json
+from typing import Any, AsyncIterator, Dict, List
+
+from claude_agent_sdk import ClaudeAgentOptions, ClaudeSDKClient
+from claude_agent_sdk._internal.transport import Transport
+
+from agents.client_pool import ClientPool, _IdleClient
+
+
+class FakeTransport(Transport):
+    """Answers control requests and replies "pong" to every user message."""
+
+    def __init__(self) -> None:
+        self.outbox: "asyncio.Queue[Any]" = asyncio.Queue()
+        self.ready = False
+        self.closed = False
+
+    async def connect(self) -> None:
+        self.ready = True
+
+    async def write(self, data: str) -> None:
+        for line in data.splitlines():
+            message = json.loads(line)
+            if message["type"] == "control_request":
+                await self.outbox.put({
+                    "type": "control_response",
+                    "response": {
+                        "subtype": "success",
+                        "request_id": message["request_id"],
+                        "response": {"commands": []},
+                    },
+                })
+            elif message["type"] == "user":
+                await self.outbox.put({
+                    "type": "assistant",
+                    "message": {"model": "fake", "content": [{"type": "text", "text": "pong"}]},
+                })
+                await self.outbox.put({
+                    "type": "result",
+                    "subtype": "success",
+                    "duration_ms": 1,
+                    "duration_api_ms": 1,
+                    "is_error": False,
+                    "num_turns": 1,
+                    "session_id": "fake",
+                })
+
+    async def read_messages(self) -> AsyncIterator[Dict[str, Any]]:
+        while True:
+            message = await self.outbox.get()
+            if message is None:
+                return
+            yield message
+
+    async def close(self) -> None:
+        self.ready = False
+        self.closed = True
+        await self.outbox.put(None)
+
+    def is_ready(self) -> bool:
+        return self.ready
+
+    async def end_input(self) -> None:
+        pass
+
+
+class FakeClient:
+    def __init__(self, healthy: bool = True, probe_delay: float = 0.0) -> None:
+        self.healthy = healthy
+        self.probe_delay = probe_delay
+        self.disconnected = False
+
+
+class ProbePool(ClientPool):
+    """Pool whose health probe and disconnect are driven by FakeClient."""
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(client_factory=lambda: ClaudeSDKClient(options=ClaudeAgentOptions()), **kwargs)
+        self.probed: List[FakeClient] = []
+
+    async def _is_healthy(self, client: FakeClient) -> bool:
+        self.probed.append(client)
+        await asyncio.sleep(client.probe_delay)
+        return client.healthy
+
+    async def _disconnect(self, client: FakeClient) -> None:
+        client.disconnected = True
+
+
+def fill(pool: ClientPool, clients: List[FakeClient], idle_since: float = None) -> None:
+    for client in clients:
+        entry = _IdleClient(client)
+        if idle_since is not None:
+            entry.idle_since = idle_since
+        pool._idle.append(entry)
+
+
+def test_client_used_and_disconnected_from_another_task():
+    async def scenario():
+        transport = FakeTransport()
+        client = ClaudeSDKClient(options=ClaudeAgentOptions(), transport=transport)
+        # Connect in a background task, as the pool's refill loop does
+        await asyncio.create_task(client.connect())
+
+        async def use():
+            await client.query("ping")
+            replies = [message async for message in client.receive_response()]
+            await client.disconnect()
+            return replies
+
+        replies = await asyncio.wait_for(asyncio.create_task(use()), timeout=5)
+        return transport, replies
+
+    transport, replies = asyncio.run(scenario())
+    assert replies[0].content[0].text == "pong"
+    assert type(replies[-1]).__name__ == "ResultMessage"
+    assert transport.closed
+
+
+def test_evict_keeps_other_clients_leasable_while_probing():
+    async def scenario():
+        pool = ProbePool(min_size=0, max_size=4)
+        slow = FakeClient(probe_delay=0.05)
+        fast = [FakeClient(), FakeClient()]
+        fill(pool, [slow] + fast)
+
+        evict = asyncio.create_task(pool._evict())
+        await asyncio.sleep(0.01)
+        # The slow probe is in flight; a lease must still find a warm client
+        misses_before = pool._misses
+        leased = await pool.lease()
+        await evict
+        return pool, slow, fast, leased, misses_before
+
+    pool, slow, fast, leased, misses_before = asyncio.run(scenario())
+    assert leased in fast
+    assert pool._misses == misses_before == 0
+    assert slow in [entry.client for entry in pool._idle]
+    assert len(pool._idle) == 2
+
+
+def test_evict_drops_unhealthy_clients():
+    async def scenario():
+        pool = ProbePool(min_size=0, max_size=4)
+        bad, good = FakeClient(healthy=False), FakeClient()
+        fill(pool, [bad, good])
+        await pool._evict()
+        return pool, bad, good
+
+    pool, bad, good = asyncio.run(scenario())
+    assert bad.disconnected and not good.disconnected
+    assert [entry.client for entry in pool._idle] == [good]
+    assert pool.stats()["health_check_failures"] == 1
+
+
+def test_evict_shrinks_surplus_idle_clients_down_to_min_size():
+    async def scenario():
+        pool = ProbePool(min_size=1, max_size=4, idle_timeout=10)
+        pool._target = 3
+        clients = [FakeClient() for _ in range(3)]
+        fill(pool, clients, idle_since=0.0)
+        await pool._evict()
+        return pool, clients
+
+    pool, clients = asyncio.run(scenario())
+    assert len(pool._idle) == 1
+    assert pool._target == 1
+    assert sum(client.disconnected for client in clients) == 2
@@ -0,0 +1,112 @@
+"""Tests for the memory window (memory/window.py) and compaction planning (memory/compaction.py)."""
+
+from datetime import datetime, timedelta
+
+from database.student_context import MemoryRecord
+from memory.compaction import SummaryItem, format_summary, parse_summary, plan_compaction
+from memory.window import build_memory_window, estimate_tokens, salience
+
+NOW = datetime(2025, 6, 1, 12, 0)
+
+
+def note(memory_id, text, days_ago=0, hits=1, kind="note"):
+    seen = NOW - timedelta(days=days_ago)
+    return MemoryRecord(id=memory_id, text=text, kind=kind, hits=hits, created_at=seen, last_seen_at=seen)
+
+
+def test_estimate_tokens_counts_four_chars_per_token():
+    assert estimate_tokens("") == 1
+    assert estimate_tokens("x" * 40) == 11
+
+
+def test_salience_halves_every_thirty_days():
+    assert salience(note(1, "a", hits=4), NOW) == 4
+    assert salience(note(1, "a", hits=4, days_ago=30), NOW) == 2
+    assert salience(note(1, "a", hits=0), NOW) == 1
+
+
+def test_window_takes_recent_then_salient_notes_in_chronological_order():
+    records = [
+        note(1, "old and rare", days_ago=90),
+        note(2, "old but frequent", days_ago=60, hits=20),
+        note(3, "yesterday", days_ago=1),
+        note(4, "today", days_ago=0),
+        note(5, "- summary line", kind="summary"),
+    ]
+    # Summary (4 tokens) + three notes of 3-5 tokens fit; the rare one does not
+    lines = build_memory_window(records, token_budget=17, recent=2, now=NOW)
+    assert lines == ["- summary line", "old but frequent", "yesterday", "today"]
+
+
+def test_window_truncates_the_summary_at_a_line_break():
+    summary = note(1, "- first line\n- second line that is long", kind="summary")
+    assert build_memory_window([summary], token_budget=8, now=NOW) == ["- first line"]
+
+
+def test_format_summary_returns_what_does_not_fit():
+    items = [SummaryItem("rare", 1), SummaryItem("common", 3), SummaryItem("middle", 2)]
+    text, overflow = format_summary(items, max_chars=55)
+    assert text == "- common (noted 3 times)\n- middle (noted 2 times)"
+    assert overflow == [SummaryItem("rare", 1)]
+    assert parse_summary(text) == [("common", 3), ("middle", 2)]
+
+
+def test_duplicates_merge_into_the_newest_wording():
+    records = [
+        note(1, "Confuses sine and cosine under time pressure", days_ago=3),
+        note(2, "Confuses sine and cosine when under time pressure", days_ago=1, hits=2),
+    ]
+    plan = plan_compaction(7, records, keep_notes=10)
+    assert plan.merged == [(2, 3, records[1].last_seen_at)]
+    assert plan.delete_ids == [1]
+    assert plan.summary is None
+
+
+def test_contradicting_notes_are_not_merged():
+    records = [note(1, "Weak at integration by parts", days_ago=3), note(2, "Strong at integration by parts")]
+    assert not plan_compaction(7, records, keep_notes=10).changed
+
+
+def test_old_notes_roll_into_the_summary():
+    records = [note(1, "oldest", days_ago=5), note(2, "older", days_ago=4, hits=2), note(3, "newest")]
+    plan = plan_compaction(7, records, keep_notes=1, summary_chars=1000)
+    assert plan.summary == "- older (noted 2 times)\n- oldest"
+    assert sorted(plan.delete_ids) == [1, 2]
+    assert (plan.rolled_up, plan.overflow) == (2, 0)
+
+
+def test_notes_that_do_not_fit_the_summary_stay_notes():
+    records = [
+        note(1, "seldom noted", days_ago=5),
+        note(2, "often noted", days_ago=4, hits=5),
+        note(3, "newest"),
+    ]
+    plan = plan_compaction(7, records, keep_notes=1, summary_chars=25)
+    assert plan.summary == "- often noted (noted 5 times)"
+    assert plan.delete_ids == [2]
+    assert (plan.rolled_up, plan.overflow) == (1, 1)
+
+    # The next round leaves everything alone
+    rolled = [note(1, "seldom noted", days_ago=5), note(3, "newest"), note(9, plan.summary, kind="summary")]
+    assert not plan_compaction(7, rolled, keep_notes=1, summary_chars=25).changed
+
+
+def test_summary_lines_displaced_by_new_notes_are_restored_as_notes():
+    summary = note(9, "- quiet line", days_ago=10, kind="summary")
+    records = [summary, note(1, "loud note", days_ago=5, hits=4), note(2, "newest")]
+    plan = plan_compaction(7, records, keep_notes=1, summary_chars=20)
+    assert plan.summary == "- loud note (noted 4 times)"
+    assert plan.restored == [("quiet line", 1, summary.last_seen_at)]
+    assert plan.summary_id == 9
+    assert plan.delete_ids == [1]
+
+
+def test_overflowing_note_keeps_the_count_of_its_summary_line():
+    lines = "- big observation that fills the summary (noted 9 times)\n- sine rule (noted 2 times)"
+    summary = note(9, lines, days_ago=10, kind="summary")
+    records = [summary, note(1, "Sine rule", days_ago=5), note(2, "newest")]
+    plan = plan_compaction(7, records, keep_notes=1, summary_chars=60)
+    assert plan.summary == "- big observation that fills the summary (noted 9 times)"
+    assert plan.merged == [(1, 3, records[1].last_seen_at)]
+    assert plan.delete_ids == []
+    assert not plan.restored
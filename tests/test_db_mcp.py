@@ -0,0 +1,60 @@
+"""Tests for the student binding of the database MCP tools (database/db_mcp.py)."""
+
+import asyncio
+
+import pytest
+
+from database import db_mcp
+from database.db_mcp import STUDENT_TOOLS, StudentBinding, bind_student_tools
+
+
+def call(tools, name, args):
+    [student_tool] = [student_tool for student_tool in tools if student_tool.name == name]
+    result = asyncio.run(student_tool.handler(args))
+    return result["content"][0]["text"]
+
+
+@pytest.fixture
+def skill_reads(monkeypatch):
+    reads = []
+
+    async def fake_get_skill_levels(student_id):
+        reads.append(student_id)
+        return [("algebra", 40)]
+
+    monkeypatch.setattr(db_mcp, "get_skill_levels", fake_get_skill_levels)
+    return reads
+
+
+def test_tools_act_for_the_bound_student(skill_reads):
+    tools = bind_student_tools(STUDENT_TOOLS, StudentBinding(3))
+    assert "algebra" in call(tools, "get_skill_level_pairs", {})
+    assert call(tools, "get_skill_level_pairs", {"student_id": 3}).startswith("Skill Levels")
+    assert skill_reads == [3, 3]
+
+
+def test_model_supplied_student_id_for_another_student_is_refused(skill_reads):
+    tools = bind_student_tools(STUDENT_TOOLS, StudentBinding(3))
+    assert "only access its own student" in call(tools, "get_skill_level_pairs", {"student_id": 4})
+    assert skill_reads == []
+
+
+def test_unbound_tools_refuse_until_the_session_binds_them(skill_reads):
+    binding = StudentBinding()
+    tools = bind_student_tools(STUDENT_TOOLS, binding)
+    assert "No student is bound" in call(tools, "get_skill_level_pairs", {"student_id": 4})
+
+    binding.bind(5)
+    call(tools, "get_skill_level_pairs", {})
+    assert skill_reads == [5]
+    with pytest.raises(ValueError):
+        binding.bind(6)
+
+
+def test_student_id_is_not_in_the_tool_schemas():
+    assert all("student_id" not in student_tool.input_schema for student_tool in STUDENT_TOOLS)
+
+
+def test_subprocess_servers_get_the_student_on_the_command_line(monkeypatch):
+    monkeypatch.setattr(db_mcp, "MCP_MODE", "subprocess")
+    assert db_mcp.get_mcp_servers(StudentBinding(9))["database"]["args"][-2:] == ["--student-id", "9"]
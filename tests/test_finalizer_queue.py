@@ -0,0 +1,48 @@
+"""Tests for the finalizer job queue (agents/finalizer_queue.py)."""
+
+import asyncio
+
+from agents import finalizer_queue as queue_module
+from agents.finalizer_queue import MAX_TOPIC_CHARS, FinalizerQueue, clean_scores
+from database.topic_cache import TopicVocabulary
+
+
+def test_clean_scores_keeps_known_topics_under_their_own_spelling():
+    result = {"ALGEBRA ": 45.6, "Geometry": 140, "astrology": 90, "calculus": "n/a"}
+    assert clean_scores(result, ["algebra", "Geometry", "calculus"]) == {"algebra": 46, "Geometry": 100}
+
+
+def test_clean_scores_drops_overlong_and_non_dict_results():
+    long_topic = "t" * (MAX_TOPIC_CHARS + 1)
+    assert clean_scores({long_topic: 50}, [long_topic]) == {}
+    assert clean_scores(["algebra", 50], ["algebra"]) == {}
+
+
+def test_job_writes_only_vocabulary_topics(monkeypatch):
+    written = {}
+
+    async def fake_finalizer(student_id, student_data, conversation_history):
+        return {"Algebra": 70, "made-up topic": 20, "fractions": 55}
+
+    async def fake_vocabulary(student_id, refresh=False):
+        return TopicVocabulary(topics=["algebra"], skills={"fractions": 40})
+
+    async def fake_set_skill_levels(student_id, scores):
+        written[student_id] = scores
+        return len(scores)
+
+    monkeypatch.setattr(queue_module, "finalizer_agent", fake_finalizer)
+    monkeypatch.setattr(queue_module, "load_topic_vocabulary", fake_vocabulary)
+    monkeypatch.setattr(queue_module, "set_skill_levels", fake_set_skill_levels)
+
+    async def scenario():
+        queue = FinalizerQueue(workers=1)
+        job = await queue.submit(3, {}, "[tutor]: 'hi'")
+        await job.wait(timeout=2)
+        await queue.close()
+        return job
+
+    job = asyncio.run(scenario())
+    assert job.status == "done"
+    assert written == {3: {"algebra": 70, "fractions": 55}}
+    assert job.skills_updated == 2
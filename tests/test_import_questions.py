@@ -0,0 +1,89 @@
+"""Tests for the streaming question importer (database/import_questions.py)."""
+
+import json
+
+import pytest
+
+from database import import_questions
+from database.import_questions import (
+    PROMPT_KEY_CHARS,
+    ValidationError,
+    dedupe_chunk,
+    import_questions as run_import,
+    prompt_key,
+    validate_record,
+)
+from database.seed_data import prompt_key_filter
+
+
+def record(prompt="What is 2+2?", **extra):
+    return {"question_prompt": prompt, "answer": "4", "topic_tag1": "arithmetic", **extra}
+
+
+def test_validate_record_fills_defaults():
+    row = validate_record(record(has_been_asked="yes"), default_source="bank.jsonl")
+    assert row == ("What is 2+2?", "4", None, "medium", "arithmetic", None, None, 1, "bank.jsonl")
+
+
+@pytest.mark.parametrize(
+    "bad, message",
+    [
+        ({"answer": "4", "topic_tag1": "x"}, "question_prompt"),
+        (record(topic_tag2="t" * 256), "topic_tag2 is longer than 255"),
+        (record(has_been_asked="maybe"), "has_been_asked"),
+        (["not", "an", "object"], "not an object"),
+    ],
+)
+def test_validate_record_rejects(bad, message):
+    with pytest.raises(ValidationError, match=message):
+        validate_record(bad)
+
+
+def test_prompt_key_follows_the_unique_index():
+    prefix = "x" * PROMPT_KEY_CHARS
+    assert prompt_key("Hello") == prompt_key("HELLO")
+    assert prompt_key(prefix + " first tail") == prompt_key(prefix + " second tail")
+    assert prompt_key("Hello") != prompt_key("Hello!")
+
+
+def test_dedupe_chunk_keeps_the_last_occurrence():
+    rows = [("Q1", "a"), ("q1", "b"), ("Q2", "c")]
+    assert dedupe_chunk(rows) == [("q1", "b"), ("Q2", "c")]
+
+
+def test_prompt_key_filter_matches_long_prompts_by_prefix():
+    long_prompt = "50% of_the " + "y" * PROMPT_KEY_CHARS + " tail"
+    where, params = prompt_key_filter(["short one", long_prompt])
+    assert where == "question_prompt IN (%s) OR question_prompt LIKE %s ESCAPE '!'"
+    assert params[0] == "short one"
+    assert params[1] == "50!% of!_the " + "y" * (PROMPT_KEY_CHARS - len("50% of_the ")) + "%"
+
+
+def test_import_syncs_topics_of_rows_matched_by_prompt_prefix(fake_db, tmp_path, monkeypatch):
+    # The stored row shares the first 255 characters but has a different tail
+    long_prompt = "p" * PROMPT_KEY_CHARS + " re-worded ending"
+    bank = tmp_path / "bank.jsonl"
+    bank.write_text(
+        json.dumps(record(long_prompt, topic_tag1="algebra")) + "\n"
+        + json.dumps(record("Short?", topic_tag1="geometry")) + "\n"
+        + "{not json\n",
+        encoding="utf-8",
+    )
+    monkeypatch.setattr(import_questions, "bulk_insert", fake_bulk_insert)
+    fake_db.respond(r"^SELECT id FROM questions WHERE", [(11,), (12,)])
+    fake_db.respond(r"SELECT DISTINCT topic FROM question_topics", [("algebra",), ("geometry",)])
+
+    stats = run_import(bank, chunk_size=10)
+
+    assert (stats.read, stats.written, stats.invalid) == (3, 2, 1)
+    [(_, params)] = fake_db.statements(r"^SELECT id FROM questions")
+    assert params == ("Short?", "p" * PROMPT_KEY_CHARS + "%")
+    [(_, params)] = fake_db.statements(r"^DELETE FROM question_topics")
+    assert params == (11, 12)
+    [(_, params)] = fake_db.statements(r"^INSERT INTO topic_stats")
+    assert params == ("algebra", "geometry")
+
+
+def fake_bulk_insert(conn, table, columns, rows, update_columns=None, chunk_size=None, on_chunk=None):
+    rows = list(rows)
+    on_chunk(conn, rows)
@@ -0,0 +1,132 @@
+"""Tests for the migration runner (database/migrations.py)."""
+
+import hashlib
+
+from database.migrations import (
+    MIGRATIONS_DIR,
+    discover_migrations,
+    get_migration_status,
+    run_migrations,
+    split_sql,
+)
+
+
+def test_split_on_semicolons_and_drop_comments():
+    script = """
+        -- leading comment
+        CREATE TABLE a (id INT); # trailing comment
+        /* block
+           comment; with a semicolon */
+        INSERT INTO a VALUES (1);
+        SELECT 1
+    """
+    assert split_sql(script) == ["CREATE TABLE a (id INT)", "INSERT INTO a VALUES (1)", "SELECT 1"]
+
+
+def test_semicolons_inside_quotes_do_not_split():
+    script = r"""INSERT INTO t VALUES ('a;b', "c;d", 'it''s; fine', 'back\'slash;');
+SELECT `weird;name` FROM t;"""
+    assert split_sql(script) == [
+        r"""INSERT INTO t VALUES ('a;b', "c;d", 'it''s; fine', 'back\'slash;')""",
+        "SELECT `weird;name` FROM t",
+    ]
+
+
+def test_comment_markers_inside_strings_are_kept():
+    assert split_sql("SELECT '-- not a comment', '#nor this', '/* nor */';") == [
+        "SELECT '-- not a comment', '#nor this', '/* nor */'"
+    ]
+
+
+def test_double_dash_needs_whitespace_and_versioned_comments_are_kept():
+    assert split_sql("SELECT 1--1;") == ["SELECT 1--1"]
+    assert split_sql("CREATE TABLE t (id INT) /*!50100 ENGINE=InnoDB */;") == [
+        "CREATE TABLE t (id INT) /*!50100 ENGINE=InnoDB */"
+    ]
+
+
+def test_delimiter_lines_wrap_trigger_bodies():
+    script = """CREATE TABLE t (id INT);
+DELIMITER //
+CREATE TRIGGER trg BEFORE INSERT ON t FOR EACH ROW
+BEGIN
+    SET NEW.id = NEW.id + 1;
+END//
+DELIMITER ;
+INSERT INTO t VALUES (1);
+"""
+    statements = split_sql(script)
+    assert len(statements) == 3
+    assert statements[1].startswith("CREATE TRIGGER trg")
+    assert statements[1].endswith("END")
+    assert "SET NEW.id = NEW.id + 1;" in statements[1]
+    assert statements[2] == "INSERT INTO t VALUES (1)"
+
+
+def test_guarded_alters_run_outside_a_transaction():
+    by_version = {migration.version: migration for migration in discover_migrations(MIGRATIONS_DIR)}
+    for version in ("007_add_memory_compaction", "008_add_memory_content_hash"):
+        migration = by_version[version]
+        assert not migration.transactional
+        # Every ALTER is prepared behind an information_schema check
+        assert not any(statement.upper().startswith("ALTER") for statement in migration.statements)
+    assert "DEFAULT ''note''" in by_version["007_add_memory_compaction"].statements[0]
+
+
+def write_migrations(tmp_path, files):
+    for name, sql in files.items():
+        (tmp_path / name).write_text(sql, encoding="utf-8")
+    return tmp_path
+
+
+def test_dry_run_and_status_without_migrations_table_write_nothing(fake_db, tmp_path):
+    directory = write_migrations(tmp_path, {"001_a.sql": "CREATE TABLE a (id INT);", "002_b.sql": "SELECT 1;"})
+    fake_db.respond(r"information_schema\.tables", [(0,)])
+    conn = fake_db.connection()
+
+    pending = run_migrations(conn, directory, dry_run=True)
+    statuses = get_migration_status(conn, directory)
+
+    assert [migration.version for migration in pending] == ["001_a", "002_b"]
+    assert [(status.version, status.state) for status in statuses] == [("001_a", "pending"), ("002_b", "pending")]
+    executed = [sql for sql, _ in fake_db.statements()]
+    assert executed and all(sql.startswith("SELECT") for sql in executed)
+    assert not fake_db.statements("GET_LOCK|schema_migrations \\(")
+
+
+def test_dry_run_lists_only_unrecorded_files(fake_db, tmp_path):
+    directory = write_migrations(tmp_path, {"001_a.sql": "SELECT 1;", "002_b.sql": "SELECT 2;"})
+    recorded = hashlib.sha256(b"SELECT 1;").hexdigest()
+    fake_db.respond(r"information_schema\.tables", [(1,)])
+    fake_db.respond(r"FROM schema_migrations", [
+        {"version": "001_a", "checksum": recorded, "applied_at": "2025-01-01", "execution_ms": 3},
+    ])
+    pending = run_migrations(fake_db.connection(), directory, dry_run=True)
+    assert [migration.version for migration in pending] == ["002_b"]
+
+
+def test_edited_applied_file_is_reported_as_changed(fake_db, tmp_path):
+    directory = write_migrations(tmp_path, {"001_a.sql": "SELECT 1; -- edited"})
+    fake_db.respond(r"information_schema\.tables", [(1,)])
+    fake_db.respond(r"FROM schema_migrations", [
+        {"version": "001_a", "checksum": "old", "applied_at": "2025-01-01", "execution_ms": 3},
+    ])
+    [status] = get_migration_status(fake_db.connection(), directory)
+    assert status.state == "changed"
+    assert run_migrations(fake_db.connection(), directory, dry_run=True) == []
+
+
+def test_run_applies_pending_files_in_order_under_the_lock(fake_db, tmp_path):
+    directory = write_migrations(tmp_path, {"002_b.sql": "INSERT INTO t VALUES (2);", "001_a.sql": "CREATE TABLE t (id INT);"})
+    fake_db.respond(r"GET_LOCK", [(1,)])
+    applied = run_migrations(fake_db.connection(), directory)
+
+    assert [migration.version for migration in applied] == ["001_a", "002_b"]
+    executed = [sql for sql, _ in fake_db.statements()]
+    assert executed[0].startswith("CREATE TABLE IF NOT EXISTS schema_migrations")
+    assert executed[1].startswith("SELECT GET_LOCK")
+    assert executed.index("CREATE TABLE t (id INT)") < executed.index("INSERT INTO t VALUES (2)")
+    assert executed[-1].startswith("SELECT RELEASE_LOCK")
+    # The DML-only file ran in its own transaction
+    assert ("begin",) in fake_db.log and ("commit",) in fake_db.log
+
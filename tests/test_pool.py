@@ -0,0 +1,162 @@
+"""Tests for the queueing MySQL connection pool (database/pool.py)."""
+
+import threading
+import time
+
+import pytest
+from mysql.connector import errors
+
+from database import pool as pool_module
+from database.pool import ConnectionPool, PoolTimeoutError
+
+
+class FakeConn:
+    def __init__(self, number):
+        self.number = number
+        self.closed = False
+        self.in_transaction = False
+        self.rolled_back = False
+        self.ping_ok = True
+
+    def ping(self, reconnect=False):
+        if not self.ping_ok:
+            raise errors.InterfaceError("gone away")
+
+    def rollback(self):
+        self.rolled_back = True
+        self.in_transaction = False
+
+    def close(self):
+        self.closed = True
+
+
+class Factory:
+    def __init__(self):
+        self.made = []
+        self.fail = False
+
+    def __call__(self):
+        if self.fail:
+            raise errors.InterfaceError("cannot connect")
+        conn = FakeConn(len(self.made))
+        self.made.append(conn)
+        return conn
+
+
+def make_pool(**kwargs):
+    factory = Factory()
+    options = {"size": 2, "overflow": 1, "timeout": 0.2, "recycle": 0, "pre_ping": True}
+    options.update(kwargs)
+    return ConnectionPool(factory, **options), factory
+
+
+def test_connections_are_reused_after_close():
+    pool, factory = make_pool()
+    first = pool.get_connection()
+    first.close()
+    second = pool.get_connection()
+    assert second._conn is factory.made[0]
+    assert len(factory.made) == 1
+    assert pool.stats()["checkouts"] == 2
+
+
+def test_returned_proxy_cannot_be_used():
+    pool, _ = make_pool()
+    conn = pool.get_connection()
+    conn.close()
+    conn.close()  # idempotent
+    with pytest.raises(errors.OperationalError):
+        conn.cursor()
+    assert pool.stats()["in_use"] == 0
+
+
+def test_overflow_connections_close_once_the_core_pool_is_full():
+    pool, factory = make_pool(size=1, overflow=1)
+    core, extra = pool.get_connection(), pool.get_connection()
+    assert pool.stats()["overflow_in_use"] == 1
+    core.close()
+    extra.close()
+    stats = pool.stats()
+    assert (stats["open"], stats["idle"]) == (1, 1)
+    assert factory.made[1].closed and not factory.made[0].closed
+
+
+def test_checkout_times_out_when_exhausted():
+    pool, _ = make_pool(size=1, overflow=0, timeout=0.05)
+    held = pool.get_connection()
+    with pytest.raises(PoolTimeoutError):
+        pool.get_connection()
+    assert pool.stats()["exhausted"] == 1
+    held.close()
+
+
+def test_waiting_checkout_gets_the_next_returned_connection():
+    pool, factory = make_pool(size=1, overflow=0, timeout=2)
+    held = pool.get_connection()
+    result = {}
+
+    def waiter():
+        conn = pool.get_connection()
+        result["conn"] = conn._conn
+        conn.close()
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    time.sleep(0.05)
+    held.close()
+    thread.join(timeout=2)
+    assert result["conn"] is factory.made[0]
+    assert pool.stats()["waited_checkouts"] == 1
+
+
+def test_open_transactions_are_rolled_back_on_return():
+    pool, factory = make_pool()
+    conn = pool.get_connection()
+    factory.made[0].in_transaction = True
+    conn.close()
+    assert factory.made[0].rolled_back
+    assert pool.stats()["idle"] == 1
+
+
+def test_failed_pre_ping_replaces_the_connection():
+    pool, factory = make_pool()
+    pool.get_connection().close()
+    factory.made[0].ping_ok = False
+    conn = pool.get_connection()
+    assert conn._conn is factory.made[1]
+    assert factory.made[0].closed
+    assert pool.stats()["pre_ping_failures"] == 1
+
+
+def test_idle_connections_past_recycle_age_are_replaced(monkeypatch):
+    pool, factory = make_pool(recycle=60)
+    now = [1000.0]
+    monkeypatch.setattr(pool_module.time, "monotonic", lambda: now[0])
+    pool.get_connection().close()
+    now[0] += 61
+    conn = pool.get_connection()
+    assert conn._conn is factory.made[1]
+    assert pool.stats()["recycled"] == 1
+
+
+def test_failed_connect_frees_the_slot():
+    pool, factory = make_pool(size=1, overflow=0, timeout=0.05)
+    factory.fail = True
+    with pytest.raises(errors.InterfaceError):
+        pool.get_connection()
+    factory.fail = False
+    pool.get_connection().close()
+    assert pool.stats()["open"] == 1
+
+
+def test_close_refuses_checkouts_and_closes_returned_connections():
+    pool, factory = make_pool()
+    held = pool.get_connection()
+    pool.get_connection().close()
+    pool.close()
+    with pytest.raises(errors.PoolError):
+        pool.get_connection()
+    assert factory.made[1].closed
+    held.close()
+    assert factory.made[0].closed
+    assert pool.stats()["open"] == 0
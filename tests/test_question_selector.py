@@ -0,0 +1,161 @@
+"""Tests for deterministic question selection (agents/question_selector.py)."""
+
+import pytest
+
+from agents.question_selector import (
+    difficulty_value,
+    lookup_skill_level,
+    SUMMARY_CHARS,
+    estimate_tokens,
+    normalize_topic,
+    prune_candidates,
+    rank_candidates,
+    reattach_questions,
+    select_questions,
+    target_difficulty,
+)
+
+
+def question(question_id, difficulty, asked=False, **extra):
+    return {
+        "question_id": question_id,
+        "question_prompt": f"Question {question_id}",
+        "difficulty": difficulty,
+        "has_been_asked": asked,
+        **extra,
+    }
+
+
+@pytest.mark.parametrize(
+    "raw, expected",
+    [
+        ("Easy", 1.0),
+        (" intermediate ", 2.0),
+        ("hard", 3.0),
+        (2, 2.0),
+        (0, 1.0),
+        ("10", 3.0),
+        (5.5, 2.0),
+        (50, 2.0),
+        (250, 3.0),
+        ("tricky", None),
+        (None, None),
+    ],
+)
+def test_difficulty_value(raw, expected):
+    if expected is None:
+        assert difficulty_value(raw) is None
+    else:
+        assert difficulty_value(raw) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize(
+    "skill, expected",
+    [(None, 2.0), (0, 1.0), (25, 1.0), (26, 1.5), (60, 2.5), (100, 3.0), (120, 3.0)],
+)
+def test_target_difficulty_bands(skill, expected):
+    assert target_difficulty(skill) == expected
+
+
+def test_skill_lookup_ignores_case_and_spacing():
+    assert normalize_topic(" Linear Algebra ") == "linear_algebra"
+    assert lookup_skill_level({"Linear Algebra": 40}, "linear_algebra") == 40
+    assert lookup_skill_level({"geometry": 10}, "algebra") is None
+
+
+def test_rank_prefers_unasked_then_closest_difficulty():
+    candidates = [
+        question(1, "hard", asked=True),
+        question(2, "hard"),
+        question(3, "easy"),
+        question(4, "unknown"),
+    ]
+    ranked = rank_candidates("algebra", candidates, skill_level=10, seed="2025-01-15")
+    assert [q["question_id"] for q in ranked] == [3, 4, 2, 1]
+
+
+def test_rank_ties_are_stable_per_seed_and_rotate_with_it():
+    candidates = [question(i, "medium") for i in range(20)]
+    order = lambda seed: [q["question_id"] for q in rank_candidates("algebra", candidates, 50, seed)]
+    assert order("2025-01-15") == order("2025-01-15")
+    assert order("2025-01-15") != order("2025-01-16")
+    # Input order does not matter
+    assert order("2025-01-15") == [
+        q["question_id"] for q in rank_candidates("algebra", candidates[::-1], 50, "2025-01-15")
+    ]
+
+
+def test_select_one_question_per_topic_and_report_missing():
+    questions_by_topic = {
+        "algebra": [question(1, "hard"), question(2, "easy")],
+        "geometry": [question(3, "medium")],
+    }
+    selected, missing = select_questions(
+        ["algebra", "geometry", "statistics"], questions_by_topic, {"Algebra": 90}, seed="s"
+    )
+    assert [q["question_id"] for q in selected] == [1, 3]
+    assert [q["source_topic"] for q in selected] == ["algebra", "geometry"]
+    assert "skill level 90" in selected[0]["selection_reason"]
+    assert "skill level unknown" in selected[1]["selection_reason"]
+    assert missing == ["statistics"]
+    # Selection copies rows instead of mutating the candidates
+    assert "selection_reason" not in questions_by_topic["algebra"][0]
+
+
+def test_question_tagged_with_two_topics_is_served_once():
+    shared = question(1, "medium")
+    questions_by_topic = {"algebra": [shared], "functions": [shared, question(2, "hard")]}
+    selected, missing = select_questions(["algebra", "functions"], questions_by_topic, {}, seed="s")
+    assert [q["question_id"] for q in selected] == [1, 2]
+    assert missing == []
+
+
+def test_topic_whose_only_candidate_was_used_is_missing():
+    shared = question(1, "medium")
+    selected, missing = select_questions(
+        ["algebra", "functions"], {"algebra": [shared], "functions": [shared]}, {}, seed="s"
+    )
+    assert [q["question_id"] for q in selected] == [1]
+    assert missing == ["functions"]
+
+
+def test_prune_keeps_top_k_ranked_summaries():
+    candidates = [question(i, "hard" if i % 2 else "easy", question_prompt="x" * 500) for i in range(10)]
+    pruned, report = prune_candidates({"algebra": candidates}, {"algebra": 10}, top_k=3, token_budget=10_000)
+    kept = pruned["algebra"]
+    assert len(kept) == 3
+    assert all(q["difficulty"] == "easy" for q in kept)
+    assert set(kept[0]) == {"question_id", "summary", "difficulty", "has_been_asked"}
+    assert len(kept[0]["summary"]) == SUMMARY_CHARS + len("...")
+    assert (report.candidates_before, report.candidates_after) == (10, 3)
+    assert report.tokens_after < report.tokens_before
+
+
+def test_prune_trims_largest_topic_to_fit_budget_but_keeps_one_per_topic():
+    questions_by_topic = {
+        "algebra": [question(i, "medium") for i in range(8)],
+        "geometry": [question(100 + i, "medium") for i in range(2)],
+    }
+    pruned, report = prune_candidates(questions_by_topic, {}, top_k=8, token_budget=1)
+    assert {topic: len(kept) for topic, kept in pruned.items()} == {"algebra": 1, "geometry": 1}
+    assert report.tokens_after == estimate_tokens(pruned)
+
+    budget = estimate_tokens({"algebra": pruned["algebra"] * 3, "geometry": pruned["geometry"] * 2})
+    pruned, report = prune_candidates(questions_by_topic, {}, top_k=8, token_budget=budget)
+    assert report.tokens_after <= budget
+    assert len(pruned["algebra"]) >= len(pruned["geometry"]) >= 1
+
+
+def test_reattach_restores_full_rows_and_keeps_model_fields():
+    full = question(7, "hard", answer="42", topic_tag1="algebra")
+    selected = [
+        {"question_id": "7", "source_topic": "algebra", "selection_reason": "fits"},
+        {"question_id": None, "question_prompt": "Model-written question"},
+        "not a dict",
+    ]
+    reattached = reattach_questions(selected, {"algebra": [full]})
+    assert reattached[0]["answer"] == "42"
+    assert reattached[0]["selection_reason"] == "fits"
+    assert "selection_reason" not in full
+    assert reattached[1] == {"question_id": None, "question_prompt": "Model-written question"}
+    assert len(reattached) == 2
@@ -0,0 +1,71 @@
+"""Tests for question_topics lookups and maintenance (database/db_helpers.py)."""
+
+from database import db_helpers
+
+
+def test_questions_by_topic_go_through_the_junction_table(fake_db):
+    fake_db.respond(r"FROM question_topics qt JOIN questions", [{"id": 1}, {"id": 2}])
+    assert [row["id"] for row in db_helpers.get_questions_by_topic("algebra")] == [1, 2]
+    [(sql, params)] = fake_db.statements("question_topics")
+    assert "WHERE qt.topic = %s" in sql
+    assert params == ("algebra",)
+
+
+def test_questions_grouped_by_requested_topic_spelling(fake_db):
+    fake_db.respond(r"FROM question_topics qt JOIN questions", [
+        {"matched_topic": "algebra", "id": 1, "question_prompt": "a"},
+        {"matched_topic": "algebra", "id": 2, "question_prompt": "b"},
+        {"matched_topic": "geometry", "id": 2, "question_prompt": "b"},
+    ])
+    grouped = db_helpers.get_questions_by_topics(["Algebra", "geometry", "statistics"])
+    assert [row["id"] for row in grouped["Algebra"]] == [1, 2]
+    assert [row["id"] for row in grouped["geometry"]] == [2]
+    assert grouped["statistics"] == []
+    assert "matched_topic" not in grouped["Algebra"][0]
+    [(sql, params)] = fake_db.statements("question_topics")
+    assert params == ("Algebra", "geometry", "statistics")
+
+
+def test_no_topics_means_no_query(fake_db):
+    assert db_helpers.get_questions_by_topics([]) == {}
+    assert fake_db.statements() == []
+
+
+def test_unique_topics_come_from_topic_stats(fake_db):
+    fake_db.respond(r"FROM topic_stats WHERE question_count > 0", [("algebra",), ("geometry",)])
+    assert db_helpers.get_unique_topics() == ["algebra", "geometry"]
+
+
+def test_sync_refreshes_topics_the_questions_had_and_have(fake_db):
+    answers = iter([[("algebra",)], [("geometry",)]])
+    fake_db.respond(r"SELECT DISTINCT topic FROM question_topics", lambda params: next(answers))
+
+    affected = db_helpers.sync_question_topics(fake_db.connection(), [5, 6])
+
+    assert affected == {"algebra", "geometry"}
+    [(_, params)] = fake_db.statements(r"^DELETE FROM question_topics")
+    assert params == (5, 6)
+    [(_, params)] = fake_db.statements(r"^INSERT IGNORE INTO question_topics")
+    assert params == (5, 6) * 3
+    [(_, params)] = fake_db.statements(r"^INSERT INTO topic_stats")
+    assert params == ("algebra", "geometry")
+
+
+def test_sync_with_no_questions_does_nothing(fake_db):
+    assert db_helpers.sync_question_topics(fake_db.connection(), []) == set()
+    assert fake_db.statements() == []
+
+
+def test_sync_can_defer_stats_refresh(fake_db):
+    fake_db.respond(r"SELECT DISTINCT topic FROM question_topics", [("algebra",)])
+    affected = db_helpers.sync_question_topics(fake_db.connection(), [5], refresh_stats=False)
+    assert affected == {"algebra"}
+    assert fake_db.statements("topic_stats") == []
+
+
+def test_full_rebuild_replaces_every_row(fake_db):
+    assert db_helpers.sync_question_topics(fake_db.connection()) == set()
+    statements = [sql for sql, _ in fake_db.statements()]
+    assert statements[0] == "DELETE FROM question_topics"
+    assert statements[1].startswith("INSERT IGNORE INTO question_topics (question_id, topic) SELECT id, topic_tag1")
+    assert "DELETE FROM topic_stats" in statements
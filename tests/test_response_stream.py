@@ -0,0 +1,71 @@
+"""Tests for the incremental tutor-reply extractor (agents/response_stream.py)."""
+
+import json
+
+import pytest
+
+from agents.response_stream import ResponseFieldExtractor
+
+
+def run(chunks):
+    extractor = ResponseFieldExtractor()
+    events = []
+    for chunk in chunks:
+        events.extend(extractor.feed(chunk))
+    events.extend(extractor.finish())
+    deltas = "".join(event["text"] for event in events if event["type"] == "delta")
+    return extractor, events, deltas
+
+
+def one_char_chunks(text):
+    return list(text)
+
+
+def test_streams_response_before_the_object_closes():
+    extractor = ResponseFieldExtractor()
+    assert extractor.feed('{"response": "Try ') == [{"type": "delta", "text": "Try "}]
+    assert extractor.feed('again"') == [{"type": "delta", "text": "again"}]
+    assert extractor.correct_status is None
+    assert extractor.feed(', "correct_status": false}') == [{"type": "correct_status", "value": False}]
+    assert extractor.finish() == []
+    assert extractor.response == "Try again"
+
+
+@pytest.mark.parametrize("chunker", [lambda text: [text], one_char_chunks])
+def test_escapes_decode_like_json(chunker):
+    response = 'Line one\nSay "hi" \\ tab\there é and an emoji \U0001f600 done/'
+    reply = json.dumps({"response": response, "correct_status": True})
+    extractor, events, deltas = run(chunker(reply))
+    assert deltas == response
+    assert extractor.correct_status is True
+    assert {"type": "correct_status", "value": True} in events
+
+
+def test_surrogate_pair_split_across_chunks():
+    extractor, _, deltas = run(['{"response": "smile \\ud83d', "\\ude", '00!", "correct_status": true}'])
+    assert deltas == "smile \U0001f600!"
+
+
+def test_correct_status_may_come_first():
+    extractor = ResponseFieldExtractor()
+    assert extractor.feed('{"correct_status": tr') == []
+    assert extractor.feed('ue, "resp') == [{"type": "correct_status", "value": True}]
+    assert extractor.feed('onse": "Yes"}') == [{"type": "delta", "text": "Yes"}]
+
+
+def test_code_fenced_json():
+    reply = '```json\n{"response": "Close!", "correct_status": false}\n```'
+    extractor, _, deltas = run(one_char_chunks(reply))
+    assert deltas == "Close!"
+    assert extractor.correct_status is False
+
+
+def test_plain_text_reply_streams_verbatim():
+    extractor, _, deltas = run(["Let's look ", "at the units."])
+    assert deltas == "Let's look at the units."
+    assert extractor.correct_status is None
+
+
+def test_json_without_response_field_falls_back_to_raw_text():
+    extractor, _, deltas = run(['{"answer": "x"}'])
+    assert deltas == '{"answer": "x"}'
@@ -0,0 +1,80 @@
+"""Tests for the live-session LRU registry (agents/chat_manager.py)."""
+
+import pytest
+
+import agents.chat_manager as chat_manager
+from agents.chat_manager import SessionStore
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(chat_manager.time, "monotonic", clock)
+    return clock
+
+
+def test_put_evicts_least_recently_used_over_the_cap(clock):
+    store = SessionStore(max_sessions=2, idle_ttl=60)
+    assert store.put("a", "A") == []
+    assert store.put("b", "B") == []
+    assert store.get("a") == "A"  # "b" is now the least recently used
+    assert store.put("c", "C") == ["B"]
+    assert "b" not in store and "a" in store and "c" in store
+    assert len(store) == 2
+    assert store.evicted == 1
+
+
+def test_re_putting_a_session_refreshes_it_without_eviction(clock):
+    store = SessionStore(max_sessions=2, idle_ttl=60)
+    store.put("a", "A")
+    store.put("b", "B")
+    assert store.put("a", "A") == []
+    assert store.put("c", "C") == ["B"]
+
+
+def test_get_and_pop_missing_sessions(clock):
+    store = SessionStore(max_sessions=2, idle_ttl=60)
+    assert store.get("missing") is None
+    assert store.pop("missing") is None
+    store.put("a", "A")
+    assert store.pop("a") == "A"
+    assert len(store) == 0
+
+
+def test_pop_expired_removes_only_idle_sessions(clock):
+    store = SessionStore(max_sessions=10, idle_ttl=60)
+    store.put("old", "OLD")
+    clock.now += 30
+    store.put("recent", "RECENT")
+    clock.now += 31  # "old" idle 61s, "recent" 31s
+    assert store.pop_expired() == ["OLD"]
+    assert store.pop_expired() == []
+    assert "recent" in store
+    assert store.expired == 1
+
+
+def test_get_keeps_a_session_alive(clock):
+    store = SessionStore(max_sessions=10, idle_ttl=60)
+    store.put("a", "A")
+    store.put("b", "B")
+    clock.now += 50
+    store.get("a")
+    clock.now += 20  # "b" idle 70s, "a" 20s
+    assert store.pop_expired() == ["B"]
+    assert "a" in store
+
+
+def test_pop_all_empties_the_store(clock):
+    store = SessionStore(max_sessions=10, idle_ttl=60)
+    store.put("a", "A")
+    store.put("b", "B")
+    assert store.pop_all() == ["A", "B"]
+    assert len(store) == 0
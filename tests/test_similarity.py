@@ -0,0 +1,120 @@
+"""Tests for memory note similarity (memory/similarity.py) and write-side merging."""
+
+import pytest
+
+from database import student_context
+from database.db import DatabaseManager
+from database.db_helpers import add_student_memory
+from memory.similarity import conflicting_words, content_hash, is_near_duplicate, normalize_text
+
+
+@pytest.mark.parametrize(
+    "left, right",
+    [
+        ("Weak at integration by parts", "Strong at integration by parts"),
+        ("Prefers visual explanations", "Does not prefer visual explanations"),
+        ("Prefers visual explanations", "Doesn't prefer visual explanations"),
+        ("Quiz 1 was 40%", "Quiz 2 was 90%"),
+        ("Answers correct on the first try", "Answers incorrect on the first try"),
+        ("Always checks units in physics problems", "Sometimes checks units in physics problems"),
+    ],
+)
+def test_contradictory_notes_are_not_duplicates(left, right):
+    assert conflicting_words(left, right)
+    assert not is_near_duplicate(left, right)
+    # Even a permissive threshold does not merge them
+    assert not is_near_duplicate(left, right, threshold=0.0)
+
+
+@pytest.mark.parametrize(
+    "left, right",
+    [
+        ("Struggles with stoichiometry", "struggles with stoichiometry."),
+        ("Confuses sine and cosine under time pressure", "Confuses sine and cosine when under time pressure"),
+        ("Prefers visual examples before proofs", "Prefers visual examples before formal proofs"),
+        ("struggles with stoichiometry", "Student struggles with stoichiometry problems"),
+        ("Likes worked examples", "Likes step-by-step worked examples"),
+    ],
+)
+def test_restatements_are_duplicates(left, right):
+    assert not conflicting_words(left, right)
+    assert is_near_duplicate(left, right)
+
+
+@pytest.mark.parametrize(
+    "left, right",
+    [
+        ("Needs extra time on word problems", "Confuses sine and cosine under time pressure"),
+        ("Enjoys chemistry", "Enjoys calculus"),
+    ],
+)
+def test_different_observations_are_not_duplicates(left, right):
+    assert not conflicting_words(left, right)
+    assert not is_near_duplicate(left, right)
+
+
+def test_normalize_text_spells_out_negations():
+    assert normalize_text("Doesn't like DIAGRAMS!") == "does not like diagrams"
+
+
+def test_content_hash_keeps_word_order():
+    assert content_hash("Weak in algebra, strong in geometry") == content_hash("weak in algebra strong in geometry")
+    assert content_hash("Weak in algebra, strong in geometry") != content_hash("Strong in algebra, weak in geometry")
+
+
+def test_exact_restatement_merges_and_keeps_the_new_wording(fake_db):
+    fake_db.respond(r"WHERE student_id = %s AND content_hash = %s", [(7, 2)])
+    result = add_student_memory(1, "Struggles with stoichiometry.")
+
+    assert (result.memory_id, result.merged, result.hits) == (7, True, 3)
+    assert result.memory_entry == "Struggles with stoichiometry."
+    [(_, params)] = fake_db.statements(r"^UPDATE student_memory SET memory_entry")
+    assert params == ("Struggles with stoichiometry.", content_hash("Struggles with stoichiometry."), 7, 1)
+    assert not fake_db.statements(r"^INSERT")
+
+
+def test_similar_note_takes_the_new_text(fake_db):
+    fake_db.respond(r"ORDER BY last_seen_at DESC", [(4, "Confuses sine and cosine under time pressure", 1)])
+    result = add_student_memory(1, "Confuses sine and cosine when under time pressure")
+
+    assert (result.memory_id, result.merged, result.hits) == (4, True, 2)
+    [(_, params)] = fake_db.statements(r"^UPDATE student_memory SET memory_entry")
+    assert params[0] == "Confuses sine and cosine when under time pressure"
+
+
+def test_contradicting_note_is_inserted(fake_db):
+    fake_db.respond(r"ORDER BY last_seen_at DESC", [(4, "Weak at integration by parts", 1)])
+    fake_db.respond(r"^INSERT INTO student_memory", [()])
+    result = add_student_memory(1, "Strong at integration by parts")
+
+    assert not result.merged
+    assert not fake_db.statements(r"^UPDATE")
+    [(_, params)] = fake_db.statements(r"^INSERT INTO student_memory")
+    assert params == (1, "Strong at integration by parts", content_hash("Strong at integration by parts"))
+
+
+@pytest.fixture
+def cached_note(fake_db):
+    fake_db.respond(r"FROM students s", [(1, "Ada", "Finals", 4, "Confuses sine and cosine under time pressure", "note", 1, None, None)])
+    student_context.invalidate_student_context()
+    yield student_context.load_student_context(1).memory
+    student_context.invalidate_student_context()
+
+
+def test_merge_reaches_the_cached_context_after_commit(fake_db, cached_note):
+    fake_db.respond(r"ORDER BY last_seen_at DESC", [(4, "Confuses sine and cosine under time pressure", 1)])
+    with DatabaseManager.session() as session:
+        session.begin()
+        add_student_memory(1, "Confuses sine and cosine when under time pressure", session=session)
+        assert (cached_note[0].hits, cached_note[0].text) == (1, "Confuses sine and cosine under time pressure")
+    assert (cached_note[0].hits, cached_note[0].text) == (2, "Confuses sine and cosine when under time pressure")
+
+
+def test_rolled_back_note_never_reaches_the_cached_context(fake_db, cached_note):
+    fake_db.respond(r"^INSERT INTO student_memory", [()])
+    with pytest.raises(RuntimeError):
+        with DatabaseManager.session() as session:
+            session.begin()
+            add_student_memory(1, "Strong at integration by parts", session=session)
+            raise RuntimeError("abort")
+    assert [record.text for record in cached_note] == ["Confuses sine and cosine under time pressure"]
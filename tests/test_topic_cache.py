@@ -0,0 +1,65 @@
+"""Tests for the topic vocabulary cache (database/topic_cache.py) and its write paths."""
+
+import pytest
+
+from database import topic_cache
+from database.db import DatabaseManager
+from database.db_helpers import refresh_topic_stats, set_skill_level, set_skill_levels
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    topic_cache.invalidate_topic_vocabulary()
+    yield
+    topic_cache.invalidate_topic_vocabulary()
+
+
+def cached_skills(student_id):
+    vocabulary = topic_cache.get_cached_topic_vocabulary(student_id)
+    return vocabulary.skills if vocabulary else None
+
+
+def load(fake_db, student_id=1):
+    fake_db.respond(r"FROM topic_stats", [("Algebra",), ("Geometry",)])
+    fake_db.respond(r"FROM skill_levels", [("Algebra", 40)])
+    return topic_cache.load_topic_vocabulary(student_id)
+
+
+def test_skill_topics_are_keyed_in_lowercase(fake_db):
+    vocabulary = load(fake_db)
+    assert vocabulary.topics == ["Algebra", "Geometry"]
+    assert vocabulary.skills == {"algebra": 40}
+
+    topic_cache.record_skill_levels(1, {"ALGEBRA": 55, "Geometry": 30})
+    assert cached_skills(1) == {"algebra": 55, "geometry": 30}
+
+
+def test_skill_write_without_a_transaction_updates_the_cache_at_once(fake_db):
+    load(fake_db)
+    set_skill_levels(1, {"Algebra": 70})
+    assert cached_skills(1) == {"algebra": 70}
+
+
+def test_skill_write_waits_for_the_session_commit(fake_db):
+    load(fake_db)
+    with DatabaseManager.session() as session:
+        session.begin()
+        set_skill_level(1, "Geometry", 80, session=session)
+        assert cached_skills(1) == {"algebra": 40}
+    assert cached_skills(1) == {"algebra": 40, "geometry": 80}
+
+
+def test_rolled_back_skill_write_never_reaches_the_cache(fake_db):
+    load(fake_db)
+    with pytest.raises(RuntimeError):
+        with DatabaseManager.session() as session:
+            session.begin()
+            set_skill_levels(1, {"Algebra": 5}, session=session)
+            raise RuntimeError("abort")
+    assert cached_skills(1) == {"algebra": 40}
+
+
+def test_refresh_topic_stats_leaves_invalidation_to_the_committing_caller(fake_db):
+    load(fake_db)
+    refresh_topic_stats(fake_db.connection(), ["Algebra"])
+    assert topic_cache.get_cached_topic_vocabulary(1) is not None
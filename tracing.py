@@ -0,0 +1,343 @@
+"""
+Per-stage latency tracing for the Eigen Coach backend.
+
+Code wraps the work it wants timed in ``span(stage, operation)``; every span
+is observed in a Prometheus histogram labelled with the HTTP endpoint it ran
+under, and optionally written as one JSON line to ``EIGEN_TRACE_LOG``.
+Stages used across the backend:
+
+    http              whole HTTP request or WebSocket message (TracingMiddleware)
+    db                database helper, including the wait for a worker thread
+    mcp_tool          database MCP tool call
+    llm_connect       starting a Claude client
+    llm_first_token   query sent until the first reply text arrives
+    llm_completion    query sent until the reply is complete
+    finalizer_job     background session evaluation, including the skill upsert
+
+``GET /metrics`` serves ``render_metrics()`` in the Prometheus text format.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+from starlette.routing import Match
+
+
+T = TypeVar("T")
+
+# Append one JSON object per finished span to this file; unset disables the log
+TRACE_LOG_PATH = os.getenv("EIGEN_TRACE_LOG", "")
+# Histogram bucket upper bounds in seconds (comma-separated)
+TRACE_BUCKETS = tuple(
+    float(bound)
+    for bound in os.getenv(
+        "EIGEN_TRACE_BUCKETS",
+        "0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10,30,60",
+    ).split(",")
+    if bound.strip()
+)
+
+# Endpoint label for spans that run outside a request (background tasks, CLI)
+NO_ENDPOINT = "-"
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("eigen_span", default=None)
+_current_endpoint: contextvars.ContextVar[str] = contextvars.ContextVar("eigen_endpoint", default=NO_ENDPOINT)
+
+
+# ============================================================================
+# Metrics
+# ============================================================================
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    """Thread-safe Prometheus histogram keyed by label values."""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...], buckets: Tuple[float, ...]) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple[str, ...], value: float) -> None:
+        with self._lock:
+            # Per-bucket counts, then sum and count
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0.0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        for labels, values in sorted(series.items()):
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                le = _format_labels(self.label_names, labels, f'le="{bound:g}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative:g}")
+            inf = _format_labels(self.label_names, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{inf} {values[-1]:g}")
+            label_text = _format_labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{label_text} {values[-2]:.6f}")
+            lines.append(f"{self.name}_count{label_text} {values[-1]:g}")
+        return lines
+
+
+class Counter:
+    """Thread-safe Prometheus counter keyed by label values."""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...]) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Tuple[str, ...], amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, labels)} {value:g}")
+        return lines
+
+
+STAGE_DURATION = Histogram(
+    "eigen_stage_duration_seconds",
+    "Time spent per endpoint, stage and operation.",
+    ("endpoint", "stage", "operation"),
+    TRACE_BUCKETS,
+)
+STAGE_ERRORS = Counter(
+    "eigen_stage_errors_total",
+    "Spans that ended with an exception.",
+    ("endpoint", "stage", "operation"),
+)
+HTTP_REQUESTS = Counter(
+    "eigen_http_requests_total",
+    "HTTP requests by endpoint, method and status code.",
+    ("endpoint", "method", "status"),
+)
+
+
+def render_metrics() -> str:
+    """Return every metric in the Prometheus text exposition format."""
+    lines: List[str] = []
+    for metric in (STAGE_DURATION, STAGE_ERRORS, HTTP_REQUESTS):
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ============================================================================
+# Spans
+# ============================================================================
+
+_log_lock = threading.Lock()
+
+
+def _write_trace_log(record: Dict[str, Any]) -> None:
+    line = json.dumps(record, default=str, ensure_ascii=False)
+    try:
+        with _log_lock, open(TRACE_LOG_PATH, "a", encoding="utf-8") as handle:
+            handle.write(line + "\n")
+    except OSError as exc:
+        print(f"[Tracing] Could not write trace log: {exc}")
+
+
+@dataclass
+class Span:
+    """One timed stage of a request."""
+
+    stage: str
+    operation: str
+    endpoint: str
+    trace_id: str
+    parent_id: Optional[str] = None
+    span_id: str = field(default_factory=lambda: uuid.uuid4().hex[:16])
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    started_at: float = field(default_factory=time.time)
+    _started: float = field(default_factory=time.perf_counter)
+    _marked: set = field(default_factory=set)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._started
+
+    def mark(self, stage: str) -> None:
+        """Record the time from this span's start to now as ``stage``, once.
+
+        Used for milestones inside a span, e.g. time to first token.
+        """
+        if stage in self._marked:
+            return
+        self._marked.add(stage)
+        _record(self, stage, self.elapsed(), error=None)
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        _record(self, self.stage, self.elapsed(), error)
+
+
+def _record(span: Span, stage: str, seconds: float, error: Optional[BaseException]) -> None:
+    labels = (span.endpoint, stage, span.operation)
+    STAGE_DURATION.observe(labels, seconds)
+    if error is not None:
+        STAGE_ERRORS.inc(labels)
+    if TRACE_LOG_PATH:
+        _write_trace_log({
+            "trace_id": span.trace_id,
+            "span_id": span.span_id if stage == span.stage else f"{span.span_id}:{stage}",
+            "parent_id": span.parent_id if stage == span.stage else span.span_id,
+            "endpoint": span.endpoint,
+            "stage": stage,
+            "operation": span.operation,
+            "start": span.started_at,
+            "duration_ms": round(seconds * 1000, 3),
+            "status": "error" if error is not None else "ok",
+            "error": repr(error) if error is not None else None,
+            **({"attributes": span.attributes} if span.attributes else {}),
+        })
+
+
+def current_trace_id() -> Optional[str]:
+    span = _current_span.get()
+    return span.trace_id if span is not None else None
+
+
+def start_span(stage: str, operation: str = "", **attributes: Any) -> Span:
+    """Start a span under the current one without making it current.
+
+    For async generators, which may be finalized in another context: call
+    ``finish()`` yourself.
+    """
+    parent = _current_span.get()
+    return Span(
+        stage=stage,
+        operation=operation or stage,
+        endpoint=_current_endpoint.get(),
+        trace_id=parent.trace_id if parent is not None else uuid.uuid4().hex,
+        parent_id=parent.span_id if parent is not None else None,
+        attributes=attributes,
+    )
+
+
+@contextmanager
+def span(stage: str, operation: str = "", **attributes: Any) -> Iterator[Span]:
+    """Time the enclosed block as ``stage``; nests under the current span.
+
+    Works around ``await`` as well, since the current span lives in a
+    context variable.
+    """
+    current = start_span(stage, operation, **attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as exc:
+        current.finish(exc)
+        raise
+    else:
+        current.finish()
+    finally:
+        _current_span.reset(token)
+
+
+def traced(stage: str, operation: Optional[str] = None) -> Callable[[Callable[..., Awaitable[T]]], Callable[..., Awaitable[T]]]:
+    """Decorate a coroutine function so each call is a span."""
+
+    def decorator(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        name = operation or func.__name__
+
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> T:
+            with span(stage, name):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+# ============================================================================
+# ASGI middleware
+# ============================================================================
+
+class TracingMiddleware:
+    """Open an ``http`` span per request, labelled with the matched route.
+
+    A plain ASGI middleware rather than ``BaseHTTPMiddleware`` so streaming
+    responses are timed to their last byte and context variables reach the
+    endpoint. WebSocket connections are labelled but not timed as a whole;
+    ``/chatter/ws`` opens its own span per message.
+    """
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    def _endpoint(self, scope: Dict[str, Any]) -> str:
+        router = getattr(scope.get("app"), "router", None)
+        for route in getattr(router, "routes", []):
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(route, "path", scope["path"])
+        return "unmatched"
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        token = _current_endpoint.set(self._endpoint(scope))
+        try:
+            if scope["type"] == "websocket":
+                await self.app(scope, receive, send)
+                return
+
+            status = "500"
+
+            async def send_with_trace(message: Dict[str, Any]) -> None:
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = str(message["status"])
+                    trace_id = current_trace_id()
+                    if trace_id:
+                        message.setdefault("headers", [])
+                        message["headers"] = list(message["headers"]) + [(b"x-trace-id", trace_id.encode())]
+                await send(message)
+
+            try:
+                with span("http", scope["method"]):
+                    await self.app(scope, receive, send_with_trace)
+            finally:
+                HTTP_REQUESTS.inc((_current_endpoint.get(), scope["method"], status))
+        finally:
+            _current_endpoint.reset(token)